@@ -2,24 +2,15 @@
 
 import { duration } from '@/constants/time';
 import { carbonToOffset } from '@/constants/user';
-import { executeBudgetAlgorithm } from '@/pages/api/run-python-budget-algo';
+import { BudgetAlgorithmError, executeBudgetAlgorithm } from '@/pages/api/run-python-budget-algo';
 import {
   BudgetAlgorithmInput,
+  BudgetBreakdowns,
   BudgetOutputData,
   BudgetPythonResponse,
-  CostByRegion,
   RegionAllocation,
-  CostByTypology,
 } from '@/types/types';
-import {
-  getTotalCostPerTypes,
-  getTotalCostPerRegions,
-  calculateTotalQuantitiesFinancing,
-  calculateTotalCostsFinancing,
-  assertTypologySum,
-  calculateTotalQuantitiesRegionAllocation,
-  normalizeRegionAllocation,
-} from '@/utils/calculations';
+import { assertTypologySum, normalizeRegionAllocation } from '@/utils/calculations';
 
 const MIN_BUDGET_YEAR = 2025;
 
@@ -44,6 +35,10 @@ async function requestBudgetComputation(
     const result = await executeBudgetAlgorithm(input);
     return result;
   } catch (error) {
+    // Invalid or infeasible inputs fail the same way on every retry
+    if (error instanceof BudgetAlgorithmError) {
+      throw error;
+    }
     console.error('Error:', error);
     return null;
   }
@@ -51,11 +46,11 @@ async function requestBudgetComputation(
 
 function getUpdatedFinancing(
   financing: { exAnte: number; exPost: number },
-  strategies: any,
+  breakdowns: BudgetBreakdowns,
   optimizeFinancing: boolean,
 ): { exAnte: number; exPost: number } {
   if (optimizeFinancing) {
-    const { totalExAnte, totalExPost } = calculateTotalQuantitiesFinancing(strategies);
+    const { exAnte: totalExAnte, exPost: totalExPost } = breakdowns.quantityByFinancing;
     let exAntePercentage = totalExAnte / (totalExAnte + totalExPost);
     let exPostPercentage = 1 - exAntePercentage;
     return { exAnte: exAntePercentage, exPost: exPostPercentage };
@@ -65,12 +60,11 @@ function getUpdatedFinancing(
 
 function getUpdatedRegionAllocation(
   regionAllocation: RegionAllocation,
-  strategies: any,
+  breakdowns: BudgetBreakdowns,
   optimizeRegion: boolean,
 ): RegionAllocation {
   if (optimizeRegion) {
-    const totalQuantities = calculateTotalQuantitiesRegionAllocation(strategies);
-    return normalizeRegionAllocation(totalQuantities);
+    return normalizeRegionAllocation(breakdowns.quantityByRegion);
   }
   return regionAllocation;
 }
@@ -91,20 +85,18 @@ export async function runBudgetAlgo(input: BudgetAlgorithmInput): Promise<Budget
   const response = await requestBudgetComputation(sanitizedInput);
   if (!response) throw new Error('Failed to fetch budget or strategies data from backend.');
 
-  const { totalBudgetLow, totalBudgetMedium, totalBudgetHigh, strategies } = response;
-  if (!totalBudgetLow || !totalBudgetMedium || !totalBudgetHigh || !strategies) {
+  const { totalBudgetLow, totalBudgetMedium, totalBudgetHigh, strategies, breakdowns } = response;
+  if (!totalBudgetLow || !totalBudgetMedium || !totalBudgetHigh || !strategies || !breakdowns) {
     throw new Error('Missing required data from backend response.');
   }
 
-  const updatedFinancing = getUpdatedFinancing(financing, strategies, optimizeFinancing);
+  const updatedFinancing = getUpdatedFinancing(financing, breakdowns, optimizeFinancing);
   const updatedRegionAllocation = getUpdatedRegionAllocation(
     regionAllocation,
-    strategies,
+    breakdowns,
     optimizeRegion,
   );
-  const costByTypology: CostByTypology = getTotalCostPerTypes(strategies);
-  const costByRegion: CostByRegion = getTotalCostPerRegions(strategies);
-  const { totalCostExAnte, totalCostExPost } = calculateTotalCostsFinancing(strategies);
+  const { costByTypology, costByRegion, costByFinancing } = breakdowns;
 
   const algoRes: BudgetOutputData = {
     financing: updatedFinancing,
@@ -121,13 +113,13 @@ export async function runBudgetAlgo(input: BudgetAlgorithmInput): Promise<Budget
     average_price_per_ton_medium: totalBudgetMedium / carbonToOffset,
     average_price_per_ton_high: totalBudgetHigh / carbonToOffset,
     total_cost_flexible: totalBudgetMedium,
-    cost_ex_post: totalCostExPost,
-    cost_ex_ante: totalCostExAnte,
-    cost_nbs_removal: costByTypology.costNbsRemoval,
-    cost_nbs_avoidance: costByTypology.costNbsAvoidance,
-    cost_renewable_energy: costByTypology.costRenewableEnergy,
-    cost_biochar: costByTypology.costBiochar,
-    cost_dac: costByTypology.costDac,
+    cost_ex_post: costByFinancing.exPost,
+    cost_ex_ante: costByFinancing.exAnte,
+    cost_nbs_removal: costByTypology.nbsRemoval,
+    cost_nbs_avoidance: costByTypology.nbsAvoidance,
+    cost_renewable_energy: costByTypology.renewableEnergy,
+    cost_biochar: costByTypology.biochar,
+    cost_dac: costByTypology.dac,
     cost_north_america: costByRegion.northAmerica,
     cost_south_america: costByRegion.southAmerica,
     cost_europe: costByRegion.europe,
@@ -1,134 +1,141 @@
 import { PythonShell, Options } from 'python-shell';
 import path from 'path';
-import {
-  BudgetAlgorithmInput,
-  PurchaseEntry,
-  YearlyStrategy,
-  FinancingPurchaseDetails,
-} from '@/types/types';
-import { typologyCostFactors } from '@/constants/forecasts';
+import { BudgetAlgorithmInput, BudgetPythonResponse } from '@/types/types';
+
+type WorkerResponse = {
+  id: number;
+  result?: BudgetPythonResponse;
+  error?: string;
+  status?: BudgetErrorStatus;
+  code?: string;
+};
+type PendingRequest = {
+  resolve: (result: BudgetPythonResponse) => void;
+  reject: (error: Error) => void;
+};
+
+// `invalid` and `infeasible` requests fail again when retried, see algo_budget/errors.py
+export type BudgetErrorStatus = 'invalid' | 'infeasible' | 'unbounded' | 'not_solved' | 'error';
+
+export class BudgetAlgorithmError extends Error {
+  constructor(
+    message: string,
+    readonly status: BudgetErrorStatus,
+    readonly code: string,
+  ) {
+    super(message);
+    this.name = 'BudgetAlgorithmError';
+  }
+}
 
-export async function executeBudgetAlgorithm(inputData: BudgetAlgorithmInput) {
-  const scriptPath =
+const scriptPath =
+  process.env.NODE_ENV === 'production'
+    ? '/usr/src/app/src/python-scripts/algo_budget/main.py' // in prod
+    : path.join(process.cwd(), 'src/python-scripts', 'algo_budget', 'main.py'); // in dev
+
+const workerOptions: Options = {
+  mode: 'json',
+  pythonPath:
     process.env.NODE_ENV === 'production'
-      ? '/usr/src/app/src/python-scripts/algo_budget/main.py' // in prod
-      : path.join(process.cwd(), 'src/python-scripts', 'algo_budget', 'main.py'); // in dev
+      ? '/venv/bin/python3' // in prod
+      : path.join(process.cwd(), 'venv', 'bin', 'python3'), // in dev
+  args: ['--worker'],
+};
+
+// A request not answered by then, queue time included, fails and restarts the worker
+const WORKER_TIMEOUT_MS = Number(process.env.BUDGET_WORKER_TIMEOUT_MS ?? 120_000);
+
+type BudgetWorker = {
+  shell: PythonShell;
+  pending: Map<number, PendingRequest>;
+  restart: (error: Error) => void;
+};
+
+// Long-lived `main.py --worker` process, restarted on the next request if it exits
+let budgetWorker: BudgetWorker | null = null;
+let nextRequestId = 0;
+
+function getBudgetWorker() {
+  if (budgetWorker) {
+    return budgetWorker;
+  }
 
-  const options: Options = {
-    mode: 'text',
-    pythonPath:
-      process.env.NODE_ENV === 'production'
-        ? '/venv/bin/python3' // in prod
-        : path.join(process.cwd(), 'venv', 'bin', 'python3'), // in dev
-    args: [JSON.stringify(inputData)],
+  const fail = (error: Error) => {
+    if (budgetWorker === worker) {
+      budgetWorker = null;
+    }
+    worker.pending.forEach((request) => request.reject(error));
+    worker.pending.clear();
   };
 
-  try {
-    const data = await PythonShell.run(scriptPath, options);
-    const parsedData = JSON.parse(data[0]);
-    const parsedResults: PurchaseEntry[] = parsedData.results;
-
-    // Filter out purchases with quantities less than 10
-    const filteredResults = parsedResults.filter((entry) => entry.quantity >= 10);
-
-    const yearlyStrategiesMap = new Map<number, YearlyStrategy>();
-    let totalBudgetLow: number = 0;
-    let totalBudgetMedium: number = 0;
-    let totalBudgetHigh: number = 0;
-
-    filteredResults.forEach((entry) => {
-      const { year, quantity, typology, region, price, type } = entry;
-
-      let yearlyStrategy = yearlyStrategiesMap.get(year);
-      if (!yearlyStrategy) {
-        yearlyStrategy = {
-          year,
-          quantity_purchased: 0,
-          cost_low: 0,
-          cost_medium: 0,
-          cost_high: 0,
-          types_purchased: [],
-        };
-        yearlyStrategiesMap.set(year, yearlyStrategy);
-      }
-
-      yearlyStrategy.quantity_purchased += quantity;
-
-      const cost = quantity * price;
-      if (!(typology in typologyCostFactors)) {
-        throw new Error(`Unknown typology: ${typology}`);
-      }
-      const factors = typologyCostFactors[typology];
-      const costLow = cost * factors.low;
-      const costHigh = cost * factors.high;
-
-      yearlyStrategy.cost_medium += cost;
-      yearlyStrategy.cost_low += costLow;
-      yearlyStrategy.cost_high += costHigh;
-
-      totalBudgetMedium += cost;
-      totalBudgetLow += costLow;
-      totalBudgetHigh += costHigh;
-
-      let typologyBreakdown = yearlyStrategy.types_purchased.find((tp) => tp.typology === typology);
-      if (!typologyBreakdown) {
-        typologyBreakdown = {
-          typology,
-          exAnte: {
-            quantity: 0,
-            regions: [],
-            price_per_ton: 0,
-            cost: 0,
-          },
-          exPost: {
-            quantity: 0,
-            regions: [],
-            price_per_ton: 0,
-            cost: 0,
-          },
-        };
-        yearlyStrategy.types_purchased.push(typologyBreakdown);
-      }
-
-      let financingDetails: FinancingPurchaseDetails;
-      if (type === 'ex-ante') {
-        financingDetails = typologyBreakdown.exAnte;
-      } else if (type === 'ex-post') {
-        financingDetails = typologyBreakdown.exPost;
-      } else {
-        throw new Error(`Unknown financing type: ${type}`);
-      }
-
-      financingDetails.quantity += quantity;
-      financingDetails.cost += cost;
-
-      financingDetails.price_per_ton = financingDetails.cost / financingDetails.quantity;
-
-      let regionPurchase = financingDetails.regions.find((rp) => rp.region === region);
-      if (!regionPurchase) {
-        regionPurchase = {
-          region,
-          quantity: 0,
-          cost: 0,
-        };
-        financingDetails.regions.push(regionPurchase);
-      }
+  const worker: BudgetWorker = {
+    shell: new PythonShell(scriptPath, workerOptions),
+    pending: new Map<number, PendingRequest>(),
+    // A stalled worker is dropped with its queue, the next request starts a new one
+    restart: (error: Error) => {
+      fail(error);
+      worker.shell.kill();
+    },
+  };
 
-      regionPurchase.quantity += quantity;
-      regionPurchase.cost += cost;
-    });
+  worker.shell.on('message', (response: WorkerResponse) => {
+    const request = worker.pending.get(response.id);
+    if (!request) {
+      return;
+    }
+    worker.pending.delete(response.id);
+    if (response.error && response.status && response.code) {
+      request.reject(new BudgetAlgorithmError(response.error, response.status, response.code));
+    } else if (response.error || !response.result) {
+      request.reject(new Error(response.error ?? 'Empty response from Python worker'));
+    } else {
+      request.resolve(response.result);
+    }
+  });
+  worker.shell.on('pythonError', fail);
+  worker.shell.on('error', fail);
+  worker.shell.on('close', () => fail(new Error('Python worker exited')));
+
+  budgetWorker = worker;
+  return worker;
+}
 
-    const sortedStrategies = Array.from(yearlyStrategiesMap.values()).sort(
-      (a, b) => a.year - b.year,
+function runBudgetWorker(inputData: BudgetAlgorithmInput) {
+  const worker = getBudgetWorker();
+  const id = nextRequestId++;
+  return new Promise<BudgetPythonResponse>((resolve, reject) => {
+    const timer = setTimeout(
+      () => worker.restart(new Error(`Python worker timed out after ${WORKER_TIMEOUT_MS} ms`)),
+      WORKER_TIMEOUT_MS,
     );
+    worker.pending.set(id, {
+      resolve: (result) => {
+        clearTimeout(timer);
+        resolve(result);
+      },
+      reject: (error) => {
+        clearTimeout(timer);
+        reject(error);
+      },
+    });
+    // The raw purchases are not used, columnar is their smallest JSON encoding
+    worker.shell.send({
+      id,
+      input: { ...inputData, aggregate: true, format: 'columnar', session: true },
+    });
+  });
+}
 
-    return {
-      totalBudgetLow,
-      totalBudgetMedium,
-      totalBudgetHigh,
-      strategies: sortedStrategies,
-    };
+export async function executeBudgetAlgorithm(
+  inputData: BudgetAlgorithmInput,
+): Promise<BudgetPythonResponse> {
+  try {
+    // Yearly strategies, budgets and breakdowns are aggregated by algo_budget
+    return await runBudgetWorker(inputData);
   } catch (err) {
+    if (err instanceof BudgetAlgorithmError) {
+      throw err;
+    }
     console.error('Error executing Python script:', err);
     throw new Error('Failed to execute Python script');
   }
@@ -1,52 +1,51 @@
-import pulp as p
-import json
-import sys
-from enum import Enum
+import numpy as np
 
-from pulp import lpSum
-from typing import TypedDict, Dict
+from typing import Dict, Optional
 
-from models import Financing, Typology, RegionAllocation, TimeConstraint, CarbonNeeds
-from constants import (x_coefficients, coefficients, regional_factors)
+from diagnostics import Profiler
+from errors import BudgetError
+from models import Financing, Typology, RegionAllocation, TimeConstraint, Cadence, BudgetBand
+from model_builder import build_model
+from plans import BUDGET_BANDS, plan_years
+from results import extract_purchases, format_results
+from solvers import solve
+from strategies import yearly_strategies
+from templates import template_model
+from tensors import purchase_tensors
 
 
-# TODO : Write asserts to verify that for each parameter, the sum of the entered fields equals 1
-BASE_YEAR = 2025
+def purchase_years(cadence: Cadence, last_year: int) -> np.ndarray:
+    """plans.plan_years as an array."""
+    return np.array(plan_years(cadence, last_year))
 
 
-def extend_series(values, required_length, mode="linear"):
-    series = list(values)
-    if required_length <= len(series):
-        return series
-
-    if not series:
-        return series
-
-    if mode == "flat":
-        series.extend([series[-1]] * (required_length - len(series)))
-        return series
-
-    delta = series[-1] - series[-2] if len(series) > 1 else 0
-    for _ in range(required_length - len(series)):
-        next_value = series[-1] + delta
-        if next_value < 0:
-            next_value = 0
-        series.append(next_value)
-    return series
-
+def plan_periods(cadence: Cadence, carbon_needs: Dict[int, int]):
+    """Purchase years, and the period covering each need : the last purchase year before it."""
+    last_year = max(int(year) for year in carbon_needs.keys())
+    years = purchase_years(cadence, last_year)
 
-def trailing_window(values, required_length, mode="flat"):
-    extended = extend_series(values, max(required_length, len(values)), mode=mode)
-    return extended[-required_length:]
+    need_years = np.array([int(year) for year in carbon_needs.keys()])
+    need_periods = np.searchsorted(years, need_years, side="right") - 1
+    return years, need_periods
 
 
-def yearlyAlgo(
+def budgetAlgo(
     financing: Financing,
     typology: Typology,
     region_allocation: RegionAllocation,
     carbon_needs: Dict[int, int],
     optimizeFinancing: bool,
-    optimizeRegion: bool
+    optimizeRegion: bool,
+    cadence: Cadence = 1,
+    budget_band: Optional[BudgetBand] = None,
+    cumulative_needs: bool = False,
+    solver: Optional[str] = None,
+    profiler: Optional[Profiler] = None,
+    result_format: str = "records",
+    aggregate: bool = False,
+    duals: bool = False,
+    time_limit: Optional[float] = None,
+    uncertainty: Optional[dict] = None,
 ):
     """
 
@@ -55,6 +54,19 @@ def yearlyAlgo(
         typology : Distribution of project typologies.
         region_allocation : Region allocation distribution.
         carbon_needs (Dict[int, int]): Carbon needs specified dynamically for various years between 2025 and 2050.
+        cadence : Purchase every `cadence` years from 2025 (1, 2, 3, 5, 10...), or a list of purchase years.
+            A need is covered by the purchases made up to the last purchase year before it.
+        budget_band : (min, max) share of the total budget spent in each purchase period, None for no constraint.
+        cumulative_needs : Formulate the carbon needs on cumulative delivered stock variables (O(1) terms per need).
+        solver : "highs" (in-process) or "cbc", defaults to solvers.DEFAULT_SOLVER.
+        profiler : Collects the timings and sizes of the solve phases.
+        result_format : "records", "columnar" or "binary", see results.py.
+        aggregate : Add the yearly strategies, low/medium/high budgets and breakdowns, see strategies.py.
+        duals : Add the shadow prices of the need, share and budget band rows, and their ranging, see duals.py.
+        time_limit : Seconds the solver may run, None for no limit. A solve stopped by it returns a feasible
+            plan ("optimal": false with its "gap"), see heuristics.py.
+        uncertainty : Options of uncertainty.uncertainty_options, adds the cost distribution of the plan under
+            sampled price paths, see uncertainty.py.
 
     Example:
         financing = {
@@ -80,2130 +92,152 @@ def yearlyAlgo(
             2040: 15_000_000,
             2050: 40_000_000
             }
+        cadence = 5
+        budget_band = (0.015, 0.40)
 
     """
 
-    Lp_prob = p.LpProblem('Kalculator_optimization', p.LpMinimize)
-
-    ###############
-    # variables
-    #############
-
-    last_year = max(int(year) for year in carbon_needs.keys())
-    last_year_index = last_year - BASE_YEAR
-    required_length = last_year_index + 1
-
-    # Geographic Regions
-    regions = ["northAmerica", "southAmerica",
-               "europe", "africa", "asia", "oceania"]
-
-    # Project typologies and their code
-    projects = {
-        "nbsRemoval": 1,
-        "nbsAvoidance": 2,
-        "dac": 3,
-        "biochar": 4,
-        "renewableEnergy": 5
-    }
-
-    # Purchase variables (ex-post and ex-ante) by typology, year and region
-    x_vars = {}  # Ex-post purchases
-    y_vars = {}  # Ex-ante purchases
-
-    # Dynamic creation of variables for years from 1 to last_year_index + 1
-    for project, code in projects.items():
-        x_vars[project] = {
-            region: [
-                p.LpVariable(f"x{code}_{region}_{year}", lowBound=0)
-                for year in range(1, last_year_index + 2)
-            ] for region in regions
-        }
-        y_vars[project] = {
-            region: [
-                p.LpVariable(f"y{code}_{region}_{year}", lowBound=0)
-                for year in range(1, last_year_index + 2)
-            ] for region in regions
-        }
-
-    # z: Common upper bound variable
-    z = p.LpVariable("z", lowBound=0)
-
-    # z: Common lower bound variable (used for yearly budget strategy)
-    z_min = p.LpVariable("z_min", lowBound=0)
-
-    # total_purch_for_on_spot_fwd : total purchases variable 'on spot vs forward' constraint
-    total_purch_for_on_spot_fwd = p.LpVariable(
-        "total_purch_for_on_spot_fwd", lowBound=0)
-
-    # total_purch_for_typo_distrib : total purchases variable used for the typologies distribution
-    total_purch_for_typo_distrib = p.LpVariable(
-        "total_purch_for_typo_distrib", lowBound=0)
-
-    # Group all the variables into a single list
-    variables = (
-        # Ex-post (x) and ex-ante (y) variables for all typologies, regions, and years
-        [x_vars[project][region][year]
-         for project in x_vars
-         for region in x_vars[project]
-         for year in range(last_year_index + 1)] +  # Ex-post variables
-
-        [y_vars[project][region][year]
-         for project in y_vars
-         for region in y_vars[project]
-         for year in range(last_year_index + 1)]  # Ex-ante variables
-    )
-
-    #####################
-    # Objective function
-    #################
-
-    # Generation of coefficients by region, project, and year
-    regional_coefficients = {
-        "x": {},
-        "y": {}
-    }
-
-    for project, base_coefficients in x_coefficients.items():
-        # Obtenir les facteurs régionaux pour le projet
-        project_region_factors = regional_factors[project]
-        extended_coefficients = extend_series(base_coefficients, required_length, mode="linear")
-        regional_coefficients["x"][project] = {
-            region: [c * factor for c in extended_coefficients]
-            for region, factor in project_region_factors.items()
-        }
-        regional_coefficients["y"][project] = {
-            region: [c * 0.87 for c in regional_coefficients["x"][project][region]]
-            for region in regional_coefficients["x"][project]
-        }
-
-    # Objective function
-    Lp_prob += (
-        # NbS-ARR
-        lpSum(
-            regional_coefficients["x"]["nbsRemoval"][region][year] *
-            x_vars["nbsRemoval"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        lpSum(
-            regional_coefficients["y"]["nbsRemoval"][region][year] *
-            y_vars["nbsRemoval"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-
-        # nbsAvoidance
-        lpSum(
-            regional_coefficients["x"]["nbsAvoidance"][region][year] *
-            x_vars["nbsAvoidance"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        lpSum(
-            regional_coefficients["y"]["nbsAvoidance"][region][year] *
-            y_vars["nbsAvoidance"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-
-        # biochar
-        lpSum(
-            regional_coefficients["x"]["biochar"][region][year] *
-            x_vars["biochar"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        lpSum(
-            regional_coefficients["y"]["biochar"][region][year] *
-            y_vars["biochar"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-
-        # dac
-        lpSum(
-            regional_coefficients["x"]["dac"][region][year] *
-            x_vars["dac"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        lpSum(
-            regional_coefficients["y"]["dac"][region][year] *
-            y_vars["dac"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-
-        # renewableEnergy
-        lpSum(
-            regional_coefficients["x"]["renewableEnergy"][region][year] *
-            x_vars["renewableEnergy"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        lpSum(
-            regional_coefficients["y"]["renewableEnergy"][region][year] *
-            y_vars["renewableEnergy"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        )
-    )
-
-    #################
-    # Constraints
-    ###############
-
-    ## Constraint : Yearly budget timeline##
-
-    
-    
-    Lp_prob += z_min >= 0.015 * (
-        # NbS-ARR
-        lpSum(
-            x_vars["nbsRemoval"][region][year] * regional_coefficients["x"]["nbsRemoval"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        lpSum(
-            y_vars["nbsRemoval"][region][year] * regional_coefficients["y"]["nbsRemoval"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-
-        # nbsAvoidance
-        lpSum(
-            x_vars["nbsAvoidance"][region][year] * regional_coefficients["x"]["nbsAvoidance"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        lpSum(
-            y_vars["nbsAvoidance"][region][year] * regional_coefficients["y"]["nbsAvoidance"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-
-        # biochar
-        lpSum(
-            x_vars["biochar"][region][year] * regional_coefficients["x"]["biochar"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        lpSum(
-            y_vars["biochar"][region][year] * regional_coefficients["y"]["biochar"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-
-        # dac
-        lpSum(
-            x_vars["dac"][region][year] * regional_coefficients["x"]["dac"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        lpSum(
-            y_vars["dac"][region][year] * regional_coefficients["y"]["dac"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-
-        # renewableEnergy
-        lpSum(
-            x_vars["renewableEnergy"][region][year] * regional_coefficients["x"]["renewableEnergy"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        lpSum(
-            y_vars["renewableEnergy"][region][year] * regional_coefficients["y"]["renewableEnergy"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        )
-    )
-
-    for year in range(last_year_index + 1):
-        Lp_prob += (
-            # NbS-ARR
-            lpSum(
-                x_vars["nbsRemoval"][region][year] * regional_coefficients["x"]["nbsRemoval"][region][year] +
-                y_vars["nbsRemoval"][region][year] * \
-                regional_coefficients["y"]["nbsRemoval"][region][year]
-                for region in regions
-            ) +
-
-            # nbsAvoidance
-            lpSum(
-                x_vars["nbsAvoidance"][region][year] * regional_coefficients["x"]["nbsAvoidance"][region][year] +
-                y_vars["nbsAvoidance"][region][year] * \
-                regional_coefficients["y"]["nbsAvoidance"][region][year]
-                for region in regions
-            ) +
-
-            # biochar
-            lpSum(
-                x_vars["biochar"][region][year] * regional_coefficients["x"]["biochar"][region][year] +
-                y_vars["biochar"][region][year] * \
-                regional_coefficients["y"]["biochar"][region][year]
-                for region in regions
-            ) +
-
-            # dac
-            lpSum(
-                x_vars["dac"][region][year] * regional_coefficients["x"]["dac"][region][year] +
-                y_vars["dac"][region][year] * \
-                regional_coefficients["y"]["dac"][region][year]
-                for region in regions
-            ) +
-
-            # renewableEnergy
-            lpSum(
-                x_vars["renewableEnergy"][region][year] * regional_coefficients["x"]["renewableEnergy"][region][year] +
-                y_vars["renewableEnergy"][region][year] * \
-                regional_coefficients["y"]["renewableEnergy"][region][year]
-                for region in regions
-            ) >= z_min
-        )
-
-    ## Contraint : balanced upper bound of purchases per year##
-
-    Lp_prob += z <= 0.08 * (
-    # NbS-ARR
-    lpSum(
-        x_vars["nbsRemoval"][region][year] * regional_coefficients["x"]["nbsRemoval"][region][year]
-        for region in regions
-        for year in range(last_year_index + 1)
-    ) +
-    lpSum(
-        y_vars["nbsRemoval"][region][year] * regional_coefficients["y"]["nbsRemoval"][region][year]
-        for region in regions
-        for year in range(last_year_index + 1)
-    ) +
-
-    # nbsAvoidance
-    lpSum(
-        x_vars["nbsAvoidance"][region][year] * regional_coefficients["x"]["nbsAvoidance"][region][year]
-        for region in regions
-        for year in range(last_year_index + 1)
-    ) +
-    lpSum(
-        y_vars["nbsAvoidance"][region][year] * regional_coefficients["y"]["nbsAvoidance"][region][year]
-        for region in regions
-        for year in range(last_year_index + 1)
-    ) +
-
-    # biochar
-    lpSum(
-        x_vars["biochar"][region][year] * regional_coefficients["x"]["biochar"][region][year]
-        for region in regions
-        for year in range(last_year_index + 1)
-    ) +
-    lpSum(
-        y_vars["biochar"][region][year] * regional_coefficients["y"]["biochar"][region][year]
-        for region in regions
-        for year in range(last_year_index + 1)
-    ) +
-
-    # dac
-    lpSum(
-        x_vars["dac"][region][year] * regional_coefficients["x"]["dac"][region][year]
-        for region in regions
-        for year in range(last_year_index + 1)
-    ) +
-    lpSum(
-        y_vars["dac"][region][year] * regional_coefficients["y"]["dac"][region][year]
-        for region in regions
-        for year in range(last_year_index + 1)
-    ) +
-
-    # renewableEnergy
-    lpSum(
-        x_vars["renewableEnergy"][region][year] * regional_coefficients["x"]["renewableEnergy"][region][year]
-        for region in regions
-        for year in range(last_year_index + 1)
-    ) +
-    lpSum(
-        y_vars["renewableEnergy"][region][year] * regional_coefficients["y"]["renewableEnergy"][region][year]
-        for region in regions
-        for year in range(last_year_index + 1)
-    )
-)
-
-    for year in range(last_year_index + 1):
-        Lp_prob += (
-            # NbS-ARR
-            lpSum(
-                x_vars["nbsRemoval"][region][year] * regional_coefficients["x"]["nbsRemoval"][region][year] +
-                y_vars["nbsRemoval"][region][year] * regional_coefficients["y"]["nbsRemoval"][region][year]
-                for region in regions
-            ) +
-
-            # nbsAvoidance
-            lpSum(
-                x_vars["nbsAvoidance"][region][year] * regional_coefficients["x"]["nbsAvoidance"][region][year] +
-                y_vars["nbsAvoidance"][region][year] * regional_coefficients["y"]["nbsAvoidance"][region][year]
-                for region in regions
-            ) +
-
-            # biochar
-            lpSum(
-                x_vars["biochar"][region][year] * regional_coefficients["x"]["biochar"][region][year] +
-                y_vars["biochar"][region][year] * regional_coefficients["y"]["biochar"][region][year]
-                for region in regions
-            ) +
-
-            # dac
-            lpSum(
-                x_vars["dac"][region][year] * regional_coefficients["x"]["dac"][region][year] +
-                y_vars["dac"][region][year] * regional_coefficients["y"]["dac"][region][year]
-                for region in regions
-            ) +
-
-            # renewableEnergy
-            lpSum(
-                x_vars["renewableEnergy"][region][year] * regional_coefficients["x"]["renewableEnergy"][region][year] +
-                y_vars["renewableEnergy"][region][year] * regional_coefficients["y"]["renewableEnergy"][region][year]
-                for region in regions
-            ) <= z
-        )
-
-    ## Constraint : On spot vs Forward ##
-    Lp_prob += (
-        total_purch_for_on_spot_fwd ==
-        # NbS-ARR
-        lpSum(
-            x_vars["nbsRemoval"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        lpSum(
-            y_vars["nbsRemoval"][region][year] *
-            trailing_window(coefficients["nbsRemoval"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        # nbsAvoidance
-        lpSum(
-            x_vars["nbsAvoidance"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        lpSum(
-            y_vars["nbsAvoidance"][region][year] *
-            trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        # biochar
-        lpSum(
-            x_vars["biochar"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        lpSum(
-            y_vars["biochar"][region][year] *
-            trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        # dac
-        lpSum(
-            x_vars["dac"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        lpSum(
-            y_vars["dac"][region][year] *
-            trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        # renewableEnergy
-        lpSum(
-            x_vars["renewableEnergy"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        lpSum(
-            y_vars["renewableEnergy"][region][year] *
-            trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        )
+    profiler = profiler or Profiler()
+    years, price, model = budget_model(
+        financing, typology, region_allocation, carbon_needs, optimizeFinancing, optimizeRegion,
+        cadence, budget_band, cumulative_needs, profiler,
     )
-
-    if not optimizeFinancing:
-        Lp_prob += (
-            # NbS-ARR
-            lpSum(
-                x_vars["nbsRemoval"][region][year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            ) +
-
-            # nbsAvoidance
-            lpSum(
-                x_vars["nbsAvoidance"][region][year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            ) +
-
-            # biochar
-            lpSum(
-                x_vars["biochar"][region][year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            ) +
-
-            # dac
-            lpSum(
-                x_vars["dac"][region][year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            ) +
-
-            # renewableEnergy
-            lpSum(
-                x_vars["renewableEnergy"][region][year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            )
-            == financing["exPost"] * total_purch_for_on_spot_fwd
-        )
-
-        Lp_prob += (
-            # NbS-ARR
-            lpSum(
-                y_vars["nbsRemoval"][region][year] *
-                trailing_window(coefficients["nbsRemoval"], required_length, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            ) +
-
-            # nbsAvoidance
-            lpSum(
-                y_vars["nbsAvoidance"][region][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            ) +
-
-            # biochar
-            lpSum(
-                y_vars["biochar"][region][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            ) +
-
-            # dac
-            lpSum(
-                y_vars["dac"][region][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            ) +
-
-            # renewableEnergy
-            lpSum(
-                y_vars["renewableEnergy"][region][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            )
-
-            == financing["exAnte"] * total_purch_for_on_spot_fwd
-        )
-
-    ## Constraint : distribution of project typologies##
-
-    Lp_prob += (
-        total_purch_for_typo_distrib ==
-        # NbS-ARR
-        lpSum(
-            x_vars["nbsRemoval"][region][year] +
-            y_vars["nbsRemoval"][region][year] *
-            trailing_window(coefficients["nbsRemoval"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-
-        # nbsAvoidance
-        lpSum(
-            x_vars["nbsAvoidance"][region][year] +
-            y_vars["nbsAvoidance"][region][year] *
-            trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-
-        # biochar
-        lpSum(
-            x_vars["biochar"][region][year] +
-            y_vars["biochar"][region][year] *
-            trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-
-        # dac
-        lpSum(
-            x_vars["dac"][region][year] +
-            y_vars["dac"][region][year] *
-            trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-
-        # renewableEnergy
-        lpSum(
-            x_vars["renewableEnergy"][region][year] +
-            y_vars["renewableEnergy"][region][year] *
-            trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        )
-    )
-
-    # NbS-ARR
-    Lp_prob += (
-        lpSum(
-            x_vars["nbsRemoval"][region][year] +
-            y_vars["nbsRemoval"][region][year] *
-            trailing_window(coefficients["nbsRemoval"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) == typology["nbsRemoval"] * total_purch_for_typo_distrib
-    )
-
-    # nbsAvoidance
-    Lp_prob += (
-        lpSum(
-            x_vars["nbsAvoidance"][region][year] +
-            y_vars["nbsAvoidance"][region][year] *
-            trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) == typology["nbsAvoidance"] * total_purch_for_typo_distrib
-    )
-
-    # dac
-    Lp_prob += (
-        lpSum(
-            x_vars["dac"][region][year] +
-            y_vars["dac"][region][year] *
-            trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) == typology["dac"] * total_purch_for_typo_distrib
+    return solve_sparse_model(
+        years, price, model, solver, profiler, result_format, aggregate,
+        [int(year) for year in carbon_needs.keys()] if duals else None, time_limit, uncertainty,
     )
 
-    # biochar
-    Lp_prob += (
-        lpSum(
-            x_vars["biochar"][region][year] +
-            y_vars["biochar"][region][year] *
-            trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) == typology["biochar"] * total_purch_for_typo_distrib
-    )
-
-    # renewableEnergy
-    Lp_prob += (
-        lpSum(
-            x_vars["renewableEnergy"][region][year] +
-            y_vars["renewableEnergy"][region][year] *
-            trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) == typology["renewableEnergy"] * total_purch_for_typo_distrib
-    )
-
-    if not optimizeRegion:
-        ## Constraint: Distribution of geographical areas ##
-        
-        # total_purch_for_geo_distrib : total purchases variable used for geographical areas distribution
-        total_purch_for_geo_distrib = p.LpVariable(
-            "total_purch_for_geo_distrib", lowBound=0)
-
-        # Total purchases for geographical distribution
-        Lp_prob += (
-            total_purch_for_geo_distrib ==
-            # NbS-ARR
-            lpSum(
-                x_vars["nbsRemoval"][region][year] +
-                y_vars["nbsRemoval"][region][year] *
-                trailing_window(coefficients["nbsRemoval"], required_length, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            ) +
-
-            # nbsAvoidance
-            lpSum(
-                x_vars["nbsAvoidance"][region][year] +
-                y_vars["nbsAvoidance"][region][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            ) +
-
-            # biochar
-            lpSum(
-                x_vars["biochar"][region][year] +
-                y_vars["biochar"][region][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            ) +
 
-            # dac
-            lpSum(
-                x_vars["dac"][region][year] +
-                y_vars["dac"][region][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            ) +
-
-            # renewableEnergy
-            lpSum(
-                x_vars["renewableEnergy"][region][year] +
-                y_vars["renewableEnergy"][region][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            )
-        )
-
-        # northAmerica
-        Lp_prob += ((
-            lpSum(
-                x_vars["nbsRemoval"]["northAmerica"][year] +
-                y_vars["nbsRemoval"]["northAmerica"][year] *
-                trailing_window(coefficients["nbsRemoval"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["nbsAvoidance"]["northAmerica"][year] +
-                y_vars["nbsAvoidance"]["northAmerica"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["biochar"]["northAmerica"][year] +
-                y_vars["biochar"]["northAmerica"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["dac"]["northAmerica"][year] +
-                y_vars["dac"]["northAmerica"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["renewableEnergy"]["northAmerica"][year] +
-                y_vars["renewableEnergy"]["northAmerica"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            )
-        ) == region_allocation["northAmerica"] * total_purch_for_typo_distrib
-        )
-
-        # southAmerica
-        Lp_prob += ((
-            lpSum(
-                x_vars["nbsRemoval"]["southAmerica"][year] +
-                y_vars["nbsRemoval"]["southAmerica"][year] *
-                trailing_window(coefficients["nbsRemoval"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["nbsAvoidance"]["southAmerica"][year] +
-                y_vars["nbsAvoidance"]["southAmerica"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["biochar"]["southAmerica"][year] +
-                y_vars["biochar"]["southAmerica"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["dac"]["southAmerica"][year] +
-                y_vars["dac"]["southAmerica"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["renewableEnergy"]["southAmerica"][year] +
-                y_vars["renewableEnergy"]["southAmerica"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            )
-        ) == region_allocation["southAmerica"] * total_purch_for_typo_distrib
-        )
-
-        # europe
-        Lp_prob += ((
-            lpSum(
-                x_vars["nbsRemoval"]["europe"][year] +
-                y_vars["nbsRemoval"]["europe"][year] *
-                trailing_window(coefficients["nbsRemoval"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["nbsAvoidance"]["europe"][year] +
-                y_vars["nbsAvoidance"]["europe"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["biochar"]["europe"][year] +
-                y_vars["biochar"]["europe"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["dac"]["europe"][year] +
-                y_vars["dac"]["europe"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["renewableEnergy"]["europe"][year] +
-                y_vars["renewableEnergy"]["europe"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            )
-        ) == region_allocation["europe"] * total_purch_for_typo_distrib
-        )
-
-        # africa
-        Lp_prob += ((
-            lpSum(
-                x_vars["nbsRemoval"]["africa"][year] +
-                y_vars["nbsRemoval"]["africa"][year] *
-                trailing_window(coefficients["nbsRemoval"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["nbsAvoidance"]["africa"][year] +
-                y_vars["nbsAvoidance"]["africa"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["biochar"]["africa"][year] +
-                y_vars["biochar"]["africa"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["dac"]["africa"][year] +
-                y_vars["dac"]["africa"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["renewableEnergy"]["africa"][year] +
-                y_vars["renewableEnergy"]["africa"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            )
-        ) == region_allocation["africa"] * total_purch_for_typo_distrib
-        )
-
-        # asia
-        Lp_prob += ((
-            lpSum(
-                x_vars["nbsRemoval"]["asia"][year] +
-                y_vars["nbsRemoval"]["asia"][year] *
-                trailing_window(coefficients["nbsRemoval"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["nbsAvoidance"]["asia"][year] +
-                y_vars["nbsAvoidance"]["asia"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["biochar"]["asia"][year] +
-                y_vars["biochar"]["asia"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["dac"]["asia"][year] +
-                y_vars["dac"]["asia"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["renewableEnergy"]["asia"][year] +
-                y_vars["renewableEnergy"]["asia"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            )
-        ) == region_allocation["asia"] * total_purch_for_typo_distrib
-        )
-
-        # oceania
-        Lp_prob += ((
-            lpSum(
-                x_vars["nbsRemoval"]["oceania"][year] +
-                y_vars["nbsRemoval"]["oceania"][year] *
-                trailing_window(coefficients["nbsRemoval"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["nbsAvoidance"]["oceania"][year] +
-                y_vars["nbsAvoidance"]["oceania"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["biochar"]["oceania"][year] +
-                y_vars["biochar"]["oceania"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["dac"]["oceania"][year] +
-                y_vars["dac"]["oceania"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["renewableEnergy"]["oceania"][year] +
-                y_vars["renewableEnergy"]["oceania"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            )
-        ) == region_allocation["oceania"] * total_purch_for_typo_distrib
-        )
-
-    ## Constraint : carbon units needs by years##
-
-    # Les contraintes restent ">= besoin" pour chaque année, y compris la dernière.
-    for year, need in carbon_needs.items():
-        year_index = int(year) - 2025
-        start_index = 25 - year_index
-        constraint_expr = (
-            lpSum(
-                x_vars["nbsRemoval"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            ) +
-            lpSum(
-                x_vars["nbsAvoidance"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            ) +
-            lpSum(
-                x_vars["dac"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            ) +
-            lpSum(
-                x_vars["biochar"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            ) +
-            lpSum(
-                x_vars["renewableEnergy"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            ) +
-            lpSum(
-                trailing_window(coefficients["nbsRemoval"], year_index + 1, mode="flat")[t] *
-                y_vars["nbsRemoval"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            ) +
-            lpSum(
-                trailing_window(coefficients["other_types"], year_index + 1, mode="flat")[t] *
-                y_vars["nbsAvoidance"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            ) +
-            lpSum(
-                trailing_window(coefficients["other_types"], year_index + 1, mode="flat")[t] *
-                y_vars["dac"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            ) +
-            lpSum(
-                trailing_window(coefficients["other_types"], year_index + 1, mode="flat")[t] *
-                y_vars["biochar"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            ) +
-            lpSum(
-                trailing_window(coefficients["other_types"], year_index + 1, mode="flat")[t] *
-                y_vars["renewableEnergy"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            )
-        )
-        Lp_prob += constraint_expr >= need
-
-    ## Ensuite, on interdit tout achat après la dernière année ayant un besoin.
-    #for y in range(last_year_index, last_year_index + 1):
-    #    Lp_prob += (
-    #        lpSum(
-    #            x_vars[proj][reg][y] + y_vars[proj][reg][y]
-    #            for proj in projects
-    #            for reg in regions
-    #        ) == 0
-    #    )
-
-    #################
-    # Solving
-    ##############
-
-    Lp_prob.solve(p.PULP_CBC_CMD(msg=False))
-
-    results = []
-
-    for project, code in projects.items():
-        for region in regions:
-            for i, year in enumerate(range(1, last_year_index + 2)):
-                x_var = x_vars[project][region][i]
-                x_value = x_var.value()
-                if x_value > 0:
-                    results.append({
-                        "year": 2024+year,
-                        "quantity": x_value,
-                        "typology": project,
-                        "region": region,
-                        "price": regional_coefficients["x"][project][region][i],
-                        "type": "ex-post"
-                    })
-
-                y_var = y_vars[project][region][i]
-                y_value = y_var.value()
-                if y_value > 0:
-                    results.append({
-                        "year": 2024+year,
-                        "quantity": y_value,
-                        "typology": project,
-                        "region": region,
-                        "price": regional_coefficients["y"][project][region][i],
-                        "type": "ex-ante"
-                    })
-
-    return {
-        "results": results,
-        "total_price": Lp_prob.objective.value()
-    }
-
-def fiveYearAlgo(
+def budget_model(
     financing: Financing,
     typology: Typology,
     region_allocation: RegionAllocation,
     carbon_needs: Dict[int, int],
     optimizeFinancing: bool,
-    optimizeRegion: bool
+    optimizeRegion: bool,
+    cadence: Cadence = 1,
+    budget_band: Optional[BudgetBand] = None,
+    cumulative_needs: bool = False,
+    profiler: Optional[Profiler] = None,
 ):
     """
-
-    Parameters:
-        financing : exPost and exAnte allocations.
-        typology : Distribution of project typologies.
-        region_allocation : Region allocation distribution.
-        carbon_needs (Dict[int, int]): Carbon needs specified dynamically for various years between 2025 and 2050 (step = 5 due to budget strategy).
-
-    Example:
-        financing = {
-        "exPost": 0.4, "exAnte": 0.6
-        }
-        typology = {
-            "nbsRemoval": 0.5,
-            "nbsAvoidance": 0.3,
-            "biochar": 0.1,
-            "dac": 0.05,
-            "renewableEnergy": 0.05
-        }
-        region_allocation = {
-            "northAmerica": 0.1,
-            "southAmerica": 0.2,
-            "europe": 0.3,
-            "africa": 0.2,
-            "asia": 0.1,
-            "oceania": 0.1
-        }
-        carbon_needs = {
-            2025: 5_000_000,
-            2030: 15_000_000,
-            2035: 15_000_000,
-            2040: 17_000_000,
-            2045: 22_000_000,
-            2050: 40_000_000
-            }
+    (years, price, model) of a request : from its compiled template when there
+    is one (see templates.py), else built from the tensors.
     """
+    profiler = profiler or Profiler()
 
-    Lp_prob = p.LpProblem('Kalculator_optimization', p.LpMinimize)
-
-    ####################
-    # Variables
-    ##################
-
-    last_year = max(int(year) for year in carbon_needs.keys())
-    last_year_index = last_year - BASE_YEAR
-    required_length = last_year_index + 1
-
-    last_year_index_div_5 = last_year_index // 5
-    required_length_div_5 = last_year_index_div_5 + 1
-
-    # Geographic Regions
-    regions = ["northAmerica", "southAmerica",
-               "europe", "africa", "asia", "oceania"]
-
-    # Project typologies and their code
-    projects = {
-        "nbsRemoval": 1,
-        "nbsAvoidance": 2,
-        "dac": 3,
-        "biochar": 4,
-        "renewableEnergy": 5
-    }
-
-    # Purchase variables (ex-post and ex-ante) by typology, year and region
-    x_vars = {}  # Ex-post purchases
-    y_vars = {}  # Ex-ante purchases
-
-    # Dynamic creation of variables for years from 1 to last_year_index + 1 (step of 5)
-    for project, code in projects.items():
-        x_vars[project] = {
-            region: [
-                p.LpVariable(f"x{code}_{region}_{year}", lowBound=0)
-                for year in range(1, last_year_index + 2, 5)
-            ] for region in regions
-        }
-        y_vars[project] = {
-            region: [
-                p.LpVariable(f"y{code}_{region}_{year}", lowBound=0)
-                for year in range(1, last_year_index + 2, 5)
-            ] for region in regions
-        }
-
-    # z: Common upper bound variable
-    z = p.LpVariable("z", lowBound=0)
-
-    # z: Common lower bound variable (used for 5 years budget strategy)
-    z_min = p.LpVariable("z_min", lowBound=0)
-
-    # total_purch_for_on_spot_fwd : total purchases variable 'on spot vs forward' constraint
-    total_purch_for_on_spot_fwd = p.LpVariable(
-        "total_purch_for_on_spot_fwd", lowBound=0)
-
-    # total_purch_for_typo_distrib : total purchases variable used for the typologies distribution
-    total_purch_for_typo_distrib = p.LpVariable(
-        "total_purch_for_typo_distrib", lowBound=0)
-
-    # Group all the variables into a single list
-    variables = (
-        # Ex-post (x) and ex-ante (y) variables for all typologies, regions, and years
-        [x_vars[project][region][year]
-         for project in x_vars
-         for region in x_vars[project]
-         for year in range(last_year_index_div_5 + 1)] +  # Ex-post variables
-
-        [y_vars[project][region][year]
-         for project in y_vars
-         for region in y_vars[project]
-         for year in range(last_year_index_div_5 + 1)]  # Ex-ante variables
-    )
-
-    ########################
-    # Objective function
-    ######################
-
-    # Coefficients per year (to be multiplied by regional factors)
-    base_x_coefficients = {
-        "nbsRemoval": [35.158035, 39.87520398, 45.22527759, 49.6880738, 54.59125536, 59.97827917],
-        "nbsAvoidance": [23.76730151, 26.62919538, 29.8356987, 32.61933498, 35.66268132, 38.98996836],
-        "dac": [618.970254, 449.4526759, 326.3609302, 305.6918961, 286.3318696, 268.197949],
-        "biochar": [135.7778991, 111.5772177, 91.6899995, 82.66928321, 74.53604998, 67.20298678],
-        "renewableEnergy": [108.68, 90.01, 74.55, 65.85, 58.17, 51.39]
-    }
-    x_coefficients = {
-        key: extend_series(values, required_length_div_5, mode="linear")
-        for key, values in base_x_coefficients.items()
-    }
-
-    # Generation of coefficients by region, project, and year
-    regional_coefficients = {
-        "x": {},
-        "y": {}
-    }
-
-    for project, base_coefficients in x_coefficients.items():
-        # Obtenir les facteurs régionaux pour le projet
-        project_region_factors = regional_factors[project]
-        extended_coefficients = extend_series(base_coefficients, required_length_div_5, mode="linear")
-        regional_coefficients["x"][project] = {
-            region: [c * factor for c in extended_coefficients]
-            for region, factor in project_region_factors.items()
-        }
-        regional_coefficients["y"][project] = {
-            region: [c * 0.87 for c in regional_coefficients["x"][project][region]]
-            for region in regional_coefficients["x"][project]
-        }
-
-    # Objective function
-    Lp_prob += (
-        # NbS-ARR
-        lpSum(
-            regional_coefficients["x"]["nbsRemoval"][region][year] *
-            x_vars["nbsRemoval"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-        lpSum(
-            regional_coefficients["y"]["nbsRemoval"][region][year] *
-            y_vars["nbsRemoval"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-
-        # nbsAvoidance
-        lpSum(
-            regional_coefficients["x"]["nbsAvoidance"][region][year] *
-            x_vars["nbsAvoidance"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-        lpSum(
-            regional_coefficients["y"]["nbsAvoidance"][region][year] *
-            y_vars["nbsAvoidance"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-
-        # biochar
-        lpSum(
-            regional_coefficients["x"]["biochar"][region][year] *
-            x_vars["biochar"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-        lpSum(
-            regional_coefficients["y"]["biochar"][region][year] *
-            y_vars["biochar"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-
-        # dac
-        lpSum(
-            regional_coefficients["x"]["dac"][region][year] *
-            x_vars["dac"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-        lpSum(
-            regional_coefficients["y"]["dac"][region][year] *
-            y_vars["dac"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-
-        # renewableEnergy
-        lpSum(
-            regional_coefficients["x"]["renewableEnergy"][region][year] *
-            x_vars["renewableEnergy"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-        lpSum(
-            regional_coefficients["y"]["renewableEnergy"][region][year] *
-            y_vars["renewableEnergy"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        )
-    )
-
-    ###############################
-    # Constraints
-    ############################
-
-        # Definition of exAnte coefficients for each category
-    base_coefficients = {
-
-        "nbsRemoval": [0.99592, 0.97068, 0.81757, 0.07585, 0.01098, 0],
-
-        "other_types": [1, 0.834, 0.667, 0.334, 0.167, 0],
-    }
-    coefficients = {
-        key: trailing_window(values, required_length_div_5, mode="flat")
-        for key, values in base_coefficients.items()
-    }
-
-    ## Constraint : 5 years budget timeline##
-
-    Lp_prob += z_min >= 0.015 * (
-        # NbS-ARR
-        lpSum(
-            x_vars["nbsRemoval"][region][year] * \
-            regional_coefficients["x"]["nbsRemoval"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-        lpSum(
-            y_vars["nbsRemoval"][region][year] * \
-            regional_coefficients["y"]["nbsRemoval"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-
-        # nbsAvoidance
-        lpSum(
-            x_vars["nbsAvoidance"][region][year] * \
-            regional_coefficients["x"]["nbsAvoidance"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-        lpSum(
-            y_vars["nbsAvoidance"][region][year] * \
-            regional_coefficients["y"]["nbsAvoidance"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-
-        # biochar
-        lpSum(
-            x_vars["biochar"][region][year] * \
-            regional_coefficients["x"]["biochar"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-        lpSum(
-            y_vars["biochar"][region][year] * \
-            regional_coefficients["y"]["biochar"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-
-        # dac
-        lpSum(
-            x_vars["dac"][region][year] * \
-            regional_coefficients["x"]["dac"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-        lpSum(
-            y_vars["dac"][region][year] * \
-            regional_coefficients["y"]["dac"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-
-        # renewableEnergy
-        lpSum(
-            x_vars["renewableEnergy"][region][year] * \
-            regional_coefficients["x"]["renewableEnergy"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-        lpSum(
-            y_vars["renewableEnergy"][region][year] * \
-            regional_coefficients["y"]["renewableEnergy"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        )
-    )
-
-    for year in range(last_year_index_div_5 + 1):
-        Lp_prob += (
-            # NbS-ARR
-            lpSum(
-                x_vars["nbsRemoval"][region][year] * regional_coefficients["x"]["nbsRemoval"][region][year] +
-                y_vars["nbsRemoval"][region][year] * \
-                regional_coefficients["y"]["nbsRemoval"][region][year]
-                for region in regions
-            ) +
-
-            # nbsAvoidance
-            lpSum(
-                x_vars["nbsAvoidance"][region][year] * regional_coefficients["x"]["nbsAvoidance"][region][year] +
-                y_vars["nbsAvoidance"][region][year] * \
-                regional_coefficients["y"]["nbsAvoidance"][region][year]
-                for region in regions
-            ) +
-
-            # biochar
-            lpSum(
-                x_vars["biochar"][region][year] * regional_coefficients["x"]["biochar"][region][year] +
-                y_vars["biochar"][region][year] * \
-                regional_coefficients["y"]["biochar"][region][year]
-                for region in regions
-            ) +
-
-            # dac
-            lpSum(
-                x_vars["dac"][region][year] * regional_coefficients["x"]["dac"][region][year] +
-                y_vars["dac"][region][year] * \
-                regional_coefficients["y"]["dac"][region][year]
-                for region in regions
-            ) +
-
-            # renewableEnergy
-            lpSum(
-                x_vars["renewableEnergy"][region][year] * regional_coefficients["x"]["renewableEnergy"][region][year] +
-                y_vars["renewableEnergy"][region][year] * \
-                regional_coefficients["y"]["renewableEnergy"][region][year]
-                for region in regions
-            ) >= z_min
-        )
-
-    # Contraint : balanced upper bound of purchases per year
-
-    Lp_prob += z <= 0.40 * (
-        # NbS-ARR
-        lpSum(
-            x_vars["nbsRemoval"][region][year] * \
-            regional_coefficients["x"]["nbsRemoval"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-        lpSum(
-            y_vars["nbsRemoval"][region][year] * \
-            regional_coefficients["y"]["nbsRemoval"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-
-        # nbsAvoidance
-        lpSum(
-            x_vars["nbsAvoidance"][region][year] * \
-            regional_coefficients["x"]["nbsAvoidance"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-        lpSum(
-            y_vars["nbsAvoidance"][region][year] * \
-            regional_coefficients["y"]["nbsAvoidance"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-
-        # biochar
-        lpSum(
-            x_vars["biochar"][region][year] * \
-            regional_coefficients["x"]["biochar"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-        lpSum(
-            y_vars["biochar"][region][year] * \
-            regional_coefficients["y"]["biochar"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-
-        # dac
-        lpSum(
-            x_vars["dac"][region][year] * \
-            regional_coefficients["x"]["dac"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-        lpSum(
-            y_vars["dac"][region][year] * \
-            regional_coefficients["y"]["dac"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-
-        # renewableEnergy
-        lpSum(
-            x_vars["renewableEnergy"][region][year] * \
-            regional_coefficients["x"]["renewableEnergy"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-        lpSum(
-            y_vars["renewableEnergy"][region][year] * \
-            regional_coefficients["y"]["renewableEnergy"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        )
-    )
-
-    for year in range(last_year_index_div_5 + 1):
-        Lp_prob += (
-            # NbS-ARR
-            lpSum(
-                x_vars["nbsRemoval"][region][year] * regional_coefficients["x"]["nbsRemoval"][region][year] +
-                y_vars["nbsRemoval"][region][year] * \
-                regional_coefficients["y"]["nbsRemoval"][region][year]
-                for region in regions
-            ) +
-
-            # nbsAvoidance
-            lpSum(
-                x_vars["nbsAvoidance"][region][year] * regional_coefficients["x"]["nbsAvoidance"][region][year] +
-                y_vars["nbsAvoidance"][region][year] * \
-                regional_coefficients["y"]["nbsAvoidance"][region][year]
-                for region in regions
-            ) +
-
-            # biochar
-            lpSum(
-                x_vars["biochar"][region][year] * regional_coefficients["x"]["biochar"][region][year] +
-                y_vars["biochar"][region][year] * \
-                regional_coefficients["y"]["biochar"][region][year]
-                for region in regions
-            ) +
-
-            # dac
-            lpSum(
-                x_vars["dac"][region][year] * regional_coefficients["x"]["dac"][region][year] +
-                y_vars["dac"][region][year] * \
-                regional_coefficients["y"]["dac"][region][year]
-                for region in regions
-            ) +
-
-            # renewableEnergy
-            lpSum(
-                x_vars["renewableEnergy"][region][year] * regional_coefficients["x"]["renewableEnergy"][region][year] +
-                y_vars["renewableEnergy"][region][year] * \
-                regional_coefficients["y"]["renewableEnergy"][region][year]
-                for region in regions
-            ) <= z
-        )
-
-    # Constraint : On spot vs Forward
-
-    Lp_prob += (
-        total_purch_for_on_spot_fwd ==
-        # NbS-ARR
-        lpSum(
-            x_vars["nbsRemoval"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-        lpSum(
-            y_vars["nbsRemoval"][region][year] *
-            trailing_window(coefficients["nbsRemoval"], required_length_div_5, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-
-        # nbsAvoidance
-        lpSum(
-            x_vars["nbsAvoidance"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-        lpSum(
-            y_vars["nbsAvoidance"][region][year] *
-            trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-
-        # biochar
-        lpSum(
-            x_vars["biochar"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-        lpSum(
-            y_vars["biochar"][region][year] *
-            trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-
-        # dac
-        lpSum(
-            x_vars["dac"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-        lpSum(
-            y_vars["dac"][region][year] *
-            trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-
-        # renewableEnergy
-        lpSum(
-            x_vars["renewableEnergy"][region][year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-        lpSum(
-            y_vars["renewableEnergy"][region][year] *
-            trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
+    with profiler.phase("template"):
+        template = template_model(
+            cadence, carbon_needs, financing, typology, region_allocation,
+            optimizeFinancing, optimizeRegion, budget_band, cumulative_needs,
         )
-    )
-
-    if not optimizeFinancing:
-        Lp_prob += (
-            # NbS-ARR
-            lpSum(
-                x_vars["nbsRemoval"][region][year]
-                for region in regions
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-
-            # nbsAvoidance
-            lpSum(
-                x_vars["nbsAvoidance"][region][year]
-                for region in regions
-                for year in range(last_year_index_div_5 + 1)
-            ) +
+    if template is not None:
+        years, model = template
+        return years, model.purchases(model.c), model
 
-            # biochar
-            lpSum(
-                x_vars["biochar"][region][year]
-                for region in regions
-                for year in range(last_year_index_div_5 + 1)
-            ) +
+    with profiler.phase("tensors"):
+        years, need_periods = plan_periods(cadence, carbon_needs)
+        price, stock_delivery = purchase_tensors(years)
 
-            # dac
-            lpSum(
-                x_vars["dac"][region][year]
-                for region in regions
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-
-            # renewableEnergy
-            lpSum(
-                x_vars["renewableEnergy"][region][year]
-                for region in regions
-                for year in range(last_year_index_div_5 + 1)
-            )
-            == financing["exPost"] * total_purch_for_on_spot_fwd
+    with profiler.phase("build"):
+        model = build_model(
+            price, stock_delivery, need_periods, list(carbon_needs.values()),
+            financing, typology, region_allocation,
+            optimizeFinancing, optimizeRegion, budget_band, cumulative_needs,
         )
+    return years, price, model
 
-        Lp_prob += (
-            # NbS-ARR
-            lpSum(
-                y_vars["nbsRemoval"][region][year] *
-                trailing_window(coefficients["nbsRemoval"], required_length_div_5, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-
-            # nbsAvoidance
-            lpSum(
-                y_vars["nbsAvoidance"][region][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-
-            # biochar
-            lpSum(
-                y_vars["biochar"][region][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-
-            # dac
-            lpSum(
-                y_vars["dac"][region][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-
-            # renewableEnergy
-            lpSum(
-                y_vars["renewableEnergy"][region][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index_div_5 + 1)
-            )
 
-            == financing["exAnte"] * total_purch_for_on_spot_fwd
-        )
-
-    # Constraint : distribution of project typologies
-
-    Lp_prob += (
-        total_purch_for_typo_distrib ==
-        # NbS-ARR
-        lpSum(
-            x_vars["nbsRemoval"][region][year] +
-            y_vars["nbsRemoval"][region][year] *
-            trailing_window(coefficients["nbsRemoval"], required_length_div_5, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-
-        # nbsAvoidance
-        lpSum(
-            x_vars["nbsAvoidance"][region][year] +
-            y_vars["nbsAvoidance"][region][year] *
-            trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-
-        # biochar
-        lpSum(
-            x_vars["biochar"][region][year] +
-            y_vars["biochar"][region][year] *
-            trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-
-        # dac
-        lpSum(
-            x_vars["dac"][region][year] +
-            y_vars["dac"][region][year] *
-            trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) +
-
-        # renewableEnergy
-        lpSum(
-            x_vars["renewableEnergy"][region][year] +
-            y_vars["renewableEnergy"][region][year] *
-            trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        )
-    )
-
-    # NbS-ARR
-    Lp_prob += (
-        lpSum(
-            x_vars["nbsRemoval"][region][year] +
-            y_vars["nbsRemoval"][region][year] *
-            trailing_window(coefficients["nbsRemoval"], required_length_div_5, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) == typology["nbsRemoval"] * total_purch_for_typo_distrib
+def solve_sparse_model(years, price, model, solver=None, profiler: Optional[Profiler] = None,
+                       result_format="records", aggregate=False, need_years=None, time_limit=None,
+                       uncertainty=None):
+    """
+    Solve a built model and format its purchases. With `need_years`, the year
+    of each need row, the result also carries the dual report.
+    """
+    profiler = profiler or Profiler()
+    profiler.record(
+        "model",
+        variables=model.n_cols,
+        purchase_variables=model.n_purchases,
+        constraints=model.n_rows,
+        nnz=model.nnz,
     )
 
-    # nbsAvoidance
-    Lp_prob += (
-        lpSum(
-            x_vars["nbsAvoidance"][region][year] +
-            y_vars["nbsAvoidance"][region][year] *
-            trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) == typology["nbsAvoidance"] * total_purch_for_typo_distrib
+    solution = solve(model, solver, profiler, ranging=need_years is not None, time_limit=time_limit)
+    return solution_results(
+        years, price, model, solution, profiler, result_format, aggregate, need_years,
+        uncertainty=uncertainty,
     )
 
-    # dac
-    Lp_prob += (
-        lpSum(
-            x_vars["dac"][region][year] +
-            y_vars["dac"][region][year] *
-            trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) == typology["dac"] * total_purch_for_typo_distrib
-    )
 
-    # biochar
-    Lp_prob += (
-        lpSum(
-            x_vars["biochar"][region][year] +
-            y_vars["biochar"][region][year] *
-            trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) == typology["biochar"] * total_purch_for_typo_distrib
-    )
-
-    # renewableEnergy
-    Lp_prob += (
-        lpSum(
-            x_vars["renewableEnergy"][region][year] +
-            y_vars["renewableEnergy"][region][year] *
-            trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index_div_5 + 1)
-        ) == typology["renewableEnergy"] * total_purch_for_typo_distrib
+def solution_results(years, price, model, solution, profiler, result_format="records", aggregate=False,
+                     need_years=None, shares=None, uncertainty=None):
+    """
+    Purchases and total price of a solved model, with the strategies when
+    `aggregate`, the dual report of the need rows labelled by `need_years` and
+    the cost distribution under the `uncertainty` options.
+    A solve stopped at its time limit falls back to a feasible plan, see
+    heuristics.py. Raises a BudgetError when the solver found no plan.
+    """
+    profiler.record(
+        "solver",
+        name=solution.solver,
+        status=solution.status,
+        iterations=solution.iterations,
+        objective=solution.objective,
     )
-
-    if not optimizeRegion:
-        ## Constraint: Distribution of geographical areas ##
-        
-        # Define the total purchases variable used for geographical areas distribution
-        total_purch_for_geo_distrib = p.LpVariable(
-            "total_purch_for_geo_distrib", lowBound=0)
-        
-        # Total purchases for geographical distribution
-        Lp_prob += (
-            total_purch_for_geo_distrib ==
-            # NbS-ARR
-            lpSum(
-                x_vars["nbsRemoval"][region][year] +
-                y_vars["nbsRemoval"][region][year] *
-                trailing_window(coefficients["nbsRemoval"], required_length_div_5, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-
-            # nbsAvoidance
-            lpSum(
-                x_vars["nbsAvoidance"][region][year] +
-                y_vars["nbsAvoidance"][region][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-
-            # biochar
-            lpSum(
-                x_vars["biochar"][region][year] +
-                y_vars["biochar"][region][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-
-            # dac
-            lpSum(
-                x_vars["dac"][region][year] +
-                y_vars["dac"][region][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-
-            # renewableEnergy
-            lpSum(
-                x_vars["renewableEnergy"][region][year] +
-                y_vars["renewableEnergy"][region][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index_div_5 + 1)
-            )
-        )
-
-        # northAmerica
-        Lp_prob += ((
-            lpSum(
-                x_vars["nbsRemoval"]["northAmerica"][year] +
-                y_vars["nbsRemoval"]["northAmerica"][year] *
-                trailing_window(coefficients["nbsRemoval"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-            lpSum(
-                x_vars["nbsAvoidance"]["northAmerica"][year] +
-                y_vars["nbsAvoidance"]["northAmerica"][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-            lpSum(
-                x_vars["biochar"]["northAmerica"][year] +
-                y_vars["biochar"]["northAmerica"][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-            lpSum(
-                x_vars["dac"]["northAmerica"][year] +
-                y_vars["dac"]["northAmerica"][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-            lpSum(
-                x_vars["renewableEnergy"]["northAmerica"][year] +
-                y_vars["renewableEnergy"]["northAmerica"][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            )
-        ) == region_allocation["northAmerica"] * total_purch_for_typo_distrib
-        )
-
-        # southAmerica
-        Lp_prob += ((
-            lpSum(
-                x_vars["nbsRemoval"]["southAmerica"][year] +
-                y_vars["nbsRemoval"]["southAmerica"][year] *
-                trailing_window(coefficients["nbsRemoval"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-            lpSum(
-                x_vars["nbsAvoidance"]["southAmerica"][year] +
-                y_vars["nbsAvoidance"]["southAmerica"][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-            lpSum(
-                x_vars["biochar"]["southAmerica"][year] +
-                y_vars["biochar"]["southAmerica"][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-            lpSum(
-                x_vars["dac"]["southAmerica"][year] +
-                y_vars["dac"]["southAmerica"][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-            lpSum(
-                x_vars["renewableEnergy"]["southAmerica"][year] +
-                y_vars["renewableEnergy"]["southAmerica"][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
+    if solution.status in ("feasible", "time_limit"):
+        from heuristics import fallback_plan
+
+        with profiler.phase("fallback"):
+            fallback = fallback_plan(model, solution, shares)
+        if fallback is None:
+            raise BudgetError(
+                "not_solved", "solver_time_limit",
+                f"{solution.solver} stopped at its time limit without a feasible plan",
             )
-        ) == region_allocation["southAmerica"] * total_purch_for_typo_distrib
-        )
-
-        # europe
-        Lp_prob += ((
-            lpSum(
-                x_vars["nbsRemoval"]["europe"][year] +
-                y_vars["nbsRemoval"]["europe"][year] *
-                trailing_window(coefficients["nbsRemoval"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-            lpSum(
-                x_vars["nbsAvoidance"]["europe"][year] +
-                y_vars["nbsAvoidance"]["europe"][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-            lpSum(
-                x_vars["biochar"]["europe"][year] +
-                y_vars["biochar"]["europe"][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-            lpSum(
-                x_vars["dac"]["europe"][year] +
-                y_vars["dac"]["europe"][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-            lpSum(
-                x_vars["renewableEnergy"]["europe"][year] +
-                y_vars["renewableEnergy"]["europe"][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            )
-        ) == region_allocation["europe"] * total_purch_for_typo_distrib
-        )
-
-        # africa
-        Lp_prob += ((
-            lpSum(
-                x_vars["nbsRemoval"]["africa"][year] +
-                y_vars["nbsRemoval"]["africa"][year] *
-                trailing_window(coefficients["nbsRemoval"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-            lpSum(
-                x_vars["nbsAvoidance"]["africa"][year] +
-                y_vars["nbsAvoidance"]["africa"][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-            lpSum(
-                x_vars["biochar"]["africa"][year] +
-                y_vars["biochar"]["africa"][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-            lpSum(
-                x_vars["dac"]["africa"][year] +
-                y_vars["dac"]["africa"][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-            lpSum(
-                x_vars["renewableEnergy"]["africa"][year] +
-                y_vars["renewableEnergy"]["africa"][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            )
-        ) == region_allocation["africa"] * total_purch_for_typo_distrib
-        )
-
-        # asia
-        Lp_prob += ((
-            lpSum(
-                x_vars["nbsRemoval"]["asia"][year] +
-                y_vars["nbsRemoval"]["asia"][year] *
-                trailing_window(coefficients["nbsRemoval"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-            lpSum(
-                x_vars["nbsAvoidance"]["asia"][year] +
-                y_vars["nbsAvoidance"]["asia"][year]
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-            lpSum(
-                x_vars["biochar"]["asia"][year] +
-                y_vars["biochar"]["asia"][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-            lpSum(
-                x_vars["dac"]["asia"][year] +
-                y_vars["dac"]["asia"][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-            lpSum(
-                x_vars["renewableEnergy"]["asia"][year] +
-                y_vars["renewableEnergy"]["asia"][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            )
-        ) == region_allocation["asia"] * total_purch_for_typo_distrib
-        )
-
-        # oceania
-        Lp_prob += ((
-            lpSum(
-                x_vars["nbsRemoval"]["oceania"][year] +
-                y_vars["nbsRemoval"]["oceania"][year] *
-                trailing_window(coefficients["nbsRemoval"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-            lpSum(
-                x_vars["nbsAvoidance"]["oceania"][year] +
-                y_vars["nbsAvoidance"]["oceania"][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-            lpSum(
-                x_vars["biochar"]["oceania"][year] +
-                y_vars["biochar"]["oceania"][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-            lpSum(
-                x_vars["dac"]["oceania"][year] +
-                y_vars["dac"]["oceania"][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            ) +
-            lpSum(
-                x_vars["renewableEnergy"]["oceania"][year] +
-                y_vars["renewableEnergy"]["oceania"][year] *
-                trailing_window(coefficients["other_types"], required_length_div_5, mode="flat")[year]
-                for year in range(last_year_index_div_5 + 1)
-            )
-        ) == region_allocation["oceania"] * total_purch_for_typo_distrib
-        )
-
-
-
-    for year, need in carbon_needs.items():
-        year = int(year)
-        year_index = (year - 2025)//5
-        start_index = 5 - year_index
-
-        Lp_prob += (
-
-            lpSum(
-                x_vars["nbsRemoval"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            ) +
-            lpSum(
-                x_vars["nbsAvoidance"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            ) +
-            lpSum(
-                x_vars["dac"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            ) +
-            lpSum(
-                x_vars["biochar"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            ) +
-            lpSum(
-                x_vars["renewableEnergy"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            ) +
-
+        values, total_price, plan, gap = fallback
+        profiler.record("fallback", plan=plan, gap=gap)
+    elif solution.status != "optimal":
+        raise BudgetError(
+            solution.status, f"solver_{solution.status}",
+            f"{solution.solver} found no optimal plan: {solution.status}",
+        )
+    else:
+        values = model.purchases(solution.values)
+        total_price = solution.objective
+
+    with profiler.phase("extract"):
+        results = {
+            "results": format_results(extract_purchases(years, price, values), result_format),
+            "total_price": total_price,
+            "status": "optimal" if solution.status == "optimal" else "time_limit",
+            "optimal": solution.status == "optimal",
+        }
+        if solution.status != "optimal":
+            results.update(plan=plan, gap=gap)
 
-            lpSum(
-                trailing_window(coefficients["nbsRemoval"], year_index + 1, mode="flat")[t] *
-                y_vars["nbsRemoval"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            ) +
-            lpSum(
-                trailing_window(coefficients["other_types"], year_index + 1, mode="flat")[t] *
-                y_vars["nbsAvoidance"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            ) +
-            lpSum(
-                trailing_window(coefficients["other_types"], year_index + 1, mode="flat")[t] *
-                y_vars["dac"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            ) +
-            lpSum(
-                trailing_window(coefficients["other_types"], year_index + 1, mode="flat")[t] *
-                y_vars["biochar"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            ) +
-            lpSum(
-                trailing_window(coefficients["other_types"], year_index + 1, mode="flat")[t] *
-                y_vars["renewableEnergy"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            )
-        ) >= need
+    if aggregate:
+        with profiler.phase("aggregate"):
+            results.update(yearly_strategies(years, price, values))
 
-    Lp_prob.solve(p.PULP_CBC_CMD(msg=False))
+    if uncertainty is not None:
+        from uncertainty import price_distribution
 
-    results = []
+        with profiler.phase("uncertainty"):
+            results["uncertainty"] = price_distribution(years, price, values, uncertainty)
 
-    for project, code in projects.items():
-        for region in regions:
-            for i, year in enumerate(range(1, last_year_index + 2, 5)):
-                x_var = x_vars[project][region][i]
-                x_value = x_var.value()
-                if x_value > 0:
-                    results.append({
-                        "year": 2024+year,
-                        "quantity": x_value,
-                        "typology": project,
-                        "region": region,
-                        "price": regional_coefficients["x"][project][region][i],
-                        "type": "ex-post"
-                    })
+    if need_years is not None and solution.row_duals is not None:
+        from duals import dual_report
 
-                y_var = y_vars[project][region][i]
-                y_value = y_var.value()
-                if y_value > 0:
-                    results.append({
-                        "year": 2024+year,
-                        "quantity": y_value,
-                        "typology": project,
-                        "region": region,
-                        "price": regional_coefficients["y"][project][region][i],
-                        "type": "ex-ante"
-                    })
+        with profiler.phase("duals"):
+            results["duals"] = dual_report(model, solution, need_years, years, price, shares)
 
-    return {
-        "results": results,
-        "total_price": Lp_prob.objective.value()
-    }
+    return results
 
 
-def flexibleAlgo(
+def yearlyAlgo(
     financing: Financing,
     typology: Typology,
     region_allocation: RegionAllocation,
@@ -2211,952 +245,38 @@ def flexibleAlgo(
     optimizeFinancing: bool,
     optimizeRegion: bool
 ):
-    """
-
-    Parameters:
-        financing : exPost and exAnte allocations.
-        typology : Distribution of project typologies.
-        region_allocation : Region allocation distribution.
-        carbon_needs (Dict[int, int]): Carbon needs specified dynamically for various years between 2025 and 2050.
-
-    Example:
-        financing = {
-        "exPost": 0.4, "exAnte": 0.6
-        }
-        typology = {
-            "nbsRemoval": 0.5,
-            "nbsAvoidance": 0.3,
-            "biochar": 0.1,
-            "dac": 0.05,
-            "renewableEnergy": 0.05
-        }
-        region_allocation = {
-            "northAmerica": 0.1,
-            "southAmerica": 0.2,
-            "europe": 0.3,
-            "africa": 0.2,
-            "asia": 0.1,
-            "oceania": 0.1
-        }
-        carbon_needs = {
-            2025: 5_000_000,
-            2040: 15_000_000,
-            2050: 40_000_000
-            }
-
-    """
-
-    Lp_prob = p.LpProblem('Kalculator_optimization', p.LpMinimize)
-
-    ###############
-    # variables
-    #############
-
-    last_year = max(int(year) for year in carbon_needs.keys())
-    last_year_index = last_year - BASE_YEAR
-    required_length = last_year_index + 1
-
-    # Geographic Regions
-    regions = ["northAmerica", "southAmerica",
-               "europe", "africa", "asia", "oceania"]
-
-    # Project typologies and their code
-    projects = {
-        "nbsRemoval": 1,
-        "nbsAvoidance": 2,
-        "dac": 3,
-        "biochar": 4,
-        "renewableEnergy": 5
-    }
-
-    # Purchase variables (ex-post and ex-ante) by typology, year and region
-    x_vars = {}  # Ex-post purchases
-    y_vars = {}  # Ex-ante purchases
-
-    # Dynamic creation of variables for years from 1 to last_year_index + 1
-    for project, code in projects.items():
-        x_vars[project] = {
-            region: [
-                p.LpVariable(f"x{code}_{region}_{year}", lowBound=0)
-                for year in range(1, last_year_index + 2)
-            ] for region in regions
-        }
-        y_vars[project] = {
-            region: [
-                p.LpVariable(f"y{code}_{region}_{year}", lowBound=0)
-                for year in range(1, last_year_index + 2)
-            ] for region in regions
-        }
-
-    # z: Common upper bound variable
-    z = p.LpVariable("z", lowBound=0)
-
-    # total_purch_for_on_spot_fwd : total purchases variable 'on spot vs forward' constraint
-    total_purch_for_on_spot_fwd = p.LpVariable(
-        "total_purch_for_on_spot_fwd", lowBound=0)
-
-    # total_purch_for_typo_distrib : total purchases variable used for the typologies distribution
-    total_purch_for_typo_distrib = p.LpVariable(
-        "total_purch_for_typo_distrib", lowBound=0)
-
-    # Group all the variables into a single list
-    variables = (
-        # Ex-post (x) and ex-ante (y) variables for all typologies, regions, and years
-        [x_vars[project][region][year]
-         for project in x_vars
-         for region in x_vars[project]
-         for year in range(last_year_index + 1)] +  # Ex-post variables
-
-        [y_vars[project][region][year]
-         for project in y_vars
-         for region in y_vars[project]
-         for year in range(last_year_index + 1)]  # Ex-ante variables
+    """Yearly purchases, each year costing between 1.5% and 8% of the total budget."""
+    return budgetAlgo(
+        financing, typology, region_allocation, carbon_needs, optimizeFinancing, optimizeRegion,
+        cadence=1, budget_band=BUDGET_BANDS[TimeConstraint.Yearly],
     )
 
-    #####################
-    # Objective function
-    #################
-
-    # Generation of coefficients by region, project, and year
-    regional_coefficients = {
-        "x": {},
-        "y": {}
-    }
-
-    for project, base_coefficients in x_coefficients.items():
-        # Obtenir les facteurs régionaux pour le projet
-        project_region_factors = regional_factors[project]
-        extended_coefficients = extend_series(base_coefficients, required_length, mode="linear")
-        regional_coefficients["x"][project] = {
-            region: [c * factor for c in extended_coefficients]
-            for region, factor in project_region_factors.items()
-        }
-        regional_coefficients["y"][project] = {
-            region: [c * 0.87 for c in regional_coefficients["x"][project][region]]
-            for region in regional_coefficients["x"][project]
-        }
-
-    # Objective function
-    Lp_prob += (
-        # NbS-ARR
-        lpSum(
-            regional_coefficients["x"]["nbsRemoval"][region][year] *
-            x_vars["nbsRemoval"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        lpSum(
-            regional_coefficients["y"]["nbsRemoval"][region][year] *
-            y_vars["nbsRemoval"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-
-        # nbsAvoidance
-        lpSum(
-            regional_coefficients["x"]["nbsAvoidance"][region][year] *
-            x_vars["nbsAvoidance"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        lpSum(
-            regional_coefficients["y"]["nbsAvoidance"][region][year] *
-            y_vars["nbsAvoidance"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-
-        # biochar
-        lpSum(
-            regional_coefficients["x"]["biochar"][region][year] *
-            x_vars["biochar"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        lpSum(
-            regional_coefficients["y"]["biochar"][region][year] *
-            y_vars["biochar"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-
-        # dac
-        lpSum(
-            regional_coefficients["x"]["dac"][region][year] *
-            x_vars["dac"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        lpSum(
-            regional_coefficients["y"]["dac"][region][year] *
-            y_vars["dac"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-
-        # renewableEnergy
-        lpSum(
-            regional_coefficients["x"]["renewableEnergy"][region][year] *
-            x_vars["renewableEnergy"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        lpSum(
-            regional_coefficients["y"]["renewableEnergy"][region][year] *
-            y_vars["renewableEnergy"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        )
-    )
-
-    #################
-    # Constraints
-    ###############
-
-    ## Contraint : balanced upper bound of purchases per year##
-
-    # Lp_prob += z <= 0.3 * (
-    #     # NbS-ARR
-    #     lpSum(
-    #         x_vars["nbsRemoval"][region][year] * \
-    #         regional_coefficients["x"]["nbsRemoval"][region][year]
-    #         for region in regions
-    #         for year in range(last_year_index + 1)
-    #     ) +
-    #     lpSum(
-    #         y_vars["nbsRemoval"][region][year] * \
-    #         regional_coefficients["y"]["nbsRemoval"][region][year]
-    #         for region in regions
-    #         for year in range(last_year_index + 1)
-    #     ) +
-
-    #     # nbsAvoidance
-    #     lpSum(
-    #         x_vars["nbsAvoidance"][region][year] * \
-    #         regional_coefficients["x"]["nbsAvoidance"][region][year]
-    #         for region in regions
-    #         for year in range(last_year_index + 1)
-    #     ) +
-    #     lpSum(
-    #         y_vars["nbsAvoidance"][region][year] * \
-    #         regional_coefficients["y"]["nbsAvoidance"][region][year]
-    #         for region in regions
-    #         for year in range(last_year_index + 1)
-    #     ) +
-
-    #     # biochar
-    #     lpSum(
-    #         x_vars["biochar"][region][year] * \
-    #         regional_coefficients["x"]["biochar"][region][year]
-    #         for region in regions
-    #         for year in range(last_year_index + 1)
-    #     ) +
-    #     lpSum(
-    #         y_vars["biochar"][region][year] * \
-    #         regional_coefficients["y"]["biochar"][region][year]
-    #         for region in regions
-    #         for year in range(last_year_index + 1)
-    #     ) +
-
-    #     # dac
-    #     lpSum(
-    #         x_vars["dac"][region][year] * \
-    #         regional_coefficients["x"]["dac"][region][year]
-    #         for region in regions
-    #         for year in range(last_year_index + 1)
-    #     ) +
-    #     lpSum(
-    #         y_vars["dac"][region][year] * \
-    #         regional_coefficients["y"]["dac"][region][year]
-    #         for region in regions
-    #         for year in range(last_year_index + 1)
-    #     ) +
-
-    #     # renewableEnergy
-    #     lpSum(
-    #         x_vars["renewableEnergy"][region][year] * \
-    #         regional_coefficients["x"]["renewableEnergy"][region][year]
-    #         for region in regions
-    #         for year in range(last_year_index + 1)
-    #     ) +
-    #     lpSum(
-    #         y_vars["renewableEnergy"][region][year] * \
-    #         regional_coefficients["y"]["renewableEnergy"][region][year]
-    #         for region in regions
-    #         for year in range(last_year_index + 1)
-    #     )
-    # )
-
-    # for year in range(last_year_index + 1):
-    #     Lp_prob += (
-    #         # NbS-ARR
-    #         lpSum(
-    #             x_vars["nbsRemoval"][region][year] * regional_coefficients["x"]["nbsRemoval"][region][year] +
-    #             y_vars["nbsRemoval"][region][year] * \
-    #             regional_coefficients["y"]["nbsRemoval"][region][year]
-    #             for region in regions
-    #         ) +
-
-    #         # nbsAvoidance
-    #         lpSum(
-    #             x_vars["nbsAvoidance"][region][year] * regional_coefficients["x"]["nbsAvoidance"][region][year] +
-    #             y_vars["nbsAvoidance"][region][year] * \
-    #             regional_coefficients["y"]["nbsAvoidance"][region][year]
-    #             for region in regions
-    #         ) +
-
-    #         # biochar
-    #         lpSum(
-    #             x_vars["biochar"][region][year] * regional_coefficients["x"]["biochar"][region][year] +
-    #             y_vars["biochar"][region][year] * \
-    #             regional_coefficients["y"]["biochar"][region][year]
-    #             for region in regions
-    #         ) +
-
-    #         # dac
-    #         lpSum(
-    #             x_vars["dac"][region][year] * regional_coefficients["x"]["dac"][region][year] +
-    #             y_vars["dac"][region][year] * \
-    #             regional_coefficients["y"]["dac"][region][year]
-    #             for region in regions
-    #         ) +
-
-    #         # renewableEnergy
-    #         lpSum(
-    #             x_vars["renewableEnergy"][region][year] * regional_coefficients["x"]["renewableEnergy"][region][year] +
-    #             y_vars["renewableEnergy"][region][year] * \
-    #             regional_coefficients["y"]["renewableEnergy"][region][year]
-    #             for region in regions
-    #         ) <= z
-    #     )
-
-    ## Constraint : On spot vs Forward##
-
-    Lp_prob += (
-        total_purch_for_on_spot_fwd ==
-        # NbS-ARR
-        lpSum(
-            x_vars["nbsRemoval"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        lpSum(
-            y_vars["nbsRemoval"][region][year] *
-            trailing_window(coefficients["nbsRemoval"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-
-        # nbsAvoidance
-        lpSum(
-            x_vars["nbsAvoidance"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        lpSum(
-            y_vars["nbsAvoidance"][region][year] *
-            trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-
-        # biochar
-        lpSum(
-            x_vars["biochar"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        lpSum(
-            y_vars["biochar"][region][year] *
-            trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-
-        # dac
-        lpSum(
-            x_vars["dac"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        lpSum(
-            y_vars["dac"][region][year] *
-            trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
 
-        # renewableEnergy
-        lpSum(
-            x_vars["renewableEnergy"][region][year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-        lpSum(
-            y_vars["renewableEnergy"][region][year] *
-            trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        )
-    )
-    if not optimizeFinancing:
-        Lp_prob += (
-            # NbS-ARR
-            lpSum(
-                x_vars["nbsRemoval"][region][year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            ) +
-
-            # nbsAvoidance
-            lpSum(
-                x_vars["nbsAvoidance"][region][year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            ) +
-
-            # biochar
-            lpSum(
-                x_vars["biochar"][region][year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            ) +
-
-            # dac
-            lpSum(
-                x_vars["dac"][region][year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            ) +
-
-            # renewableEnergy
-            lpSum(
-                x_vars["renewableEnergy"][region][year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            )
-            == financing["exPost"] * total_purch_for_on_spot_fwd
-        )
-
-        Lp_prob += (
-            # NbS-ARR
-            lpSum(
-                y_vars["nbsRemoval"][region][year] *
-                trailing_window(coefficients["nbsRemoval"], required_length, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            ) +
-
-            # nbsAvoidance
-            lpSum(
-                y_vars["nbsAvoidance"][region][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            ) +
-
-            # biochar
-            lpSum(
-                y_vars["biochar"][region][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            ) +
-
-            # dac
-            lpSum(
-                y_vars["dac"][region][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            ) +
-
-            # renewableEnergy
-            lpSum(
-                y_vars["renewableEnergy"][region][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            )
-
-            == financing["exAnte"] * total_purch_for_on_spot_fwd
-        )
-
-    ## Constraint : distribution of project typologies##
-
-    Lp_prob += (
-        total_purch_for_typo_distrib ==
-        # NbS-ARR
-        lpSum(
-            x_vars["nbsRemoval"][region][year] +
-            y_vars["nbsRemoval"][region][year] *
-            trailing_window(coefficients["nbsRemoval"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-
-        # nbsAvoidance
-        lpSum(
-            x_vars["nbsAvoidance"][region][year] +
-            y_vars["nbsAvoidance"][region][year] *
-            trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-
-        # biochar
-        lpSum(
-            x_vars["biochar"][region][year] +
-            y_vars["biochar"][region][year] *
-            trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-
-        # dac
-        lpSum(
-            x_vars["dac"][region][year] +
-            y_vars["dac"][region][year] *
-            trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) +
-
-        # renewableEnergy
-        lpSum(
-            x_vars["renewableEnergy"][region][year] +
-            y_vars["renewableEnergy"][region][year] *
-            trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        )
-    )
-
-    # NbS-ARR
-    Lp_prob += (
-        lpSum(
-            x_vars["nbsRemoval"][region][year] +
-            y_vars["nbsRemoval"][region][year] *
-            trailing_window(coefficients["nbsRemoval"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) == typology["nbsRemoval"] * total_purch_for_typo_distrib
-    )
-
-    # nbsAvoidance
-    Lp_prob += (
-        lpSum(
-            x_vars["nbsAvoidance"][region][year] +
-            y_vars["nbsAvoidance"][region][year] *
-            trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) == typology["nbsAvoidance"] * total_purch_for_typo_distrib
-    )
-
-    # dac
-    Lp_prob += (
-        lpSum(
-            x_vars["dac"][region][year] +
-            y_vars["dac"][region][year] *
-            trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) == typology["dac"] * total_purch_for_typo_distrib
+def fiveYearAlgo(
+    financing: Financing,
+    typology: Typology,
+    region_allocation: RegionAllocation,
+    carbon_needs: Dict[int, int],
+    optimizeFinancing: bool,
+    optimizeRegion: bool
+):
+    """Purchases every 5 years, each period costing between 1.5% and 40% of the total budget."""
+    return budgetAlgo(
+        financing, typology, region_allocation, carbon_needs, optimizeFinancing, optimizeRegion,
+        cadence=5, budget_band=BUDGET_BANDS[TimeConstraint.FiveYear],
     )
 
-    # biochar
-    Lp_prob += (
-        lpSum(
-            x_vars["biochar"][region][year] +
-            y_vars["biochar"][region][year] *
-            trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) == typology["biochar"] * total_purch_for_typo_distrib
-    )
 
-    # renewableEnergy
-    Lp_prob += (
-        lpSum(
-            x_vars["renewableEnergy"][region][year] +
-            y_vars["renewableEnergy"][region][year] *
-            trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-            for region in regions
-            for year in range(last_year_index + 1)
-        ) == typology["renewableEnergy"] * total_purch_for_typo_distrib
+def flexibleAlgo(
+    financing: Financing,
+    typology: Typology,
+    region_allocation: RegionAllocation,
+    carbon_needs: Dict[int, int],
+    optimizeFinancing: bool,
+    optimizeRegion: bool
+):
+    """Yearly purchases without budget timeline constraint."""
+    return budgetAlgo(
+        financing, typology, region_allocation, carbon_needs, optimizeFinancing, optimizeRegion,
+        cadence=1, budget_band=BUDGET_BANDS[TimeConstraint.NoConstraint],
     )
-
-    if not optimizeRegion:
-    ## Constraint: Distribution of geographical areas ##
-    
-        # Define the total purchases variable used for geographical areas distribution
-        total_purch_for_geo_distrib = p.LpVariable(
-            "total_purch_for_geo_distrib", lowBound=0)
-            
-        # Total purchases for geographical distribution
-        Lp_prob += (
-            total_purch_for_geo_distrib ==
-            # NbS-ARR
-            lpSum(
-                x_vars["nbsRemoval"][region][year] +
-                y_vars["nbsRemoval"][region][year] *
-                trailing_window(coefficients["nbsRemoval"], required_length, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            ) +
-
-            # nbsAvoidance
-            lpSum(
-                x_vars["nbsAvoidance"][region][year] +
-                y_vars["nbsAvoidance"][region][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            ) +
-
-            # biochar
-            lpSum(
-                x_vars["biochar"][region][year] +
-                y_vars["biochar"][region][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            ) +
-
-            # dac
-            lpSum(
-                x_vars["dac"][region][year] +
-                y_vars["dac"][region][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            ) +
-
-            # renewableEnergy
-            lpSum(
-                x_vars["renewableEnergy"][region][year] +
-                y_vars["renewableEnergy"][region][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for region in regions
-                for year in range(last_year_index + 1)
-            )
-        )
-
-        # northAmerica
-        Lp_prob += ((
-            lpSum(
-                x_vars["nbsRemoval"]["northAmerica"][year] +
-                y_vars["nbsRemoval"]["northAmerica"][year] *
-                trailing_window(coefficients["nbsRemoval"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["nbsAvoidance"]["northAmerica"][year] +
-                y_vars["nbsAvoidance"]["northAmerica"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["biochar"]["northAmerica"][year] +
-                y_vars["biochar"]["northAmerica"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["dac"]["northAmerica"][year] +
-                y_vars["dac"]["northAmerica"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["renewableEnergy"]["northAmerica"][year] +
-                y_vars["renewableEnergy"]["northAmerica"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            )
-        ) == region_allocation["northAmerica"] * total_purch_for_typo_distrib
-        )
-
-        # southAmerica
-        Lp_prob += ((
-            lpSum(
-                x_vars["nbsRemoval"]["southAmerica"][year] +
-                y_vars["nbsRemoval"]["southAmerica"][year] *
-                trailing_window(coefficients["nbsRemoval"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["nbsAvoidance"]["southAmerica"][year] +
-                y_vars["nbsAvoidance"]["southAmerica"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["biochar"]["southAmerica"][year] +
-                y_vars["biochar"]["southAmerica"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["dac"]["southAmerica"][year] +
-                y_vars["dac"]["southAmerica"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["renewableEnergy"]["southAmerica"][year] +
-                y_vars["renewableEnergy"]["southAmerica"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            )
-        ) == region_allocation["southAmerica"] * total_purch_for_typo_distrib
-        )
-
-        # europe
-        Lp_prob += ((
-            lpSum(
-                x_vars["nbsRemoval"]["europe"][year] +
-                y_vars["nbsRemoval"]["europe"][year] *
-                trailing_window(coefficients["nbsRemoval"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["nbsAvoidance"]["europe"][year] +
-                y_vars["nbsAvoidance"]["europe"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["biochar"]["europe"][year] +
-                y_vars["biochar"]["europe"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["dac"]["europe"][year] +
-                y_vars["dac"]["europe"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["renewableEnergy"]["europe"][year] +
-                y_vars["renewableEnergy"]["europe"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            )
-        ) == region_allocation["europe"] * total_purch_for_typo_distrib
-        )
-
-        # africa
-        Lp_prob += ((
-            lpSum(
-                x_vars["nbsRemoval"]["africa"][year] +
-                y_vars["nbsRemoval"]["africa"][year] *
-                trailing_window(coefficients["nbsRemoval"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["nbsAvoidance"]["africa"][year] +
-                y_vars["nbsAvoidance"]["africa"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["biochar"]["africa"][year] +
-                y_vars["biochar"]["africa"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["dac"]["africa"][year] +
-                y_vars["dac"]["africa"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["renewableEnergy"]["africa"][year] +
-                y_vars["renewableEnergy"]["africa"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            )
-        ) == region_allocation["africa"] * total_purch_for_typo_distrib
-        )
-
-        # asia
-        Lp_prob += ((
-            lpSum(
-                x_vars["nbsRemoval"]["asia"][year] +
-                y_vars["nbsRemoval"]["asia"][year] *
-                trailing_window(coefficients["nbsRemoval"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["nbsAvoidance"]["asia"][year] +
-                y_vars["nbsAvoidance"]["asia"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["biochar"]["asia"][year] +
-                y_vars["biochar"]["asia"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["dac"]["asia"][year] +
-                y_vars["dac"]["asia"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["renewableEnergy"]["asia"][year] +
-                y_vars["renewableEnergy"]["asia"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            )
-        ) == region_allocation["asia"] * total_purch_for_typo_distrib
-        )
-
-        # oceania
-        Lp_prob += ((
-            lpSum(
-                x_vars["nbsRemoval"]["oceania"][year] +
-                y_vars["nbsRemoval"]["oceania"][year] *
-                trailing_window(coefficients["nbsRemoval"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["nbsAvoidance"]["oceania"][year] +
-                y_vars["nbsAvoidance"]["oceania"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["biochar"]["oceania"][year] +
-                y_vars["biochar"]["oceania"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["dac"]["oceania"][year] +
-                y_vars["dac"]["oceania"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            ) +
-            lpSum(
-                x_vars["renewableEnergy"]["oceania"][year] +
-                y_vars["renewableEnergy"]["oceania"][year] *
-                trailing_window(coefficients["other_types"], required_length, mode="flat")[year]
-                for year in range(last_year_index + 1)
-            )
-        ) == region_allocation["oceania"] * total_purch_for_typo_distrib
-        )
-
-    ## Constraint : carbon units needs by years##
-
-    for year, need in carbon_needs.items():
-        year = int(year)
-        year_index = year - 2025
-        start_index = 25 - year_index
-
-        Lp_prob += (
-
-            lpSum(
-                x_vars["nbsRemoval"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            ) +
-            lpSum(
-                x_vars["nbsAvoidance"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            ) +
-            lpSum(
-                x_vars["dac"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            ) +
-            lpSum(
-                x_vars["biochar"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            ) +
-            lpSum(
-                x_vars["renewableEnergy"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            ) +
-
-
-            lpSum(
-                trailing_window(coefficients["nbsRemoval"], year_index + 1, mode="flat")[t] *
-                y_vars["nbsRemoval"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            ) +
-            lpSum(
-                trailing_window(coefficients["other_types"], year_index + 1, mode="flat")[t] *
-                y_vars["nbsAvoidance"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            ) +
-            lpSum(
-                trailing_window(coefficients["other_types"], year_index + 1, mode="flat")[t] *
-                y_vars["dac"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            ) +
-            lpSum(
-                trailing_window(coefficients["other_types"], year_index + 1, mode="flat")[t] *
-                y_vars["biochar"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            ) +
-            lpSum(
-                trailing_window(coefficients["other_types"], year_index + 1, mode="flat")[t] *
-                y_vars["renewableEnergy"][region][t]
-                for region in regions
-                for t in range(year_index + 1)
-            )
-        ) >= need
-
-    #################
-    # Solving
-    ##############
-
-    Lp_prob.solve(p.PULP_CBC_CMD(msg=False))
-
-    results = []
-
-    for project, code in projects.items():
-        for region in regions:
-            for i, year in enumerate(range(1, last_year_index + 2)):
-                x_var = x_vars[project][region][i]
-                x_value = x_var.value()
-                if x_value > 0:
-                    results.append({
-                        "year": 2024+year,
-                        "quantity": x_value,
-                        "typology": project,
-                        "region": region,
-                        "price": regional_coefficients["x"][project][region][i],
-                        "type": "ex-post"
-                    })
-
-                y_var = y_vars[project][region][i]
-                y_value = y_var.value()
-                if y_value > 0:
-                    results.append({
-                        "year": 2024+year,
-                        "quantity": y_value,
-                        "typology": project,
-                        "region": region,
-                        "price": regional_coefficients["y"][project][region][i],
-                        "type": "ex-ante"
-                    })
-
-    return {
-        "results": results,
-        "total_price": Lp_prob.objective.value()
-    }
\ No newline at end of file
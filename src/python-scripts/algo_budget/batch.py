@@ -0,0 +1,124 @@
+"""
+Batch mode : many budget requests in one invocation.
+
+Reads one request per line (a bare request, or {"id": ..., "input": {...}}),
+solves them across a process pool and writes one JSON line per request in
+completion order : {"index": ..., "id": ..., "result": {...}} or
+{"index": ..., "id": ..., "error": "...", "status": ..., "code": ...}, see
+errors.py. A throughput summary is written
+to stderr at the end.
+
+Usage:
+    python main.py --batch requests.jsonl [--workers N] > results.jsonl
+    cat requests.jsonl | python main.py --batch - > results.jsonl
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+
+from errors import error_fields
+from jsonio import write_json
+from main import solve_request
+from plans import BASE_YEAR, LAST_DATA_YEAR
+from templates import templates
+from tensors import delivery_tensor, price_tensor
+
+
+def warm_up():
+    """
+    Compute the tensors of the default horizon and map the model templates once,
+    before the pool forks : the workers share them.
+    """
+    horizon = LAST_DATA_YEAR - BASE_YEAR + 1
+    price_tensor(horizon)
+    delivery_tensor(horizon)
+    templates()
+
+
+def solve_line(index, line):
+    """Response of the request on `line`, never raises."""
+    request_id = None
+    try:
+        request = json.loads(line)
+        if "input" in request:
+            request_id = request.get("id")
+            request = request["input"]
+        return {"index": index, "id": request_id, "result": solve_request(request)}
+    except Exception as error:
+        return {"index": index, "id": request_id, **error_fields(error)}
+
+
+def requests(lines):
+    """(index, line) of the non-empty lines."""
+    index = 0
+    for line in lines:
+        if line.strip():
+            yield index, line
+            index += 1
+
+
+def run_batch(lines, stdout=sys.stdout, workers=None):
+    """Solve every request of `lines`, returns the throughput summary."""
+    workers = workers or os.cpu_count() or 1
+    warm_up()
+    start = time.perf_counter()
+    solved = errors = 0
+
+    def emit(response):
+        nonlocal solved, errors
+        solved += 1
+        errors += "error" in response
+        write_json(response, stdout)
+        stdout.write("\n")
+        stdout.flush()
+
+    if workers == 1:
+        for index, line in requests(lines):
+            emit(solve_line(index, line))
+    else:
+        # Forked workers share the imports and tensors of this process
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            pending = set()
+            for index, line in requests(lines):
+                # Bounded read-ahead : the input can be larger than memory
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        emit(future.result())
+                pending.add(pool.submit(solve_line, index, line))
+
+            for future in as_completed(pending):
+                emit(future.result())
+
+    seconds = time.perf_counter() - start
+    return {
+        "scenarios": solved,
+        "errors": errors,
+        "workers": workers,
+        "seconds": round(seconds, 3),
+        "scenarios_per_s": round(solved / seconds, 1) if seconds else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve a JSONL file of budget requests")
+    parser.add_argument("input", nargs="?", default="-", help="JSONL file, - for stdin")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="solver processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    if args.input == "-":
+        summary = run_batch(sys.stdin, workers=args.workers)
+    else:
+        with open(args.input) as lines:
+            summary = run_batch(lines, workers=args.workers)
+    print(json.dumps(summary), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
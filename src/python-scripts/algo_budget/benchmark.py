@@ -0,0 +1,1035 @@
+"""
+Benchmarks of the budget optimizer.
+
+Usage:
+    python benchmark.py needs [--horizons 26 50 65] [--repeat 3]
+    python benchmark.py solvers [--horizons 26 50] [--repeat 5]
+    python benchmark.py worker [--requests 50]
+    python benchmark.py cache [--repeat 20]
+    python benchmark.py session [--horizons 26 50] [--requests 30]
+    python benchmark.py formats [--horizons 26 100] [--repeat 20]
+    python benchmark.py suite [--save baseline.json] [--compare baseline.json] [--threshold 0.25]
+    python benchmark.py server [--requests 50] [--concurrency 25] [--workers 1]
+    python benchmark.py coldstart [--processes 10] [--time-constraints 1 5 -1]
+    python benchmark.py startup [--processes 10]
+    python benchmark.py io [--horizons 26 75] [--repeat 5]
+    python benchmark.py timelimit [--horizons 26 50] [--limits 0.0001 0.01 2]
+    python benchmark.py compare [--horizons 26 50] [--repeat 5]
+    python benchmark.py sweep [--horizons 26 50] [--points 1000]
+    python benchmark.py frontier [--horizons 26 50]
+    python benchmark.py uncertainty [--horizons 26 50] [--paths 10000 100000 1000000]
+    python benchmark.py stochastic [--horizons 26 50] [--scenarios 50 200 500] [--objective cvar]
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from algorithms import budgetAlgo, purchase_years
+from cache import ResultCache, cached
+from compare import COMPARE_CADENCES, compare_request
+from diagnostics import Profiler
+from errors import BudgetError
+from frontier import frontier_request
+from jsonio import write_json
+from main import check_fields, solve_request, solve_uncached
+from models import RESULT_FORMATS, TimeConstraint
+from plans import BASE_YEAR, BUDGET_BANDS
+from results import extract_purchases, format_results
+from model_builder import build_model, to_pulp
+from solvers import SOLVERS, solve
+from stochastic import stochastic_request
+from sweep import sweep_request
+from templates import write_templates
+from tensors import purchase_tensors
+from uncertainty import price_distribution, uncertainty_options
+
+
+SAMPLE_REQUEST = {
+    "financing": {"exPost": 0.4, "exAnte": 0.6},
+    "typology": {
+        "nbsRemoval": 0.5,
+        "nbsAvoidance": 0.3,
+        "biochar": 0.1,
+        "dac": 0.05,
+        "renewableEnergy": 0.05
+    },
+    "regionAllocation": {
+        "northAmerica": 0.1,
+        "southAmerica": 0.2,
+        "europe": 0.3,
+        "africa": 0.2,
+        "asia": 0.1,
+        "oceania": 0.1
+    },
+    "optimizeFinancing": False,
+    "optimizeRegion": False,
+}
+
+
+def dense_needs(horizon):
+    """One carbon need per year over `horizon` years, growing linearly."""
+    return {BASE_YEAR + year: 1_000 * (year + 1) for year in range(horizon)}
+
+
+def timed(function, repeat):
+    """Median wall time in ms of `repeat` calls, and the last result."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), result
+
+
+# Revision of the PuLP algorithms the sparse need formulations replaced
+BASELINE_REVISION = "71d7ffb"
+
+# Run from an export of BASELINE_REVISION : median ms and total_price of its
+# flexibleAlgo (no budget band) on the needs of argv[1], argv[2] times
+BASELINE_NEEDS_SCRIPT = """
+import json, statistics, sys, time
+from algorithms import flexibleAlgo
+request, repeat = json.loads(sys.argv[1]), int(sys.argv[2])
+carbon_needs = {int(year): need for year, need in request["carbonUnitNeeds"].items()}
+timings = []
+for _ in range(repeat):
+    start = time.perf_counter()
+    result = flexibleAlgo(
+        request["financing"], request["typology"], request["regionAllocation"], carbon_needs, False, False,
+    )
+    timings.append((time.perf_counter() - start) * 1000)
+print(json.dumps([statistics.median(timings), result["total_price"]]))
+"""
+
+
+def export_baseline(directory):
+    """Write the algo_budget sources of BASELINE_REVISION to `directory`."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    top, prefix = subprocess.run(
+        ["git", "rev-parse", "--show-toplevel", "--show-prefix"], cwd=here,
+        check=True, capture_output=True, text=True,
+    ).stdout.splitlines()
+    archive = subprocess.run(
+        ["git", "archive", f"{BASELINE_REVISION}:{prefix}"], cwd=top, check=True, capture_output=True,
+    ).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(directory)
+
+
+def bench_needs(args):
+    """Baseline PuLP, direct and cumulative stock formulations of the carbon need rows."""
+    # No budget band : a 1.5% minimum per year is infeasible past 66 years
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        export_baseline(directory)
+        for horizon in args.horizons:
+            request = sample_request(horizon, time_constraints=-1)
+            check_fields(request)
+            carbon_needs = dense_needs(horizon)
+            years = purchase_years(1, BASE_YEAR + horizon - 1)
+            need_periods = [int(year) - BASE_YEAR for year in carbon_needs]
+            price, stock_delivery = purchase_tensors(years)
+
+            process = subprocess.run(
+                [sys.executable, "-c", BASELINE_NEEDS_SCRIPT, json.dumps(request), str(args.repeat)],
+                cwd=directory, check=True, capture_output=True, text=True,
+            )
+            total_ms, total_price = json.loads(process.stdout)
+            rows.append({
+                "horizon": horizon,
+                "formulation": "baseline",
+                "rows": None,
+                "cols": None,
+                "nnz": None,
+                "build_ms": None,
+                "to_pulp_ms": None,
+                "total_ms": round(total_ms, 2),
+                "total_price": total_price,
+            })
+
+            for cumulative in (False, True):
+                def build():
+                    return build_model(
+                        price, stock_delivery, need_periods, list(carbon_needs.values()),
+                        SAMPLE_REQUEST["financing"], SAMPLE_REQUEST["typology"],
+                        SAMPLE_REQUEST["regionAllocation"], False, False,
+                        None, cumulative,
+                    )
+
+                build_ms, model = timed(build, args.repeat)
+                pulp_ms, _ = timed(lambda: to_pulp(model), args.repeat)
+                total_ms, result = timed(lambda: budgetAlgo(
+                    SAMPLE_REQUEST["financing"], SAMPLE_REQUEST["typology"],
+                    SAMPLE_REQUEST["regionAllocation"], carbon_needs, False, False,
+                    cadence=1, budget_band=None, cumulative_needs=cumulative,
+                ), args.repeat)
+                rows.append({
+                    "horizon": horizon,
+                    "formulation": "cumulative" if cumulative else "direct",
+                    "rows": model.n_rows,
+                    "cols": model.n_cols,
+                    "nnz": model.nnz,
+                    "build_ms": round(build_ms, 2),
+                    "to_pulp_ms": round(pulp_ms, 2),
+                    "total_ms": round(total_ms, 2),
+                    "total_price": result["total_price"],
+                })
+    return rows
+
+
+def bench_solvers(args):
+    """Every solver backend on the same yearly, five-year and flexible models."""
+    rows = []
+    for horizon in args.horizons:
+        carbon_needs = dense_needs(horizon)
+        for cadence, budget_band in ((1, (0.015, 0.08)), (5, (0.015, 0.40)), (1, None)):
+            years = purchase_years(cadence, BASE_YEAR + horizon - 1)
+            need_periods = [(int(year) - BASE_YEAR) // cadence for year in carbon_needs]
+            price, stock_delivery = purchase_tensors(years)
+            model = build_model(
+                price, stock_delivery, need_periods, list(carbon_needs.values()),
+                SAMPLE_REQUEST["financing"], SAMPLE_REQUEST["typology"],
+                SAMPLE_REQUEST["regionAllocation"], False, False, budget_band,
+            )
+            for solver in SOLVERS:
+                solve_ms, result = timed(lambda: solve(model, solver), args.repeat)
+                rows.append({
+                    "horizon": horizon,
+                    "cadence": cadence,
+                    "budget_band": "yes" if budget_band else "no",
+                    "solver": solver,
+                    "nnz": model.nnz,
+                    "status": result.status,
+                    "solve_ms": round(solve_ms, 2),
+                    "objective": round(result.objective, 2),
+                })
+    return rows
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+def latency_row(mode, timings):
+    return {
+        "mode": mode,
+        "requests": len(timings),
+        "p50_ms": round(percentile(timings, 50), 2),
+        "p99_ms": round(percentile(timings, 99), 2),
+        "mean_ms": round(statistics.mean(timings), 2),
+    }
+
+
+def sample_request(horizon=26, time_constraints=1):
+    return dict(
+        SAMPLE_REQUEST,
+        carbonUnitNeeds={str(year): need for year, need in dense_needs(horizon).items()},
+        timeConstraints=time_constraints,
+    )
+
+
+def bench_worker(args):
+    """Cold one-shot main.py processes versus a warm main.py --worker process."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    payload = json.dumps(sample_request())
+
+    cold = []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, script, payload], check=True, capture_output=True)
+        cold.append((time.perf_counter() - start) * 1000)
+
+    warm = []
+    process = subprocess.Popen(
+        [sys.executable, script, "--worker"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        for request_id in range(args.requests):
+            start = time.perf_counter()
+            process.stdin.write(json.dumps({"id": request_id, "input": json.loads(payload)}) + "\n")
+            process.stdin.flush()
+            response = json.loads(process.stdout.readline())
+            warm.append((time.perf_counter() - start) * 1000)
+            assert response["id"] == request_id and "result" in response, response
+    finally:
+        process.stdin.close()
+        process.wait()
+
+    return [latency_row("cold", cold), latency_row("warm", warm)]
+
+
+def bench_cache(args):
+    """Uncached solves versus memory and SQLite hits of the result cache."""
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cache.sqlite")
+        for horizon in (26, 50):
+            request = sample_request(horizon)
+            miss_ms, _ = timed(lambda: solve_uncached(request), args.repeat)
+
+            cache = ResultCache(path=path)
+            cached(solve_uncached, request, cache)
+            memory_ms, _ = timed(lambda: cached(solve_uncached, request, cache), args.repeat)
+
+            def disk_hit():
+                cache.memory.clear()
+                return cached(solve_uncached, request, cache)
+
+            disk_ms, _ = timed(disk_hit, args.repeat)
+            rows.append({
+                "horizon": horizon,
+                "solve_ms": round(miss_ms, 3),
+                "memory_hit_ms": round(memory_ms, 3),
+                "disk_hit_ms": round(disk_ms, 3),
+                **{name: value for name, value in cache.stats().items() if name != "version"},
+            })
+    return rows
+
+
+def nudged_requests(horizon, time_constraints, count, seed=0):
+    """Requests moving a typology slider, a region share and one need, as in the UI."""
+    generator = random.Random(seed)
+    requests = []
+    for _ in range(count):
+        request = json.loads(json.dumps(sample_request(horizon, time_constraints)))
+        shift = generator.uniform(-0.1, 0.1)
+        request["typology"]["nbsRemoval"] += shift
+        request["typology"]["nbsAvoidance"] -= shift
+        shift = generator.uniform(-0.05, 0.05)
+        request["regionAllocation"]["europe"] += shift
+        request["regionAllocation"]["africa"] -= shift
+        year = generator.choice(list(request["carbonUnitNeeds"]))
+        request["carbonUnitNeeds"][year] *= generator.uniform(0.5, 2.0)
+        requests.append(dict(request, cache=False))
+    return requests
+
+
+def bench_session(args):
+    """Rebuilding the model for every request versus re-solving a warm session."""
+    rows = []
+    for horizon in args.horizons:
+        for time_constraints in (1, 5, -1):
+            requests = nudged_requests(horizon, time_constraints, args.requests)
+            for mode in ("rebuild", "session"):
+                timings = []
+                for request in requests:
+                    start = time.perf_counter()
+                    solve_request(dict(request, session=mode == "session"))
+                    timings.append((time.perf_counter() - start) * 1000)
+                row = latency_row(mode, timings[1:])
+                rows.append({"horizon": horizon, "timeConstraints": time_constraints, **row})
+    return rows
+
+
+def bench_formats(args):
+    """Extraction, serialization and parsing time of every result format."""
+    rows = []
+    for horizon in args.horizons:
+        years = purchase_years(1, BASE_YEAR + horizon - 1)
+        price, stock_delivery = purchase_tensors(years)
+        need_periods = list(range(horizon))
+        model = build_model(
+            price, stock_delivery, need_periods, list(dense_needs(horizon).values()),
+            SAMPLE_REQUEST["financing"], SAMPLE_REQUEST["typology"],
+            SAMPLE_REQUEST["regionAllocation"], True, True,
+        )
+        values = model.purchases(solve(model).values)
+        # Every purchase variable, as for a plan spread over all the combinations
+        dense_values = values + 1.0
+
+        for name, plan in (("solution", values), ("all_variables", dense_values)):
+            for result_format in RESULT_FORMATS:
+                def extract():
+                    return format_results(extract_purchases(years, price, plan), result_format)
+
+                extract_ms, results = timed(extract, args.repeat)
+                dumps_ms, payload = timed(lambda: json.dumps(results), args.repeat)
+                loads_ms, _ = timed(lambda: json.loads(payload), args.repeat)
+                rows.append({
+                    "horizon": horizon,
+                    "plan": name,
+                    "format": result_format,
+                    "purchases": int((plan > 0).sum()),
+                    "extract_ms": round(extract_ms, 3),
+                    "dumps_ms": round(dumps_ms, 3),
+                    "loads_ms": round(loads_ms, 3),
+                    "bytes": len(payload),
+                })
+    return rows
+
+
+def bench_server(args):
+    """Concurrent clients against server.py : status codes and latency per worker count."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.py")
+    payload = json.dumps(sample_request()).encode()
+    url = f"http://127.0.0.1:{args.port}"
+
+    def post():
+        start = time.perf_counter()
+        request = urllib.request.Request(f"{url}/solve", data=payload, method="POST")
+        try:
+            with urllib.request.urlopen(request) as response:
+                status = response.status
+        except urllib.error.HTTPError as error:
+            status = error.code
+        return status, (time.perf_counter() - start) * 1000
+
+    rows = []
+    for workers in args.workers:
+        process = subprocess.Popen([
+            sys.executable, script, "--host", "127.0.0.1", "--port", str(args.port),
+            "--workers", str(workers), "--queue-size", str(args.queue_size),
+        ])
+        try:
+            for _ in range(50):
+                try:
+                    urllib.request.urlopen(f"{url}/health").close()
+                    break
+                except OSError:
+                    time.sleep(0.1)
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(args.concurrency) as clients:
+                responses = list(clients.map(lambda _: post(), range(args.requests)))
+            elapsed = time.perf_counter() - start
+        finally:
+            process.terminate()
+            process.wait()
+
+        solved = [latency for status, latency in responses if status == 200]
+        row = latency_row(f"{workers} workers", solved or [0.0])
+        row.update({
+            "requests": len(responses),
+            "ok": len(solved),
+            "rejected": sum(status == 429 for status, _ in responses),
+            "timeouts": sum(status == 504 for status, _ in responses),
+            "solves_per_s": round(len(solved) / elapsed, 1),
+        })
+        rows.append(row)
+    return rows
+
+
+# Cadence and budget band of each algo wrapper
+SUITE_ALGOS = {
+    "yearlyAlgo": (1, BUDGET_BANDS[TimeConstraint.Yearly]),
+    "fiveYearAlgo": (5, BUDGET_BANDS[TimeConstraint.FiveYear]),
+    "flexibleAlgo": (1, BUDGET_BANDS[TimeConstraint.NoConstraint]),
+}
+
+SUITE_HORIZONS = [2030, 2040, 2050, 2070]
+
+BUILD_PHASES = ("template", "tensors", "build")
+EXTRACT_PHASES = ("extract",)
+
+
+def suite_needs(last_year, density):
+    """Dense : a need every year. Sparse : a need every 5 years and at last_year."""
+    step = 1 if density == "dense" else 5
+    years = sorted(set(range(BASE_YEAR, last_year + 1, step)) | {last_year})
+    return {year: 1_000 * (year - BASE_YEAR + 1) for year in years}
+
+
+def peak_rss_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def suite_case(algo, last_year, density, optimizeFinancing, optimizeRegion, repeat):
+    """Median build, solve and extract times of one case of the suite."""
+    cadence, budget_band = SUITE_ALGOS[algo]
+    carbon_needs = suite_needs(last_year, density)
+    timings = []
+    for _ in range(repeat):
+        profiler = Profiler()
+        try:
+            budgetAlgo(
+                SAMPLE_REQUEST["financing"], SAMPLE_REQUEST["typology"],
+                SAMPLE_REQUEST["regionAllocation"], carbon_needs, optimizeFinancing, optimizeRegion,
+                cadence=cadence, budget_band=budget_band, profiler=profiler,
+            )
+        except BudgetError:
+            # Infeasible cases are timed too, their status is in the diagnostics
+            pass
+        diagnostics = profiler.diagnostics()
+        phases = {name: timing["wall_ms"] for name, timing in diagnostics["phases"].items()}
+        build = sum(phases.pop(name, 0.0) for name in BUILD_PHASES)
+        extract = sum(phases.pop(name, 0.0) for name in EXTRACT_PHASES)
+        timings.append((build, sum(phases.values()), extract, diagnostics))
+
+    build_ms, solve_ms, extract_ms = (
+        statistics.median(timing[phase] for timing in timings) for phase in range(3)
+    )
+    diagnostics = timings[-1][3]
+    return {
+        "case": f"{algo}/{last_year}/{density}/{int(optimizeFinancing)}{int(optimizeRegion)}",
+        "constraints": diagnostics["model"]["constraints"],
+        "nnz": diagnostics["model"]["nnz"],
+        "status": diagnostics["solver"]["status"],
+        "build_ms": round(build_ms, 3),
+        "solve_ms": round(solve_ms, 3),
+        "extract_ms": round(extract_ms, 3),
+        "total_ms": round(build_ms + solve_ms + extract_ms, 3),
+        "objective": diagnostics["solver"]["objective"],
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def compare_to_baseline(rows, baseline, threshold, min_delta_ms):
+    """
+    Add the baseline time and relative change to every row. A case regresses when
+    it is slower than the baseline by more than `threshold` and `min_delta_ms`,
+    or when its objective changed.
+    """
+    previous = {row["case"]: row for row in baseline["cases"]}
+    regressions = []
+    for row in rows:
+        before = previous.get(row["case"])
+        if before is None:
+            row.update(baseline_ms=None, change=None, regressed=False)
+            continue
+
+        delta = row["total_ms"] - before["total_ms"]
+        objective_changed = (before["objective"] is None) != (row["objective"] is None) or (
+            row["objective"] is not None
+            and abs(row["objective"] - before["objective"]) > 1e-6 * max(1.0, abs(before["objective"]))
+        )
+        regressed = objective_changed or (
+            delta > min_delta_ms and delta > threshold * before["total_ms"]
+        )
+        row.update(
+            baseline_ms=before["total_ms"],
+            change=f"{delta / before['total_ms']:+.0%}" if before["total_ms"] else None,
+            regressed=regressed,
+        )
+        if regressed:
+            regressions.append(row["case"])
+    return regressions
+
+
+def bench_suite(args):
+    """yearly/fiveYear/flexible x horizons x sparse/dense needs x optimize flags."""
+    rows = []
+    for algo in SUITE_ALGOS:
+        for last_year in args.horizons:
+            for density in ("sparse", "dense"):
+                for optimizeFinancing in (False, True):
+                    for optimizeRegion in (False, True):
+                        rows.append(suite_case(
+                            algo, last_year, density, optimizeFinancing, optimizeRegion, args.repeat,
+                        ))
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump({
+                "python": sys.version.split()[0],
+                "repeat": args.repeat,
+                "peak_rss_mb": peak_rss_mb(),
+                "cases": rows,
+            }, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare_to_baseline(rows, json.load(file), args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"{len(regressions)} regressions: {', '.join(regressions)}", file=sys.stderr)
+            args.failed = True
+    return rows
+
+
+def print_table(rows):
+    columns = list(rows[0].keys())
+    widths = [max(len(column), *(len(str(row[column])) for row in rows)) for column in columns]
+    print("  ".join(column.rjust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(row[column]).rjust(width) for column, width in zip(columns, widths)))
+
+
+def cold_first_solve(request, templates_path):
+    """Time to the first response of a new main.py --worker process, and its phases."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, script, "--worker"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        env=dict(os.environ, ALGO_BUDGET_TEMPLATES=templates_path),
+    )
+    try:
+        process.stdin.write(json.dumps({"id": 0, "input": dict(request, profile=True)}) + "\n")
+        process.stdin.flush()
+        response = json.loads(process.stdout.readline())
+        elapsed = (time.perf_counter() - start) * 1000
+    finally:
+        process.stdin.close()
+        process.wait()
+    assert "result" in response, response
+    return elapsed, response["result"]["diagnostics"]["phases"]
+
+
+def bench_coldstart(args):
+    """Time to first solve of cold worker processes, with and without compiled model templates."""
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "model_templates.bin")
+        write_templates(path)
+        for time_constraints in args.time_constraints:
+            # The request of the front end, see src/pages/api/run-python-budget-algo.ts
+            request = dict(
+                sample_request(time_constraints=time_constraints),
+                aggregate=True, format="columnar", session=True,
+            )
+            for mode, templates_path in (("build", ""), ("templates", path)):
+                timings, model_ms = [], []
+                for _ in range(args.processes):
+                    elapsed, phases = cold_first_solve(request, templates_path)
+                    timings.append(elapsed)
+                    model_ms.append(sum(
+                        phases[name]["wall_ms"] for name in BUILD_PHASES if name in phases
+                    ))
+                row = latency_row(f"{time_constraints}/{mode}", timings)
+                row["model_ms"] = round(statistics.median(model_ms), 2)
+                rows.append(row)
+    return rows
+
+
+# Interpreter start to first byte of the one-shot main.py, in ms, on a 1 CPU machine
+STARTUP_BUDGET_MS = {
+    "rejected": 40,
+    "solved": 160,
+}
+
+
+def startup_imports(payload):
+    """(module, cumulative ms) of the top-level imports of main.py, from -X importtime."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", script, payload],
+        capture_output=True, text=True, env=dict(os.environ, ALGO_BUDGET_CACHE_DB=""),
+    )
+    imports = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = line.split("|")
+        # Top-level imports are not indented past the column separator
+        if cumulative.strip().isdigit() and not module[1:].startswith(" "):
+            imports.append((module.strip(), int(cumulative) / 1000))
+    return imports
+
+
+def first_byte_ms(argv, stdin=None):
+    """
+    Time from the start of a one-shot main.py process with the arguments `argv`
+    (and the bytes `stdin`) to the first byte of its output.
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, script, *argv], stdout=subprocess.PIPE,
+        stdin=subprocess.PIPE if stdin is not None else None,
+        env=dict(os.environ, ALGO_BUDGET_CACHE_DB=""),
+    )
+    if stdin is not None:
+        process.stdin.write(stdin)
+        process.stdin.close()
+    process.stdout.read(1)
+    elapsed = (time.perf_counter() - start) * 1000
+    process.stdout.read()
+    process.wait()
+    return elapsed
+
+
+def bench_startup(args):
+    """Start-up time of the one-shot main.py against STARTUP_BUDGET_MS, with its slowest imports."""
+    payloads = {
+        "rejected": dict(sample_request(), typology={}),
+        "solved": dict(sample_request(), cache=False),
+    }
+    rows = []
+    for case, request in payloads.items():
+        payload = json.dumps(request)
+        timings = [first_byte_ms([payload]) for _ in range(args.processes)]
+        imports = startup_imports(payload)
+        p50 = percentile(timings, 50)
+        rows.append({
+            "case": case,
+            "processes": len(timings),
+            "p50_ms": round(p50, 2),
+            "budget_ms": STARTUP_BUDGET_MS[case],
+            "over_budget": p50 > STARTUP_BUDGET_MS[case],
+            "imports_ms": round(sum(ms for _, ms in imports), 2),
+            "slowest_imports": ", ".join(
+                f"{module} {ms:.1f}" for module, ms in sorted(imports, key=lambda item: -item[1])[:4]
+            ),
+        })
+    args.failed = any(row["over_budget"] for row in rows)
+    return rows
+
+
+def streamed(write, repeat):
+    """(mean ms, peak traced bytes) of `write` into os.devnull."""
+    with open(os.devnull, "w") as stream:
+        elapsed, _ = timed(lambda: write(stream), repeat)
+        tracemalloc.start()
+        write(stream)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed, peak
+
+
+def bench_io(args):
+    """Whole-string against streamed output of large results, and the main.py input modes."""
+    rows = []
+    for horizon in args.horizons:
+        # No budget band : a yearly plan over 75 years cannot hold the yearly band
+        request = sample_request(horizon, time_constraints=-1)
+        years = purchase_years(1, BASE_YEAR + horizon - 1)
+        price, stock_delivery = purchase_tensors(years)
+        model = build_model(
+            price, stock_delivery, list(range(horizon)), list(dense_needs(horizon).values()),
+            request["financing"], request["typology"], request["regionAllocation"], True, True,
+        )
+        # Every purchase variable, the largest result of the horizon
+        plan = model.purchases(solve(model).values) + 1.0
+        for result_format in RESULT_FORMATS:
+            result = {"results": format_results(extract_purchases(years, price, plan), result_format)}
+            size = len(json.dumps(result))
+            for mode, write in (
+                ("dumps", lambda stream: stream.write(json.dumps(result))),
+                ("streamed", lambda stream: write_json(result, stream)),
+            ):
+                elapsed, peak = streamed(write, args.repeat)
+                rows.append({
+                    "horizon": horizon,
+                    "case": f"{mode} {result_format}",
+                    "bytes": size,
+                    "ms": round(elapsed, 3),
+                    "peak_kb": round(peak / 1024, 1),
+                })
+
+        payload = json.dumps(dict(request, cache=False))
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as file:
+            file.write(payload)
+            file.flush()
+            for mode, argv, stdin in (
+                ("input argv", [payload], None),
+                ("input stdin", ["-"], payload.encode()),
+                ("input file", ["--input", file.name], None),
+            ):
+                timings = [first_byte_ms(argv, stdin) for _ in range(args.repeat)]
+                rows.append({
+                    "horizon": horizon,
+                    "case": mode,
+                    "bytes": len(payload),
+                    "ms": round(percentile(timings, 50), 2),
+                    "peak_kb": None,
+                })
+    return rows
+
+
+def bench_timelimit(args):
+    """Plans of solves stopped at a time limit against the optimal plan, per solver."""
+    rows = []
+    for horizon in args.horizons:
+        for time_constraints in (1, 5, -1):
+            request = dict(sample_request(horizon, time_constraints), cache=False)
+            optimal = solve_request(request)["total_price"]
+            for solver in SOLVERS:
+                for limit in args.limits:
+                    ms, result = timed(lambda: solve_request(dict(request, solver=solver, timeLimit=limit)), 1)
+                    rows.append({
+                        "horizon": horizon,
+                        "time_constraints": time_constraints,
+                        "solver": solver,
+                        "limit_s": limit,
+                        "ms": round(ms, 1),
+                        "status": result["status"],
+                        "plan": result.get("plan", "solver"),
+                        "over_optimal": round(result["total_price"] / optimal - 1, 4),
+                        "gap": round(result.get("gap", 0.0), 4),
+                    })
+    return rows
+
+
+def bench_compare(args):
+    """One request per cadence against one "compare" request, sequential and in a pool."""
+    rows = []
+    for horizon in args.horizons:
+        request = dict(sample_request(horizon), cache=False)
+        del request["timeConstraints"]
+        names = list(COMPARE_CADENCES)
+        separate = lambda: [
+            solve_request(dict(request, timeConstraints=COMPARE_CADENCES[name])) for name in names
+        ]
+        compared = dict(request, compare=names)
+        for mode, run in (
+            ("separate requests", separate),
+            ("compare, 1 worker", lambda: compare_request(compared, workers=1)),
+            (f"compare, {os.cpu_count()} workers", lambda: compare_request(compared)),
+        ):
+            ms, _ = timed(run, args.repeat)
+            rows.append({"horizon": horizon, "mode": mode, "ms": round(ms, 1)})
+    return rows
+
+
+def bench_sweep(args):
+    """Latin hypercube sweeps of 4 shares, warm chunks against a model built per point."""
+    import sweep
+
+    rows = []
+    for horizon in args.horizons:
+        for time_constraints in (1, 5, -1):
+            request = dict(sample_request(horizon, time_constraints), sweep={
+                "typology": {"biochar": [0, 0.3], "nbsAvoidance": [0.1, 0.5]},
+                "regionAllocation": {"europe": [0.1, 0.5], "asia": [0, 0.3]},
+                "method": "lhs",
+                "points": args.points,
+            })
+            chunk = sweep.SWEEP_CHUNK
+            for mode, size in (("warm", chunk), ("cold", 1)):
+                sweep.SWEEP_CHUNK = size
+                try:
+                    result = sweep_request(request)
+                finally:
+                    sweep.SWEEP_CHUNK = chunk
+                rows.append({
+                    "horizon": horizon,
+                    "time_constraints": time_constraints,
+                    "mode": mode,
+                    "points": result["points"],
+                    "solved": result["solved"],
+                    "seconds": result["seconds"],
+                    "points_per_min": round(result["points"] / result["seconds"] * 60),
+                })
+    return rows
+
+
+def bench_frontier(args):
+    """Frontiers of the last need and of all needs, against cold solves at their breakpoints."""
+    rows = []
+    for horizon in args.horizons:
+        for time_constraints in (1, 5, -1):
+            request = dict(sample_request(horizon, time_constraints), cache=False)
+            last_year = max(int(year) for year in request["carbonUnitNeeds"])
+            for case, spec in (
+                ("all needs x0.5-1.5", {"multiplier": [0.5, 1.5]}),
+                (f"{last_year} need x0.5-3", {"multiplier": [0.5, 3.0], "years": [last_year]}),
+            ):
+                spec_years = [str(year) for year in spec.get("years", request["carbonUnitNeeds"])]
+                frontier_ms, result = timed(lambda: frontier_request(dict(request, frontier=spec)), 1)
+                multipliers = result["frontier"]["multiplier"]
+                cold = lambda: [
+                    solve_request(dict(request, carbonUnitNeeds={
+                        year: need * (multiplier if year in spec_years else 1)
+                        for year, need in request["carbonUnitNeeds"].items()
+                    }))
+                    for multiplier in multipliers
+                ]
+                cold_ms, _ = timed(cold, 1)
+                rows.append({
+                    "horizon": horizon,
+                    "time_constraints": time_constraints,
+                    "case": case,
+                    "breakpoints": len(multipliers),
+                    "solves": result["solves"],
+                    "frontier_ms": round(frontier_ms, 1),
+                    "cold_breakpoints_ms": round(cold_ms, 1),
+                })
+    return rows
+
+
+def bench_uncertainty(args):
+    """Cost distribution of the optimal plan under sampled price paths."""
+    rows = []
+    for horizon in args.horizons:
+        carbon_needs = dense_needs(horizon)
+        for cadence, budget_band in ((1, (0.015, 0.08)), (5, (0.015, 0.40)), (1, None)):
+            years = purchase_years(cadence, BASE_YEAR + horizon - 1)
+            need_periods = [(int(year) - BASE_YEAR) // cadence for year in carbon_needs]
+            price, stock_delivery = purchase_tensors(years)
+            model = build_model(
+                price, stock_delivery, need_periods, list(carbon_needs.values()),
+                SAMPLE_REQUEST["financing"], SAMPLE_REQUEST["typology"],
+                SAMPLE_REQUEST["regionAllocation"], False, False, budget_band,
+            )
+            solution = solve(model)
+            values = model.purchases(solution.values)
+            for paths in args.paths:
+                options = uncertainty_options({"paths": paths})
+                ms, result = timed(lambda: price_distribution(years, price, values, options), 3)
+                rows.append({
+                    "horizon": horizon,
+                    "cadence": cadence,
+                    "budget_band": "yes" if budget_band else "no",
+                    "paths": paths,
+                    "ms": round(ms, 1),
+                    "mean_vs_plan": round(result["mean"] / solution.objective - 1, 4),
+                    "p5": round(result["percentiles"]["p5"]),
+                    "p95": round(result["percentiles"]["p95"]),
+                })
+    return rows
+
+
+def stochastic_case(request, connection):
+    """Run in a forked process : the stochastic result summary and the peak RSS of the process."""
+    try:
+        result = stochastic_request(request)
+        connection.send({**result["stochastic"], "status": result["status"], "peak_rss_mb": peak_rss_mb()})
+    except BudgetError as error:
+        connection.send({"status": error.code, "peak_rss_mb": peak_rss_mb()})
+
+
+def bench_stochastic(args):
+    """Extensive form versus Benders decomposition of the stochastic plan, one forked process each."""
+    context = multiprocessing.get_context("fork")
+    rows = []
+    for horizon in args.horizons:
+        for time_constraints in (1, 5, -1):
+            request = sample_request(horizon, time_constraints)
+            for scenarios in args.scenarios:
+                for method in ("extensive", "benders"):
+                    spec = {"scenarios": scenarios, "objective": args.objective, "method": method}
+                    receiver, sender = context.Pipe(duplex=False)
+                    process = context.Process(
+                        target=stochastic_case, args=(dict(request, stochastic=spec, timeLimit=600), sender),
+                    )
+                    process.start()
+                    summary = receiver.recv()
+                    process.join()
+                    rows.append({
+                        "horizon": horizon,
+                        "time_constraints": time_constraints,
+                        "scenarios": scenarios,
+                        "method": method,
+                        "status": summary["status"],
+                        "seconds": summary.get("seconds"),
+                        "iterations": summary.get("iterations"),
+                        "objective": round(summary["objective_value"]) if "objective_value" in summary else None,
+                        "peak_rss_mb": summary["peak_rss_mb"],
+                    })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Budget optimizer benchmarks")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    needs = subparsers.add_parser("needs", help=bench_needs.__doc__)
+    needs.add_argument("--horizons", type=int, nargs="+", default=[26, 50, 65])
+    needs.add_argument("--repeat", type=int, default=3)
+    needs.set_defaults(run=bench_needs)
+
+    solvers = subparsers.add_parser("solvers", help=bench_solvers.__doc__)
+    solvers.add_argument("--horizons", type=int, nargs="+", default=[26, 50])
+    solvers.add_argument("--repeat", type=int, default=5)
+    solvers.set_defaults(run=bench_solvers)
+
+    worker = subparsers.add_parser("worker", help=bench_worker.__doc__)
+    worker.add_argument("--requests", type=int, default=50)
+    worker.set_defaults(run=bench_worker)
+
+    cache = subparsers.add_parser("cache", help=bench_cache.__doc__)
+    cache.add_argument("--repeat", type=int, default=20)
+    cache.set_defaults(run=bench_cache)
+
+    session = subparsers.add_parser("session", help=bench_session.__doc__)
+    session.add_argument("--horizons", type=int, nargs="+", default=[26, 50])
+    session.add_argument("--requests", type=int, default=30)
+    session.set_defaults(run=bench_session)
+
+    formats = subparsers.add_parser("formats", help=bench_formats.__doc__)
+    formats.add_argument("--horizons", type=int, nargs="+", default=[26, 100])
+    formats.add_argument("--repeat", type=int, default=20)
+    formats.set_defaults(run=bench_formats)
+
+    suite = subparsers.add_parser("suite", help=bench_suite.__doc__)
+    suite.add_argument("--horizons", type=int, nargs="+", default=SUITE_HORIZONS,
+                       help="last need years")
+    suite.add_argument("--repeat", type=int, default=3)
+    suite.add_argument("--save", help="write the results as a JSON baseline")
+    suite.add_argument("--compare", help="JSON baseline to diff against")
+    suite.add_argument("--threshold", type=float, default=0.25,
+                       help="relative slowdown counted as a regression")
+    suite.add_argument("--min-delta-ms", type=float, default=1.0,
+                       help="ignore slowdowns smaller than this")
+    suite.set_defaults(run=bench_suite)
+
+    server = subparsers.add_parser("server", help=bench_server.__doc__)
+    server.add_argument("--requests", type=int, default=50)
+    server.add_argument("--concurrency", type=int, default=25)
+    server.add_argument("--workers", type=int, nargs="+", default=[1])
+    server.add_argument("--queue-size", type=int, default=8)
+    server.add_argument("--port", type=int, default=8099)
+    server.set_defaults(run=bench_server)
+
+    coldstart = subparsers.add_parser("coldstart", help=bench_coldstart.__doc__)
+    coldstart.add_argument("--processes", type=int, default=10)
+    coldstart.add_argument("--time-constraints", type=int, nargs="+", default=[1, 5, -1])
+    coldstart.set_defaults(run=bench_coldstart)
+
+    startup = subparsers.add_parser("startup", help=bench_startup.__doc__)
+    startup.add_argument("--processes", type=int, default=10)
+    startup.set_defaults(run=bench_startup)
+
+    io = subparsers.add_parser("io", help=bench_io.__doc__)
+    io.add_argument("--horizons", type=int, nargs="+", default=[26, 75])
+    io.add_argument("--repeat", type=int, default=5)
+    io.set_defaults(run=bench_io)
+
+    timelimit = subparsers.add_parser("timelimit", help=bench_timelimit.__doc__)
+    timelimit.add_argument("--horizons", type=int, nargs="+", default=[26, 50])
+    timelimit.add_argument("--limits", type=float, nargs="+", default=[0.0001, 0.01, 2.0])
+    timelimit.set_defaults(run=bench_timelimit)
+
+    compare = subparsers.add_parser("compare", help=bench_compare.__doc__)
+    compare.add_argument("--horizons", type=int, nargs="+", default=[26, 50])
+    compare.add_argument("--repeat", type=int, default=5)
+    compare.set_defaults(run=bench_compare)
+
+    sweep = subparsers.add_parser("sweep", help=bench_sweep.__doc__)
+    sweep.add_argument("--horizons", type=int, nargs="+", default=[26, 50])
+    sweep.add_argument("--points", type=int, default=1000)
+    sweep.set_defaults(run=bench_sweep)
+
+    frontier = subparsers.add_parser("frontier", help=bench_frontier.__doc__)
+    frontier.add_argument("--horizons", type=int, nargs="+", default=[26, 50])
+    frontier.set_defaults(run=bench_frontier)
+
+    uncertainty = subparsers.add_parser("uncertainty", help=bench_uncertainty.__doc__)
+    uncertainty.add_argument("--horizons", type=int, nargs="+", default=[26, 50])
+    uncertainty.add_argument("--paths", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    uncertainty.set_defaults(run=bench_uncertainty)
+
+    stochastic = subparsers.add_parser("stochastic", help=bench_stochastic.__doc__)
+    stochastic.add_argument("--horizons", type=int, nargs="+", default=[26, 50])
+    stochastic.add_argument("--scenarios", type=int, nargs="+", default=[50, 200, 500])
+    stochastic.add_argument("--objective", choices=["expected", "cvar"], default="expected")
+    stochastic.set_defaults(run=bench_stochastic)
+
+    args = parser.parse_args()
+    rows = args.run(args)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_table(rows)
+    if getattr(args, "failed", False):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Content-addressed cache of budget results.
+
+A request is canonicalized (sorted keys, rounded floats, integer years) and
+hashed together with CONSTANTS_VERSION, so entries are invalidated whenever
+constants.py changes. Results live in an in-memory LRU and, optionally, in a
+size-bounded SQLite file shared by every process of the service. Each
+process opens its own connection to the file on first use, as a connection
+must not cross a fork.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from plans import cadence_for_time_constraint
+from solvers import DEFAULT_SOLVER
+
+
+# Request fields that change the result
+KEY_FIELDS = (
+    "financing", "typology", "regionAllocation", "carbonUnitNeeds", "timeConstraints",
+    "optimizeFinancing", "optimizeRegion", "budgetBand", "cumulativeNeeds", "solver", "format",
+    "aggregate", "duals", "whatIf", "uncertainty",
+)
+
+FLOAT_DIGITS = 9
+
+MEMORY_CACHE_SIZE = int(os.environ.get("ALGO_BUDGET_CACHE_SIZE", 256))
+DISK_CACHE_PATH = os.environ.get("ALGO_BUDGET_CACHE_DB")
+DISK_CACHE_MAX_BYTES = int(os.environ.get("ALGO_BUDGET_CACHE_MAX_BYTES", 64 << 20))
+
+
+def _constants_version():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "constants.py")
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()[:16]
+
+
+CONSTANTS_VERSION = _constants_version()
+
+
+def _canonical(value):
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        value = round(float(value), FLOAT_DIGITS)
+        return int(value) if value.is_integer() else value
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    raise TypeError(f"Cannot canonicalize {type(value).__name__}")
+
+
+def canonical_request(input_json):
+    """
+    The fields of `input_json` that change the result, in canonical form. The
+    timeConstraints and budgetBand are keyed by the cadence and band they
+    resolve to, and the solver by its name.
+    """
+    canonical = {field: _canonical(input_json.get(field)) for field in KEY_FIELDS}
+    cadence, budget_band = cadence_for_time_constraint(
+        input_json.get("timeConstraints"), input_json.get("budgetBand"),
+    )
+    canonical["timeConstraints"] = _canonical(cadence)
+    canonical["budgetBand"] = _canonical(budget_band)
+    canonical["solver"] = input_json.get("solver") or DEFAULT_SOLVER
+    for flag in ("optimizeFinancing", "optimizeRegion", "cumulativeNeeds", "aggregate", "duals"):
+        canonical[flag] = bool(input_json.get(flag))
+    canonical["format"] = input_json.get("format") or "records"
+    needs = input_json.get("carbonUnitNeeds") or {}
+    canonical["carbonUnitNeeds"] = sorted(
+        (int(year), _canonical(need)) for year, need in needs.items()
+    )
+    return canonical
+
+
+def request_key(input_json):
+    payload = json.dumps(canonical_request(input_json), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{CONSTANTS_VERSION}:{payload}".encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Two tiers : `memory_size` results in an LRU dict, and an optional SQLite
+    file at `path` evicting the least recently used entries past `max_bytes`.
+    The file is opened lazily, once per process.
+    """
+
+    def __init__(self, memory_size=MEMORY_CACHE_SIZE, path=None, max_bytes=DISK_CACHE_MAX_BYTES):
+        self.memory_size = memory_size
+        self.max_bytes = max_bytes
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self.path = path
+        self.pid = os.getpid()
+        self.connection = None
+
+    def _check_process(self):
+        # A forked child must neither use the parent's connection nor its
+        # lock, which another thread may have held at the fork
+        if self.pid != os.getpid():
+            self.pid, self.lock, self.connection = os.getpid(), threading.Lock(), None
+
+    @property
+    def db(self):
+        """The SQLite connection of this process, opened on first use."""
+        if self.connection is None and self.path:
+            self.connection = self._open(self.path)
+        return self.connection
+
+    def _open(self, path):
+        # Only the processes sharing a disk cache pay for the sqlite3 import
+        import sqlite3
+
+        db = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, version TEXT, value TEXT, size INTEGER, used REAL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS results_used ON results (used)")
+        db.execute("DELETE FROM results WHERE version != ?", (CONSTANTS_VERSION,))
+        return db
+
+    def get(self, key):
+        """The cached result of `key`, or None."""
+        self._check_process()
+        with self.lock:
+            value = self.memory.get(key)
+            if value is not None:
+                self.memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return json.loads(value)
+
+            if self.db is not None:
+                row = self.db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self.db.execute("UPDATE results SET used = ? WHERE key = ?", (time.time(), key))
+                    self._remember(key, row[0])
+                    self.counters["disk_hits"] += 1
+                    return json.loads(row[0])
+
+            self.counters["misses"] += 1
+            return None
+
+    def put(self, key, result):
+        value = json.dumps(result)
+        self._check_process()
+        with self.lock:
+            self._remember(key, value)
+            if self.db is not None:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                    (key, CONSTANTS_VERSION, value, len(value), time.time()),
+                )
+                self._evict_disk()
+
+    def _remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def _evict_disk(self):
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Oldest entries first, until the file is back under max_bytes
+        freed = 0
+        for key, size in self.db.execute("SELECT key, size FROM results ORDER BY used").fetchall():
+            if total - freed <= self.max_bytes:
+                break
+            self.db.execute("DELETE FROM results WHERE key = ?", (key,))
+            freed += size
+            self.counters["evictions"] += 1
+
+    def stats(self):
+        self._check_process()
+        stats = dict(self.counters, version=CONSTANTS_VERSION, memory_entries=len(self.memory))
+        if self.db is not None:
+            stats["disk_entries"], stats["disk_bytes"] = self.db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+        return stats
+
+    def clear(self):
+        self._check_process()
+        with self.lock:
+            self.memory.clear()
+            if self.db is not None:
+                self.db.execute("DELETE FROM results")
+
+
+RESULT_CACHE = ResultCache(path=DISK_CACHE_PATH)
+
+
+def cached(solve, input_json, cache=RESULT_CACHE):
+    """
+    solve(input_json), served from `cache` when an identical request was solved
+    before. Plans of solves stopped at their time limit are not cached.
+    """
+    key = request_key(input_json)
+    result = cache.get(key)
+    if result is None:
+        result = solve(input_json)
+        if result.get("optimal", True):
+            cache.put(key, result)
+    return result
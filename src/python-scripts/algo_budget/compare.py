@@ -0,0 +1,107 @@
+"""
+Plans of one request under several cadences, solved side by side.
+
+A request with "compare": ["yearly", "fiveYear", "flexible"] is solved once
+per cadence (its timeConstraints is replaced, see COMPARE_CADENCES), each in
+a process of a forked pool. The price and delivery tensors of every cadence
+are computed before the fork, so the workers share them instead of building
+them three times. The response holds the plan of each cadence, or its error
+fields (see errors.py), and the cost of each plan against the cheapest one.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from errors import BudgetError, error_fields
+from plans import cadence_for_time_constraint, plan_years
+
+
+# timeConstraints of each cadence name of "compare"
+COMPARE_CADENCES = {
+    "yearly": 1,
+    "fiveYear": 5,
+    "flexible": -1,
+}
+
+
+def compared_cadences(input_json):
+    """Cadence names of the "compare" field, raises a BudgetError when one is unknown."""
+    names = input_json.get("compare")
+    if not isinstance(names, list) or not names:
+        raise BudgetError("invalid", "invalid_compare", "compare must be a non-empty list of cadences")
+    unknown = [name for name in names if name not in COMPARE_CADENCES]
+    if unknown:
+        raise BudgetError(
+            "invalid", "invalid_compare",
+            f"unknown cadences: {', '.join(map(str, unknown))}, expected {', '.join(COMPARE_CADENCES)}",
+        )
+    return list(dict.fromkeys(names))
+
+
+def warm_up(input_json, names):
+    """Compute the tensors of every compared cadence once, before the pool forks."""
+    from tensors import purchase_tensors
+
+    try:
+        last_year = max(int(year) for year in input_json.get("carbonUnitNeeds", {}))
+        for name in names:
+            cadence, _ = cadence_for_time_constraint(COMPARE_CADENCES[name], input_json.get("budgetBand"))
+            purchase_tensors(plan_years(cadence, last_year))
+    except ValueError:
+        # Invalid needs are reported by the check of each cadence
+        pass
+
+
+def solve_cadence(input_json):
+    """Result or error fields of one cadence, never raises."""
+    from main import solve_request
+
+    try:
+        return solve_request(input_json)
+    except Exception as error:
+        return error_fields(error)
+
+
+def cost_deltas(plans):
+    """Total price of each solved plan, and its difference to the cheapest one."""
+    prices = {name: plan["total_price"] for name, plan in plans.items() if "total_price" in plan}
+    if not prices:
+        return {}, None
+    cheapest = min(prices, key=prices.get)
+    deltas = {
+        name: {
+            "total_price": price,
+            "delta": price - prices[cheapest],
+            "delta_pct": (price / prices[cheapest] - 1) * 100 if prices[cheapest] > 0 else 0.0,
+        }
+        for name, price in prices.items()
+    }
+    return deltas, cheapest
+
+
+def compare_request(input_json, workers=None):
+    """
+    {"plans", "deltas", "cheapest"} of the cadences listed in "compare" :
+    the plan (or error fields) and the cost delta of each cadence, and the
+    cheapest one. Raises a BudgetError when "compare" is invalid.
+    """
+    names = compared_cadences(input_json)
+    requests = []
+    for name in names:
+        request = dict(input_json, timeConstraints=COMPARE_CADENCES[name])
+        del request["compare"]
+        requests.append(request)
+
+    workers = min(len(requests), workers or os.cpu_count() or 1)
+    if workers == 1:
+        results = [solve_cadence(request) for request in requests]
+    else:
+        warm_up(input_json, names)
+        # Forked workers share the imports and tensors of this process
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            results = list(pool.map(solve_cadence, requests))
+
+    plans = dict(zip(names, results))
+    deltas, cheapest = cost_deltas(plans)
+    return {"plans": plans, "deltas": deltas, "cheapest": cheapest}
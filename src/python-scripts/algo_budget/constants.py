@@ -90,3 +90,14 @@ coefficients = {
                     0.5, 0.5, 0.5, 0.5, 0.334, 0.334, 0.334, 0.334, 0.167, 0.167,
                     0.167, 0.167, 0, 0, 0],
 }
+
+
+# Low and high cost factors applied to the medium cost of each typology,
+# same values as typologyCostFactors in src/constants/forecasts.ts
+typology_cost_factors = {
+    "biochar": {"low": 0.545335515548282, "high": 1.45466448445172},
+    "nbsAvoidance": {"low": 0.398773006134969, "high": 1.60122699386503},
+    "nbsRemoval": {"low": 0.398773006134969, "high": 1.60122699386503},
+    "dac": {"low": 0.666666666666667, "high": 1.33333333333333},
+    "renewableEnergy": {"low": 0.44356659142, "high": 1.5},
+}
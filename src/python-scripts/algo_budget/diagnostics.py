@@ -0,0 +1,67 @@
+"""
+Per-phase timings and model sizes of a solve, returned with "profile": true.
+
+Set ALGO_BUDGET_PROFILE_DIR to also dump a cProfile stats file per request,
+readable with `python -m pstats <file>`.
+"""
+import cProfile
+import os
+import resource
+import time
+from contextlib import contextmanager
+
+
+PROFILE_DIR = os.environ.get("ALGO_BUDGET_PROFILE_DIR")
+
+
+def cpu_time():
+    """CPU seconds of this process and of its finished children (the CBC binary)."""
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+class Profiler:
+    """Wall and CPU time of named phases, plus free-form facts about the solve."""
+
+    def __init__(self):
+        self.phases = {}
+        self.facts = {}
+
+    @contextmanager
+    def phase(self, name):
+        wall, cpu = time.perf_counter(), cpu_time()
+        try:
+            yield
+        finally:
+            timing = self.phases.setdefault(name, {"wall_ms": 0.0, "cpu_ms": 0.0})
+            timing["wall_ms"] += (time.perf_counter() - wall) * 1000
+            timing["cpu_ms"] += (cpu_time() - cpu) * 1000
+
+    def record(self, section, **facts):
+        self.facts.setdefault(section, {}).update(facts)
+
+    def diagnostics(self):
+        phases = {
+            name: {key: round(value, 3) for key, value in timing.items()}
+            for name, timing in self.phases.items()
+        }
+        return {
+            "phases": phases,
+            "total_wall_ms": round(sum(timing["wall_ms"] for timing in self.phases.values()), 3),
+            "total_cpu_ms": round(sum(timing["cpu_ms"] for timing in self.phases.values()), 3),
+            **self.facts,
+        }
+
+
+def profiled(function, *args, directory=PROFILE_DIR, **kwargs):
+    """function(*args, **kwargs), under cProfile when `directory` is set."""
+    if not directory:
+        return function(*args, **kwargs)
+
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(function, *args, **kwargs)
+    finally:
+        os.makedirs(directory, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{time.perf_counter_ns()}.pstats"
+        profile.dump_stats(os.path.join(directory, name))
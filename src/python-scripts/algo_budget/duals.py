@@ -0,0 +1,193 @@
+"""
+Shadow prices of a solved budget model, and what-if answers read from them.
+
+    needs     : cost of one more ton needed at each need year
+    financing,
+    typology,
+    region    : dual of each share row. The shares sum to 1, so a share only
+                moves against another one : moving `amount` of share from
+                `source` to `target` costs total * (target - source) * amount,
+                total being the purchases the shares apply to.
+    budget    : duals of the z_min / z budget band rows
+
+With ranging (HiGHS only), each need and share also gets, unless the basis is
+degenerate on its row, the interval within which its shadow price stays exact,
+and each purchase the price interval within which the plan stays optimal. The
+answers of WhatIf are exact within these intervals, and first-order estimates
+outside of them or without them ("exact" is then left out).
+"""
+import numpy as np
+
+from models import TYPOLOGIES, REGIONS, FINANCING, FINANCING_KEYS
+
+
+# Share row group -> (request keys, auxiliary total column of the group)
+SHARE_GROUPS = {
+    "financing": (FINANCING_KEYS, "total_purch_for_on_spot_fwd"),
+    "typology": (TYPOLOGIES, "total_purch_for_typo_distrib"),
+    "region": (REGIONS, "total_purch_for_typo_distrib"),
+}
+
+
+# HiGHS reports unbounded ranging ends as +-1e30
+INFINITE_BOUND = 1e30
+
+
+def _interval(bounds):
+    """JSON-safe [lower, upper], None for an unbounded end."""
+    return [float(bound) if abs(bound) < INFINITE_BOUND else None for bound in bounds]
+
+
+def _rhs_range(bounds, rhs):
+    """
+    Interval of the right-hand side `rhs` of a row within which its dual holds,
+    None when the ranging of the row is degenerate or does not contain `rhs`.
+    """
+    lower, upper = bounds
+    tolerance = 1e-9 * max(1.0, abs(rhs))
+    if upper - lower <= tolerance or not lower - tolerance <= rhs <= upper + tolerance:
+        return None
+    return _interval(bounds)
+
+
+def _row_activity(model, row, values):
+    start, end = model.indptr[row], model.indptr[row + 1]
+    return float(model.data[start:end] @ values[model.indices[start:end]])
+
+
+def _share(model, row, col):
+    """Share of a share row : minus its coefficient on the total column, 0 when absent."""
+    start, end = model.indptr[row], model.indptr[row + 1]
+    position = start + np.searchsorted(model.indices[start:end], col)
+    if position < end and model.indices[position] == col:
+        return -float(model.data[position])
+    return 0.0
+
+
+def dual_report(model, solution, need_years, years, price, shares=None):
+    """
+    Shadow prices (and ranging when the backend provides it) of a solved model.
+    `need_years` labels the need rows, `years` the purchase periods. `shares`,
+    group -> share values, overrides the shares read from the model rows.
+    """
+    duals = solution.row_duals
+    bounds = solution.ranging["row_bounds"] if solution.ranging is not None else None
+    report = {"ranging": bounds is not None}
+
+    needs = model.row_groups["needs"]
+    report["needs"] = {}
+    for index, year in enumerate(need_years):
+        row = needs.start + index
+        rhs = float(model.row_lower[row])
+        need = report["needs"][str(year)] = {"dual": float(duals[row]), "rhs": rhs}
+        if bounds is None:
+            continue
+        activity = _row_activity(model, row, solution.values)
+        if activity > rhs + 1e-6 * max(1.0, rhs):
+            # Covered with slack : the need is free up to the stock already there
+            need["range"] = [None, activity]
+        elif (rhs_range := _rhs_range(bounds[row], rhs)) is not None:
+            need["range"] = rhs_range
+
+    for group, (keys, aux_name) in SHARE_GROUPS.items():
+        # No share rows when the financing or the regions are optimized
+        if group not in model.row_groups:
+            continue
+        rows = model.row_groups[group]
+        aux_col = model.n_purchases + model.aux_names.index(aux_name)
+        total = float(solution.values[aux_col])
+        group_shares = {}
+        for index, key in enumerate(keys):
+            row = rows.start + index
+            if shares is not None:
+                share = float(shares[group][index])
+            else:
+                share = _share(model, row, aux_col)
+            group_shares[key] = {"dual": float(duals[row]), "share": share}
+            rhs_range = _rhs_range(bounds[row], 0.0) if bounds is not None and total > 0 else None
+            if rhs_range is not None:
+                # Moving the share by d moves the row bound by d * total
+                group_shares[key]["range"] = [
+                    share + bound / total if bound is not None else None for bound in rhs_range
+                ]
+        report[group] = {"total": total, "shares": group_shares}
+
+    if "budget_min" in model.row_groups:
+        report["budget"] = {
+            "min_total": float(duals[model.row_groups["budget_min_total"].start]),
+            "max_total": float(duals[model.row_groups["budget_max_total"].start]),
+            "min": dict(zip(map(str, years), duals[model.row_groups["budget_min"]].tolist())),
+            "max": dict(zip(map(str, years), duals[model.row_groups["budget_max"]].tolist())),
+        }
+
+    if solution.ranging is not None:
+        values = model.purchases(solution.values)
+        costs = solution.ranging["costs"][:model.n_purchases].reshape(values.shape + (2,))
+        report["prices"] = [
+            {
+                "year": int(years[period]),
+                "typology": TYPOLOGIES[project],
+                "region": REGIONS[region],
+                "type": FINANCING[financing],
+                "price": float(price[project, region, period, financing]),
+                "range": _interval(costs[project, region, period, financing]),
+            }
+            for project, region, period, financing in np.argwhere(values > 0).tolist()
+        ]
+
+    return report
+
+
+class WhatIf:
+    """First-order answers to marginal questions, from a dual_report."""
+
+    def __init__(self, report):
+        self.report = report
+
+    def need(self, year, tons):
+        """Cost of needing `tons` more (or fewer, when negative) at `year`."""
+        if str(year) not in self.report["needs"]:
+            raise ValueError(f"No carbon need at {year}")
+        need = self.report["needs"][str(year)]
+        answer = {"delta_cost": need["dual"] * tons}
+        if "range" in need:
+            lower, upper = need["range"]
+            answer["exact"] = (
+                (lower is None or lower <= need["rhs"] + tons)
+                and (upper is None or need["rhs"] + tons <= upper)
+            )
+        return answer
+
+    def shift_share(self, group, source, target, amount):
+        """Cost of moving `amount` of `group` share from `source` to `target`."""
+        if group not in self.report:
+            raise ValueError(f"No {group} shares : they are optimized")
+        shares = self.report[group]["shares"]
+        for key in (source, target):
+            if key not in shares:
+                raise ValueError(f"Unknown {group} share: {key}")
+        answer = {
+            "delta_cost": self.report[group]["total"] * amount
+            * (shares[target]["dual"] - shares[source]["dual"])
+        }
+        if "range" in shares[source] and "range" in shares[target]:
+            lower, upper = shares[source]["range"][0], shares[target]["range"][1]
+            answer["exact"] = (
+                (lower is None or lower <= shares[source]["share"] - amount)
+                and (upper is None or shares[target]["share"] + amount <= upper)
+            )
+        return answer
+
+    def evaluate(self, question):
+        """
+        Answer one question :
+            {"type": "need", "year": 2035, "tons": 1}
+            {"type": "share", "group": "typology", "from": "nbsAvoidance", "to": "nbsRemoval", "amount": 0.05}
+        """
+        if question.get("type") == "need":
+            return self.need(int(question["year"]), question.get("tons", 1))
+        if question.get("type") == "share":
+            return self.shift_share(
+                question["group"], question["from"], question["to"], question["amount"],
+            )
+        raise ValueError(f"Unknown what-if question: {question.get('type')}")
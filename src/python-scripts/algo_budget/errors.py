@@ -0,0 +1,35 @@
+"""
+Structured errors of a budget request.
+
+A BudgetError carries a `status` telling callers whether retrying can help :
+
+    invalid    : malformed request (missing field, unknown key, bad value)
+    infeasible : the constraints cannot all hold, found by the pre-check or the solver
+    unbounded  : the solver found no finite minimum
+    not_solved : the solver stopped without a solution
+
+and a machine-readable `code`, listed in feasibility.py for the pre-check and
+"solver_<status>" when the solver reports a non-optimal status.
+"""
+
+
+class BudgetError(ValueError):
+    """ValueError with a status and an error code, picklable across processes."""
+
+    def __init__(self, status: str, code: str, message: str):
+        super().__init__(status, code, message)
+        self.status = status
+        self.code = code
+        self.message = message
+
+    def __str__(self):
+        return self.message
+
+
+def error_fields(error: Exception):
+    """{"error", "status", "code"} fields of a response failing with `error`."""
+    if isinstance(error, BudgetError):
+        return {"error": error.message, "status": error.status, "code": error.code}
+    if isinstance(error, ValueError):
+        return {"error": str(error), "status": "invalid", "code": "invalid_request"}
+    return {"error": str(error), "status": "error", "code": "internal_error"}
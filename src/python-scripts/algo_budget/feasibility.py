@@ -0,0 +1,193 @@
+"""
+Analytical pre-check of a budget request, run before the engine is imported.
+
+Rejects with a BudgetError the requests that cannot have a solution :
+
+    invalid    missing_share         a share key of the group is missing
+               invalid_share         a share is not a number in [0, 1]
+               invalid_need          a need year is not a year, or a need is negative
+               need_before_base_year a need is before BASE_YEAR
+               horizon_beyond_data   a need is after LAST_PLANNING_YEAR
+               invalid_cadence       no purchase year, or a cadence below 1
+               invalid_budget_band   budgetBand is not [min, max] with 0 <= min <= max <= 1
+               invalid_what_if       a whatIf question is malformed
+    infeasible shares_sum            the shares of a group do not sum to 1
+               need_before_purchase  a need comes before the first purchase year
+               budget_band           min * periods > 1 or max * periods < 1
+"""
+import math
+from typing import Dict, Optional
+
+from errors import BudgetError
+from models import TYPOLOGIES, REGIONS, FINANCING_KEYS, Financing, Typology, RegionAllocation, Cadence, BudgetBand
+from plans import BASE_YEAR, last_planning_year, plan_years
+
+
+# Prices are extrapolated past plans.LAST_DATA_YEAR, needs are accepted up to this year
+LAST_PLANNING_YEAR = last_planning_year()
+
+# The share rows force sum(shares) * total = total : only rounding errors are
+# accepted, with the tolerance of assertTypologySum in src/utils/calculations.ts
+SHARE_TOLERANCE = 1e-6
+
+
+def check_shares(group, shares, keys):
+    missing = [key for key in keys if key not in shares]
+    if missing:
+        raise BudgetError("invalid", "missing_share", f"missing {group} shares: {', '.join(missing)}")
+
+    for key in keys:
+        share = shares[key]
+        if isinstance(share, bool) or not isinstance(share, (int, float)) or not 0 <= share <= 1:
+            raise BudgetError("invalid", "invalid_share", f"{group} share {key} must be in [0, 1]")
+
+    total = math.fsum(shares[key] for key in keys)
+    if abs(total - 1) > SHARE_TOLERANCE:
+        raise BudgetError("infeasible", "shares_sum", f"{group} shares sum to {total:g}, not 1")
+
+
+def check_needs(carbon_needs):
+    """Needs keyed by int year."""
+    needs = {}
+    for year, need in carbon_needs.items():
+        try:
+            year = int(year)
+        except (TypeError, ValueError):
+            raise BudgetError("invalid", "invalid_need", f"invalid need year: {year}") from None
+        if isinstance(need, bool) or not isinstance(need, (int, float)) or not need >= 0:
+            raise BudgetError("invalid", "invalid_need", f"need of {year} must be a positive number")
+        if year < BASE_YEAR:
+            raise BudgetError(
+                "invalid", "need_before_base_year", f"need of {year} is before {BASE_YEAR}",
+            )
+        if year > LAST_PLANNING_YEAR:
+            raise BudgetError(
+                "invalid", "horizon_beyond_data",
+                f"need of {year} is after {LAST_PLANNING_YEAR}",
+            )
+        needs[year] = need
+    return needs
+
+
+def _is_number(value):
+    return not isinstance(value, bool) and isinstance(value, (int, float)) and math.isfinite(value)
+
+
+def check_budget_band(budget_band):
+    """Raise a BudgetError unless `budget_band` is None or [min, max] with 0 <= min <= max <= 1."""
+    if budget_band is None:
+        return
+    if (
+        not isinstance(budget_band, (list, tuple)) or len(budget_band) != 2
+        or not all(_is_number(bound) for bound in budget_band)
+        or not 0 <= budget_band[0] <= budget_band[1] <= 1
+    ):
+        raise BudgetError(
+            "invalid", "invalid_budget_band", "budgetBand must be [min, max] with 0 <= min <= max <= 1",
+        )
+
+
+def check_what_if(questions, carbon_needs, optimizeFinancing=False, optimizeRegion=False):
+    """
+    Raise a BudgetError when a question of the whatIf list `questions` (see
+    duals.WhatIf.evaluate) cannot be answered for the request.
+    """
+    if not isinstance(questions, list):
+        raise BudgetError("invalid", "invalid_what_if", "whatIf must be a list of questions")
+    share_keys = {"financing": FINANCING_KEYS, "typology": TYPOLOGIES, "region": REGIONS}
+    optimized = {"financing": optimizeFinancing, "region": optimizeRegion}
+    need_years = {int(year) for year in carbon_needs}
+
+    for index, question in enumerate(questions):
+        if not isinstance(question, dict):
+            raise BudgetError(
+                "invalid", "invalid_what_if", f"whatIf question {index} must be an object",
+            )
+        kind = question.get("type")
+        if kind == "need":
+            year = question.get("year")
+            try:
+                year = int(year)
+            except (TypeError, ValueError):
+                year = None
+            if year not in need_years or isinstance(question.get("year"), bool):
+                raise BudgetError(
+                    "invalid", "invalid_what_if", f"whatIf question {index}: year must be a need year",
+                )
+            if not _is_number(question.get("tons", 1)):
+                raise BudgetError(
+                    "invalid", "invalid_what_if", f"whatIf question {index}: tons must be a number",
+                )
+        elif kind == "share":
+            group = question.get("group")
+            if group not in share_keys:
+                raise BudgetError(
+                    "invalid", "invalid_what_if",
+                    f"whatIf question {index}: group must be one of {', '.join(share_keys)}",
+                )
+            if optimized.get(group):
+                raise BudgetError(
+                    "invalid", "invalid_what_if", f"whatIf question {index}: {group} shares are optimized",
+                )
+            for field in ("from", "to"):
+                if question.get(field) not in share_keys[group]:
+                    raise BudgetError(
+                        "invalid", "invalid_what_if",
+                        f"whatIf question {index}: {field} must be a {group} share",
+                    )
+            if not _is_number(question.get("amount")):
+                raise BudgetError(
+                    "invalid", "invalid_what_if", f"whatIf question {index}: amount must be a number",
+                )
+        else:
+            raise BudgetError(
+                "invalid", "invalid_what_if", f"whatIf question {index}: type must be need or share",
+            )
+
+
+def check_request(
+    financing: Financing,
+    typology: Typology,
+    region_allocation: RegionAllocation,
+    carbon_needs: Dict[int, int],
+    optimizeFinancing: bool,
+    optimizeRegion: bool,
+    cadence: Cadence = 1,
+    budget_band: Optional[BudgetBand] = None,
+):
+    """
+    Raise a BudgetError when the request can be rejected without solving it.
+
+    Parameters:
+        Same as algorithms.budgetAlgo. The financing and region shares are only
+        checked when they are not optimized.
+    """
+    if not optimizeFinancing:
+        check_shares("financing", financing, FINANCING_KEYS)
+    check_shares("typology", typology, TYPOLOGIES)
+    if not optimizeRegion:
+        check_shares("region", region_allocation, REGIONS)
+
+    needs = check_needs(carbon_needs)
+    try:
+        years = plan_years(cadence, max(needs))
+    except ValueError as error:
+        raise BudgetError("invalid", "invalid_cadence", str(error)) from None
+
+    needed = [year for year, need in needs.items() if need > 0]
+    if needed and min(needed) < years[0]:
+        raise BudgetError(
+            "infeasible", "need_before_purchase",
+            f"need of {min(needed)} is before the first purchase year {years[0]}",
+        )
+
+    # Every period costs between min and max of the total : n * min <= 1 <= n * max
+    if budget_band is not None and needed:
+        band_min, band_max = budget_band
+        n_periods = len(years)
+        if n_periods * band_min > 1 + SHARE_TOLERANCE or n_periods * band_max < 1 - SHARE_TOLERANCE:
+            raise BudgetError(
+                "infeasible", "budget_band",
+                f"{n_periods} purchase periods cannot each cost between "
+                f"{band_min:.1%} and {band_max:.1%} of the budget",
+            )
@@ -0,0 +1,232 @@
+"""
+Cost-versus-need frontiers : the optimal total price of a request while its
+carbon needs are scaled by a multiplier.
+
+A request with a "frontier" object is solved with the needs of `years` (all
+of them by default) multiplied by every value of the range :
+
+    "frontier": {"multiplier": [0.5, 1.5], "years": [2050]}
+
+The optimal price is a convex piecewise-linear function of the multiplier,
+whose slope is the shadow price of the scaled needs : the duals of their rows
+times the needs. Its breakpoints are traced by intersecting the tangents at
+both ends of an interval (Eisner and Severance) : when the price at the
+intersection lies on the tangents, it is a breakpoint, else both halves are
+searched. Every solve changes the need bounds of one HiGHS instance and
+re-runs it from the basis of the previous solve, the nearest multiplier.
+Other backends solve every multiplier from scratch.
+"""
+from dataclasses import replace
+
+import numpy as np
+
+from errors import BudgetError
+
+
+# Solves of one frontier, past which the request is rejected
+MAX_FRONTIER_SOLVES = 200
+
+# Relative tolerance on the price and slopes telling a breakpoint
+FRONTIER_TOLERANCE = 1e-7
+
+
+def frontier_spec(spec, carbon_needs):
+    """
+    (low, high) multipliers and the need indices scaled, of the "frontier"
+    object `spec` over the year -> need `carbon_needs`.
+    """
+    if not isinstance(spec, dict):
+        raise BudgetError("invalid", "invalid_frontier", "frontier must be an object")
+    bounds = spec.get("multiplier", [0.5, 1.5])
+    if (
+        not isinstance(bounds, list) or len(bounds) != 2
+        or any(isinstance(bound, bool) or not isinstance(bound, (int, float)) for bound in bounds)
+        or not 0 <= bounds[0] <= bounds[1]
+    ):
+        raise BudgetError("invalid", "invalid_frontier", "multiplier must be [min, max] with 0 <= min <= max")
+
+    need_years = list(carbon_needs)
+    years = spec.get("years")
+    if years is None:
+        scaled = list(range(len(need_years)))
+    else:
+        try:
+            scaled = sorted({need_years.index(int(year)) for year in years})
+        except (TypeError, ValueError):
+            raise BudgetError(
+                "invalid", "invalid_frontier", "frontier years must be years of carbonUnitNeeds",
+            ) from None
+        if not scaled:
+            raise BudgetError("invalid", "invalid_frontier", "frontier years must not be empty")
+    # Scaling zero needs leaves the price unchanged : no frontier to trace
+    if not any(carbon_needs[need_years[index]] for index in scaled):
+        raise BudgetError("invalid", "invalid_frontier", "the needs of the frontier years are all zero")
+    return float(bounds[0]), float(bounds[1]), scaled
+
+
+class NeedFrontier:
+    """
+    The model of a request, re-solved with some needs scaled : in place in a
+    HiGHS instance when the backend is highspy, else from scratch.
+    """
+
+    def __init__(self, model, need_rhs, scaled, solver=None, time_limit=None):
+        from session import supports_sessions
+        from solvers import highs_instance
+
+        self.model = model
+        self.rows = model.row_groups["needs"].start + np.asarray(scaled)
+        self.base = np.asarray(need_rhs, dtype=float)[scaled]
+        self.solver = solver
+        self.time_limit = time_limit
+        self.highs = highs_instance(model) if supports_sessions(solver) else None
+        self.solves = 0
+        self.iterations = 0
+
+    def model_at(self, multiplier):
+        row_lower = self.model.row_lower.copy()
+        row_lower[self.rows] = self.base * multiplier
+        return replace(self.model, row_lower=row_lower)
+
+    def solve(self, multiplier, profiler):
+        """(total price, slope, solution) at `multiplier`, raises a BudgetError unless optimal."""
+        from solvers import run_highs, solve
+
+        if self.highs is not None:
+            for row, rhs in zip(self.rows.tolist(), (self.base * multiplier).tolist()):
+                self.highs.changeRowBounds(row, rhs, self.model.row_upper[row])
+            solution = run_highs(self.highs, profiler, time_limit=self.time_limit)
+        else:
+            solution = solve(self.model_at(multiplier), self.solver, profiler, time_limit=self.time_limit)
+        self.solves += 1
+        self.iterations += solution.iterations or 0
+
+        if solution.status != "optimal":
+            raise BudgetError(
+                solution.status if solution.status in ("infeasible", "unbounded") else "not_solved",
+                f"solver_{solution.status}",
+                f"{solution.solver} found no optimal plan at multiplier {multiplier:g}: {solution.status}",
+            )
+        slope = float(solution.row_duals[self.rows] @ self.base)
+        return solution.objective, slope, solution
+
+
+def trace_frontier(frontier, low, high, profiler):
+    """
+    Breakpoints of the optimal price between the multipliers `low` and `high` :
+    (multiplier, total price, solution), the ends included.
+    """
+    start = (low, *frontier.solve(low, profiler))
+    if high == low:
+        return [start]
+    end = (high, *frontier.solve(high, profiler))
+
+    points = [start]
+    # Intervals left to search, the leftmost on top : each solve starts near the previous one
+    intervals = [(start, end)]
+    while intervals:
+        left, right = intervals.pop()
+        (a, price_a, slope_a, _), (b, price_b, slope_b, _) = left, right
+        scale = max(1.0, abs(price_a), abs(price_b))
+        if slope_b - slope_a <= FRONTIER_TOLERANCE * scale / max(b - a, 1e-12):
+            # Parallel tangents : linear up to the right end
+            points.append(right)
+            continue
+        if frontier.solves >= MAX_FRONTIER_SOLVES:
+            raise BudgetError(
+                "not_solved", "frontier_too_large",
+                f"the frontier has more than {MAX_FRONTIER_SOLVES} breakpoints to search",
+            )
+
+        middle = (price_b - price_a + slope_a * a - slope_b * b) / (slope_a - slope_b)
+        middle = min(max(middle, a), b)
+        tangent = price_a + slope_a * (middle - a)
+        point = (middle, *frontier.solve(middle, profiler))
+        if point[1] <= tangent + FRONTIER_TOLERANCE * scale:
+            points.extend([point, right])
+        else:
+            intervals.extend([(point, right), (left, point)])
+
+    # An end can be found again as the breakpoint of an interval, and the
+    # points searched within a segment are not breakpoints
+    breakpoints = [points[0]]
+    for point in points[1:]:
+        if point[0] - breakpoints[-1][0] <= 1e-12 * max(1.0, abs(point[0])):
+            continue
+        if len(breakpoints) > 1 and collinear(breakpoints[-2], breakpoints[-1], point):
+            breakpoints[-1] = point
+        else:
+            breakpoints.append(point)
+    return breakpoints
+
+
+def collinear(first, second, third):
+    """Whether the price at `second` lies on the segment from `first` to `third`."""
+    (a, price_a), (b, price_b), (c, price_c) = first[:2], second[:2], third[:2]
+    on_segment = price_a + (price_c - price_a) * (b - a) / (c - a)
+    return abs(price_b - on_segment) <= FRONTIER_TOLERANCE * max(1.0, abs(price_a), abs(price_c))
+
+
+def frontier_request(input_json, profiler=None):
+    """
+    Breakpoints of the optimal price over the "frontier" multiplier range of
+    `input_json`, and the plan at each breakpoint (in the request format,
+    with the strategies when "aggregate") :
+
+        "frontier" : "multiplier", "total_price" and "needs" (tons of the
+                     scaled needs) of each breakpoint, "price_per_ton" of
+                     each segment between two breakpoints
+        "plans"    : the plan of each breakpoint and its "multiplier"
+    """
+    from algorithms import budget_model, solution_results
+    from diagnostics import Profiler
+    from main import check_fields
+    from solvers import DEFAULT_TIME_LIMIT
+
+    profiler = profiler or Profiler()
+    base = {key: value for key, value in input_json.items() if key != "frontier"}
+    cadence, budget_band = check_fields(base)
+    carbon_needs = dict(sorted((int(year), need) for year, need in base["carbonUnitNeeds"].items()))
+    low, high, scaled = frontier_spec(input_json["frontier"], carbon_needs)
+
+    years, price, model = budget_model(
+        base["financing"], base["typology"], base["regionAllocation"], carbon_needs,
+        base.get("optimizeFinancing", {}), base.get("optimizeRegion", {}), cadence, budget_band,
+        base.get("cumulativeNeeds", False), profiler,
+    )
+    frontier = NeedFrontier(
+        model, list(carbon_needs.values()), scaled, base.get("solver"),
+        base.get("timeLimit", DEFAULT_TIME_LIMIT),
+    )
+    with profiler.phase("frontier"):
+        breakpoints = trace_frontier(frontier, low, high, profiler)
+
+    multipliers = [point[0] for point in breakpoints]
+    prices = [point[1] for point in breakpoints]
+    tons = [float(frontier.base.sum() * multiplier) for multiplier in multipliers]
+    plans = []
+    for multiplier, _, _, solution in breakpoints:
+        plan = solution_results(
+            years, price, frontier.model_at(multiplier), solution, profiler,
+            base.get("format", "records"), base.get("aggregate", False),
+        )
+        plans.append({"multiplier": multiplier, **plan})
+
+    profiler.record(
+        "frontier", solves=frontier.solves, iterations=frontier.iterations, warm=frontier.highs is not None,
+    )
+    return {
+        "frontier": {
+            "multiplier": multipliers,
+            "total_price": prices,
+            "needs": tons,
+            # None for a segment over which the scaled needs do not change
+            "price_per_ton": [
+                (prices[index + 1] - prices[index]) / (tons[index + 1] - tons[index])
+                if tons[index + 1] != tons[index] else None
+                for index in range(len(breakpoints) - 1)
+            ],
+        },
+        "plans": plans,
+        "solves": frontier.solves,
+    }
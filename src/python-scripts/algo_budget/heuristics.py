@@ -0,0 +1,480 @@
+"""
+Fallback plans of a budget model whose solve stopped at its time limit.
+
+The solver's own plan is kept when it is feasible. Otherwise greedy passes
+build plans over the purchases, counted in the weighted units the share rows
+apply to :
+
+    units     : a plan of W weighted units buys share * W units of each
+                region, typology and financing type. W starts from the largest
+                need, and grows when the units left cannot cover a need
+    needs     : each need, earliest first, is covered by the purchases with
+                the cheapest price per ton delivered at its year, beyond the
+                cheapest price of their typology, within the units left
+    shares    : the units left are then bought at their cheapest price
+    pairing   : one pass pairs the typologies with the financing types up
+                front (least cost) and keeps W, the other grows W whenever it
+                covers a need for less
+    budget    : under a budget band, each pass is also run with the spend of
+                every period under a rising ceiling, and the periods outside
+                the band are topped up by units in the share proportions (or
+                by purchases without weight)
+
+Every step buys as much as its need, the units left or the ceiling allow, or
+grows W to cover its need, so a pass takes at most MAX_STEPS steps per need.
+Purchases are only ever added, so the needs stay covered while the shares and
+the band are met. The cheapest plan passing every row of the model is kept :
+it is not guaranteed, and without a feasible plan the request fails.
+
+The gap is relative to the best lower bound known, see lower_bound.
+"""
+import numpy as np
+
+from duals import SHARE_GROUPS
+
+
+# Relative violation of a row accepted in a fallback plan
+FEASIBILITY_TOLERANCE = 1e-6
+
+# Steps of the greedy pass per need, and for the units left : each one covers
+# the need, uses up a share, fills a period or grows W
+MAX_STEPS = 200
+
+# Rows defining an auxiliary column from the purchases
+DEFINING_ROWS = ("budget_min_total", "budget_max_total", "financing_total", "typology_total")
+
+
+def complete_columns(model, purchases):
+    """
+    Primal vectors (n_cols, m) of the purchase plans (n_purchases, m), the
+    auxiliary columns derived from the rows defining them.
+    """
+    A = model.A
+    n = model.n_purchases
+    values = np.zeros((model.n_cols, purchases.shape[1]))
+    values[:n] = purchases
+
+    for group in DEFINING_ROWS:
+        if group not in model.row_groups:
+            continue
+        row = A[model.row_groups[group]]
+        aux = row[:, n:].toarray().ravel()
+        col = int(np.flatnonzero(aux)[0])
+        values[n + col] = -(row[:, :n] @ purchases).ravel() / aux[col]
+
+    if "stock" in model.row_groups:
+        # stock[t] - stock[t-1] - deliveries of period t = 0
+        rows = model.row_groups["stock"]
+        first = n + model.aux_names.index("stock_0")
+        values[first:first + rows.stop - rows.start] = np.cumsum(
+            -(A[rows][:, :n] @ purchases), axis=0,
+        )
+    return values
+
+
+def need_coverage(model):
+    """(need row, purchase column) tons delivered at each need per unit purchased."""
+    A = model.A
+    n = model.n_purchases
+    needs = A[model.row_groups["needs"]]
+    coverage = needs[:, :n].toarray()
+    if "stock" in model.row_groups:
+        rows = model.row_groups["stock"]
+        first = n + model.aux_names.index("stock_0")
+        stock = np.cumsum(-A[rows][:, :n].toarray(), axis=0)
+        coverage += needs[:, first:first + rows.stop - rows.start] @ stock
+    return coverage
+
+
+def model_shares(model, shares=None):
+    """Group -> share array, from `shares` or the share rows, None for an optimized group."""
+    A = model.A
+    result = {}
+    for group, (keys, aux_name) in SHARE_GROUPS.items():
+        if group not in model.row_groups:
+            result[group] = None
+        elif shares is not None:
+            result[group] = np.asarray(shares[group], dtype=float)
+        else:
+            col = model.n_purchases + model.aux_names.index(aux_name)
+            result[group] = -A[model.row_groups[group], col].toarray().ravel()
+    return result
+
+
+def budget_band(model):
+    """(min, max) share of the budget per period read from the band rows, None without."""
+    if "budget_min_total" not in model.row_groups:
+        return None
+    A = model.A
+    n = model.n_purchases
+    band = []
+    for group in ("budget_min_total", "budget_max_total"):
+        row = A[model.row_groups[group], :n].toarray().ravel()
+        col = int(np.flatnonzero(row)[0])
+        band.append(-row[col] / model.c[col])
+    return tuple(band)
+
+
+def band_spend(spend, band_min, band_max):
+    """
+    Smallest increase of the per-period `spend` within the band : every period
+    between band_min and band_max of the total, periods only ever gaining.
+    """
+    total = max(spend.sum(), spend.max() / band_max)
+    for _ in range(len(spend) + 1):
+        floors = np.maximum(spend, band_min * total)
+        if floors.sum() <= total * (1 + 1e-12):
+            break
+        lifted = spend <= band_min * total
+        free = 1 - band_min * lifted.sum()
+        total = spend[~lifted].sum() / free if free > 0 else spend.max() / band_min
+    floors = np.maximum(spend, band_min * total)
+    headroom = band_max * total - floors
+    rest = max(total - floors.sum(), 0.0)
+    return floors + rest * headroom / headroom.sum()
+
+
+def purchase_weights(model):
+    """(typology, region, period, financing) weight of each purchase in the share rows."""
+    row = model.A[model.row_groups["typology_total"], :model.n_purchases]
+    return row.toarray().reshape(model.shape)
+
+
+def unit_prices(model):
+    """Price per weighted unit of each purchase, inf for the purchases without weight."""
+    weight = purchase_weights(model)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(weight > 0, model.purchases(model.c) / weight, np.inf)
+
+
+def paired_shares(typology, financing, prices):
+    """
+    (typology, financing) joint shares with the marginals `typology` and
+    `financing` of least cost at `prices`. With two financing types the
+    typologies saving the most on the second one get it first, which is exact.
+    """
+    joint = np.zeros(prices.shape)
+    joint[:, 0] = typology
+    with np.errstate(invalid="ignore"):
+        saving = np.nan_to_num(prices[:, 1] - prices[:, 0], nan=np.inf)
+    second = float(financing[1])
+    for row in np.argsort(saving, kind="stable"):
+        amount = min(joint[row, 0], second)
+        joint[row] += (-amount, amount)
+        second -= amount
+    return joint
+
+
+def balanced_mixes(model, shares):
+    """
+    (mix, typology, region, period, financing) purchases of one weighted unit
+    of each typology, region and financing type by its share, and the (period,
+    mix) price of a unit, inf where a purchase of the mix has no weight. The
+    typologies are paired with the financing types as in share_plan, and all
+    bought in the cheapest region when the regions are optimized. With
+    optimized financing, one mix per financing type.
+    """
+    weight = purchase_weights(model)
+    unit_price = unit_prices(model)
+    n_regions, n_financing = model.shape[1], model.shape[3]
+    if shares["financing"] is None:
+        pairs = [np.outer(shares["typology"], kind) for kind in np.eye(n_financing)]
+    else:
+        pairs = [paired_shares(shares["typology"], shares["financing"], unit_price.min(axis=(1, 2)))]
+    if shares["region"] is not None:
+        split = np.broadcast_to(shares["region"][None, :, None, None], model.shape)
+    else:
+        cheapest = np.argmin(unit_price, axis=1)[:, None, :, :]
+        split = (np.arange(n_regions)[None, :, None, None] == cheapest).astype(float)
+
+    parts = np.array([pair[:, None, None, :] * split for pair in pairs])
+    usable = weight > 0
+    mixes = np.divide(parts, weight, out=np.zeros_like(parts), where=usable & (parts > 0))
+    cost = np.einsum("mtrpf,trpf->pm", mixes, model.purchases(model.c))
+    cost[np.any((parts > 0) & ~usable, axis=(1, 2, 4)).T] = np.inf
+    return mixes, cost
+
+
+def share_plan(model, shares, paired, level=None):
+    """
+    (typology, region, period, financing) purchases of one greedy pass, None
+    when it fails. Purchases are counted in weighted units, each using up the
+    units left of its region and of its typology and financing type : W times
+    their shares, W starting from the largest need.
+
+    The needs are covered earliest first by the purchases costing the least
+    per ton delivered at their year, beyond the cheapest price of their
+    typology (every unit is bought anyway), then the units left are bought at
+    their cheapest price. `paired` pairs the typologies with the financing
+    types up front. Otherwise W also grows whenever the units it adds would
+    cover a need for less than the units left. With a `level`, the spend of
+    every period is kept under a ceiling starting at `level` and raised by
+    `level` whenever no purchase fits under it.
+    """
+    weight = purchase_weights(model).ravel()
+    usable = weight > 0
+    safe_weight = np.where(usable, weight, 1.0)
+    unit_cost = unit_prices(model).ravel()
+    gains = np.where(usable, need_coverage(model) / safe_weight, 0.0)
+    rhs = model.row_lower[model.row_groups["needs"]]
+
+    typology_of, region_of, period_of, financing_of = (axis.ravel() for axis in np.indices(model.shape))
+    groups = [(region_of, shares["region"])] if shares["region"] is not None else []
+    if shares["financing"] is None:
+        groups.append((typology_of, shares["typology"]))
+    elif paired:
+        pairs = paired_shares(shares["typology"], shares["financing"], unit_prices(model).min(axis=(1, 2)))
+        groups.append((typology_of * model.shape[3] + financing_of, pairs.ravel()))
+    else:
+        groups += [(financing_of, shares["financing"]), (typology_of, shares["typology"])]
+    groups = [(members, np.asarray(share, dtype=float)) for members, share in groups]
+
+    # The last group holds the typologies (or pairs) : their cheapest prices
+    # are the floor of the excess, and W grows by `unit_mix` per unit at least
+    types_of, type_share = groups[-1]
+    cheapest = np.full(len(type_share), np.inf)
+    np.minimum.at(cheapest, types_of, unit_cost)
+    excess = np.where(usable, unit_cost - cheapest[types_of], np.inf)
+    unit_mix = type_share @ np.where(type_share > 0, cheapest, 0.0)
+    # Every combination of the groups, by its share of a unit of W
+    mix_of, mix_share = np.zeros(model.n_purchases, dtype=int), np.ones(1)
+    for members, share in groups:
+        mix_of, mix_share = mix_of * len(share) + members, np.outer(mix_share, share).ravel()
+
+    total = max(float(rhs.max(initial=0.0)), 1.0)
+    left = [share * total for _, share in groups]
+    ceiling = np.full(model.shape[2], np.inf if level is None else float(level))
+    spent = np.zeros(model.shape[2])
+    units = np.zeros(model.n_purchases)
+    tolerance = FEASIBILITY_TOLERANCE * total
+
+    def buy(column, amount):
+        units[column] += amount
+        spent[period_of[column]] += amount * unit_cost[column]
+        for (members, _), group_left in zip(groups, left):
+            group_left[members[column]] -= amount
+
+    def available(within_ceiling=True):
+        mask = usable & (spent < ceiling)[period_of] if within_ceiling else usable.copy()
+        for (members, _), group_left in zip(groups, left):
+            mask &= group_left[members] > 0
+        return mask
+
+    def grow(extra):
+        for (_, share), group_left in zip(groups, left):
+            group_left += share * extra
+
+    def raise_ceiling(blocked):
+        # The ceiling only steers the plan : band_plan restores the band
+        ceiling[np.unique(period_of[blocked])] += level
+
+    def limit(column, amount):
+        room = ceiling[period_of[column]] - spent[period_of[column]]
+        amounts = [amount, room / unit_cost[column] if unit_cost[column] > 0 else np.inf]
+        amounts += [group_left[members[column]] for (members, _), group_left in zip(groups, left)]
+        return min(amounts)
+
+    # Earliest needs first : the fewest purchases can cover them
+    for need in np.argsort((gains > 0).sum(axis=1), kind="stable"):
+        gain = gains[need]
+        covering = usable & (gain > 0)
+        excess_per_ton = np.divide(excess, gain, out=np.full(len(gain), np.inf), where=covering)
+        cost_per_ton = np.divide(unit_cost, gain, out=np.full(len(gain), np.inf), where=covering)
+        # Purchase of each combination covering the need at the least excess per ton
+        order = np.lexsort((cost_per_ton, excess_per_ton, mix_of))
+        first = order[np.searchsorted(mix_of[order], np.arange(len(mix_share)))]
+        mix_excess = excess_per_ton[first]
+        mix_gain = np.where(covering[first], gain[first], 0.0)
+        mix_extra = np.where(covering[first], excess[first], 0.0)
+        ranking = np.lexsort((cost_per_ton, excess_per_ton))
+
+        for _ in range(MAX_STEPS):
+            deficit = rhs[need] - gain @ units
+            if deficit <= tolerance:
+                break
+            candidates = available() & covering
+            if candidates.any():
+                column = int(ranking[np.argmax(candidates[ranking])])
+                if paired:
+                    buy(column, limit(column, deficit / gain[column]))
+                    continue
+                useful = mix_excess < excess_per_ton[column]
+            else:
+                blocked = available(within_ceiling=False) & covering
+                if level is not None and blocked.any():
+                    raise_ceiling(blocked)
+                    continue
+                useful = mix_gain > 0
+            # The units W adds cover the need through the combinations useful
+            # to it, the others are bought at the cheapest price anyway
+            cover = mix_share[useful] @ mix_gain[useful]
+            if cover <= 0:
+                if not candidates.any():
+                    return None
+                buy(column, limit(column, deficit / gain[column]))
+                continue
+            grown = (unit_mix + mix_share[useful] @ mix_extra[useful]) / cover
+            if not candidates.any() or grown < excess_per_ton[column]:
+                grow(deficit / cover)
+            else:
+                buy(column, limit(column, deficit / gain[column]))
+        else:
+            return None
+
+    # Units left, cheapest first : each purchase uses up a group or fills a
+    # period
+    for _ in range(MAX_STEPS):
+        remaining = left[-1].sum()
+        if remaining <= tolerance:
+            break
+        candidates = available()
+        if not candidates.any():
+            blocked = available(within_ceiling=False)
+            if level is not None and blocked.any():
+                raise_ceiling(blocked)
+            else:
+                # No purchase combines the groups left : W grows to free them
+                grow(remaining)
+            continue
+        column = int(np.argmin(np.where(candidates, unit_cost, np.inf)))
+        buy(column, limit(column, remaining))
+    else:
+        return None
+    return (units / safe_weight).reshape(model.shape)
+
+
+def greedy_plan(model, shares=None):
+    """
+    (typology, region, period, financing) purchases of the greedy plan, None
+    when it fails : the cheapest feasible plan of the passes with and without
+    pairing. Under a budget band, each pass is run again with the spend of
+    every period under a ceiling rising by an even split of its first plan's
+    cost, and the plans are topped up by band_plan.
+    """
+    group_shares = model_shares(model, shares)
+    price = model.purchases(model.c)
+    band = budget_band(model)
+    plans = []
+    for paired in (True, False):
+        plan = share_plan(model, group_shares, paired)
+        plans.append(plan)
+        if band is not None and plan is not None:
+            level = float((plan * price).sum()) / model.shape[2]
+            plans.append(share_plan(model, group_shares, paired, level))
+    if band is not None:
+        mixes = balanced_mixes(model, group_shares)
+        plans = [band_plan(model, plan, band, mixes) if plan is not None else None for plan in plans]
+
+    best, best_cost = None, np.inf
+    for plan in plans:
+        if plan is None:
+            continue
+        plan_cost = float((plan * price).sum())
+        values = complete_columns(model, plan.reshape(-1, 1))[:, 0]
+        if plan_cost < best_cost and plan_violation(model, values, shares) <= FEASIBILITY_TOLERANCE:
+            best, best_cost = plan, plan_cost
+    return best
+
+
+def band_plan(model, plan, band, mixes):
+    """
+    `plan` topped up to spend within the budget band in every period, by the
+    cheapest of the balanced `mixes` in the period, else by purchases without
+    weight (they leave the shares and needs unchanged). None when a period has
+    neither.
+    """
+    price = model.purchases(model.c)
+    spend = np.einsum("trpf,trpf->p", plan, price)
+    extra = band_spend(spend, *band) - spend
+    filler = np.where(purchase_weights(model) > 0, np.inf, price)
+    mix_purchases, mix_cost = mixes
+    plan = plan.copy()
+    for period in np.flatnonzero(extra > FEASIBILITY_TOLERANCE * max(1.0, spend.sum())):
+        mix = np.argmin(mix_cost[period])
+        if np.isfinite(mix_cost[period, mix]):
+            plan[:, :, period, :] += extra[period] / mix_cost[period, mix] * mix_purchases[mix, :, :, period, :]
+            continue
+        prices = filler[:, :, period, :]
+        column = np.unravel_index(np.argmin(prices), prices.shape)
+        if np.isinf(prices[column]):
+            return None
+        plan[column[0], column[1], period, column[2]] += extra[period] / prices[column]
+    return plan
+
+
+def plan_violation(model, values, shares=None):
+    """
+    Largest violation of a row bound by the primal vector `values`, relative to
+    the bound. `shares` overrides the shares of the model rows.
+    """
+    if values is None or len(values) != model.n_cols or np.any(values < -FEASIBILITY_TOLERANCE):
+        return np.inf
+    activity = model.A @ values
+    if shares is not None:
+        # Share rows are purchases - share * total
+        for group, share in model_shares(model).items():
+            if share is not None:
+                total = values[model.n_purchases + model.aux_names.index(SHARE_GROUPS[group][1])]
+                activity[model.row_groups[group]] += (share - np.asarray(shares[group])) * total
+    # Relative to the terms of each row : share rows have a zero bound
+    magnitude = abs(model.A) @ np.abs(values)
+    scale = np.maximum(1.0, np.maximum(magnitude, np.abs(
+        np.where(np.isfinite(model.row_lower), model.row_lower, model.row_upper)
+    )))
+    with np.errstate(invalid="ignore"):
+        below = np.where(np.isfinite(model.row_lower), model.row_lower - activity, 0.0)
+        above = np.where(np.isfinite(model.row_upper), activity - model.row_upper, 0.0)
+    return float(np.max(np.maximum(below, above) / scale, initial=0.0))
+
+
+def lower_bound(model, solution=None, shares=None):
+    """
+    Lower bound of the optimal cost, the highest of :
+
+        - each need covered alone at its cheapest price per delivered ton
+        - the weighted units of a share group, at least the largest need (no
+          purchase delivers more at a need than by the last period), bought at
+          the cheapest unit price of each share
+        - the dual bound of the solver
+    """
+    coverage = need_coverage(model)
+    cost = model.c[:model.n_purchases]
+    rhs = model.row_lower[model.row_groups["needs"]]
+    with np.errstate(divide="ignore"):
+        cheapest = np.where(coverage > 0, cost[None, :] / coverage, np.inf).min(axis=1)
+    bound = float(np.where(rhs > 0, rhs * cheapest, 0.0).max(initial=0.0))
+
+    unit_price = unit_prices(model)
+    for axis, group in enumerate(("typology", "region", None, "financing")):
+        share = model_shares(model, shares).get(group)
+        if share is None:
+            continue
+        group_price = unit_price.min(axis=tuple(other for other in range(4) if other != axis))
+        unit_cost = float(np.where(share > 0, share * group_price, 0.0).sum())
+        if np.isfinite(unit_cost):
+            bound = max(bound, float(rhs.max(initial=0.0)) * unit_cost)
+
+    if solution is not None and solution.bound is not None:
+        bound = max(bound, solution.bound)
+    return bound
+
+
+def fallback_plan(model, solution, shares=None):
+    """
+    (purchase values, total price, plan source, gap) of a solve stopped at its
+    time limit : the solver plan when feasible, else the greedy plan. None when
+    neither is feasible. `shares` overrides the shares of the model rows.
+    """
+    if solution.status == "feasible" and plan_violation(model, solution.values, shares) <= FEASIBILITY_TOLERANCE:
+        values = model.purchases(solution.values)
+        source = "solver"
+    else:
+        values = greedy_plan(model, shares)
+        source = "greedy"
+        if values is None:
+            return None
+
+    total = float(model.c[:model.n_purchases] @ values.ravel())
+    bound = lower_bound(model, solution, shares)
+    gap = max(total - bound, 0.0) / total if total > 0 else 0.0
+    return values, total, source, gap
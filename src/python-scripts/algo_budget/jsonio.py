@@ -0,0 +1,62 @@
+"""
+JSON in and out of the command line entry points, without argv size limits
+and without building large responses as one string.
+
+Requests are read from an argument, stdin or a file (so a request is no
+longer bound by ARG_MAX), and parsed whole by json.loads. Responses are written
+piecewise : long lists (the purchases of the records and columnar formats) are
+encoded STREAM_CHUNK items at a time by the C encoder, so the output is the
+same as json.dumps but never held whole.
+"""
+import json
+
+
+# Items of a long list encoded per write
+STREAM_CHUNK = 1024
+
+
+def read_json_file(path):
+    """JSON document of the file at `path`."""
+    try:
+        file = open(path, "rb")
+    except OSError as error:
+        raise ValueError(f"cannot read {path}: {error.strerror}") from None
+    with file:
+        return json.loads(file.read())
+
+
+def read_request(args, stdin):
+    """
+    Request of the command line arguments `args` : none or "-" reads `stdin`
+    (a binary stream), "--input PATH" a file, anything else is inline JSON.
+    """
+    if not args or args[0] == "-":
+        return json.loads(stdin.read())
+    if args[0] == "--input":
+        if len(args) < 2:
+            raise ValueError("--input needs a file path")
+        return read_json_file(args[1])
+    return json.loads(args[0])
+
+
+def write_json(value, stream, chunk_size=STREAM_CHUNK):
+    """Write `value` to the text `stream` as json.dumps would, long lists chunk by chunk."""
+    if isinstance(value, dict):
+        stream.write("{")
+        for index, (key, item) in enumerate(value.items()):
+            if index:
+                stream.write(", ")
+            # Keys are strings in JSON, json.dumps writes 2025 as "2025" and True as "true"
+            stream.write(json.dumps(key if isinstance(key, str) else json.dumps(key)))
+            stream.write(": ")
+            write_json(item, stream, chunk_size)
+        stream.write("}")
+    elif isinstance(value, list) and len(value) > chunk_size:
+        stream.write("[")
+        for start in range(0, len(value), chunk_size):
+            if start:
+                stream.write(", ")
+            stream.write(json.dumps(value[start:start + chunk_size])[1:-1])
+        stream.write("]")
+    else:
+        stream.write(json.dumps(value))
@@ -1,44 +1,226 @@
+"""
+Entry point of the budget optimizer.
+
+Only json, sys and the pure Python request modules are imported up front : a
+request is checked before the NumPy engine, the result cache and the profiler
+are imported, and the solver backends import PuLP or highspy when they run.
+
+Usage:
+    python main.py '{"financing": ..., "carbonUnitNeeds": ...}'
+    python main.py - < request.json
+    python main.py --input request.json
+    python main.py --worker
+    python main.py --batch requests.jsonl
+"""
 import json
 import sys
 
-from algorithms import yearlyAlgo, fiveYearAlgo, flexibleAlgo
-from models import Financing, Typology, RegionAllocation, TimeConstraint
+from errors import BudgetError, error_fields
+from feasibility import check_budget_band, check_request, check_what_if
+from jsonio import read_request, write_json
+from models import RESULT_FORMATS, SOLVER_NAMES
+from plans import cadence_for_time_constraint
 
-def main():
-    input_json = json.loads(sys.argv[1])
 
+def check_fields(input_json):
+    """
+    Raise a BudgetError when a required field is missing or the pre-check
+    rejects the request, else return its cadence and budget band.
+    """
     financing = input_json.get("financing", {})
     typology = input_json.get("typology", {})
     region_allocation = input_json.get("regionAllocation", {})
     carbon_needs = input_json.get("carbonUnitNeeds", {})
     time_constraint = input_json.get("timeConstraints", {})
-    optimizeFinancing = input_json.get("optimizeFinancing", {})
-    optimizeRegion = input_json.get("optimizeRegion", {})
-    
+
     if not financing:
-        print("Error: missing financing")
-        sys.exit(1)
+        raise BudgetError("invalid", "missing_field", "missing financing")
     if not typology:
-        print("Error: missing typology")
-        sys.exit(1)
+        raise BudgetError("invalid", "missing_field", "missing typology")
     if not region_allocation:
-        print("Error: missing region_allocation")
-        sys.exit(1)
+        raise BudgetError("invalid", "missing_field", "missing region_allocation")
     if not carbon_needs:
-        print("Error: missing carbon_needs")
-        sys.exit(1)
+        raise BudgetError("invalid", "missing_field", "missing carbon_needs")
     if not time_constraint:
-        print("Error: missing time_constraint")
-        sys.exit(1)        
+        raise BudgetError("invalid", "missing_field", "missing time_constraint")
+    if input_json.get("format", "records") not in RESULT_FORMATS:
+        raise BudgetError("invalid", "unknown_format", f"unknown format {input_json['format']}")
+    solver = input_json.get("solver")
+    if solver is not None and solver not in SOLVER_NAMES:
+        raise BudgetError(
+            "invalid", "invalid_solver", f"unknown solver {solver}, expected {', '.join(SOLVER_NAMES)}",
+        )
+    time_limit = input_json.get("timeLimit")
+    if time_limit is not None and (
+        isinstance(time_limit, bool) or not isinstance(time_limit, (int, float)) or not time_limit > 0
+    ):
+        raise BudgetError("invalid", "invalid_time_limit", "timeLimit must be a positive number of seconds")
+
+    check_budget_band(input_json.get("budgetBand"))
+
+    cadence, budget_band = cadence_for_time_constraint(time_constraint, input_json.get("budgetBand"))
+    check_request(
+        financing, typology, region_allocation, carbon_needs,
+        input_json.get("optimizeFinancing", {}), input_json.get("optimizeRegion", {}),
+        cadence, budget_band,
+    )
+    if "whatIf" in input_json:
+        check_what_if(
+            input_json["whatIf"], carbon_needs,
+            input_json.get("optimizeFinancing", {}), input_json.get("optimizeRegion", {}),
+        )
+    return cadence, budget_band
+
+
+def solve_request(input_json):
+    """
+    Solve one budget request, raises a BudgetError (a ValueError) when a required
+    field is missing, the pre-check rejects the request or the solver finds no
+    plan.
+    The solver stops after "timeLimit" seconds (solvers.DEFAULT_TIME_LIMIT by
+    default) and the best feasible plan is returned, with "optimal": false, or
+    a "solver_time_limit" error when neither the solver nor the greedy plan of
+    heuristics.py has one.
+    Identical requests are served from the result cache unless "cache" is false.
+    With "profile": true the request is always solved, and the result gets a
+    "diagnostics" object with the timings and sizes of the solve.
+    With "compare": ["yearly", "fiveYear", "flexible"] the request is solved
+    under each cadence in parallel instead, see compare.py, and with a "sweep"
+    object over a sample of its shares, see sweep.py. With a "frontier" object
+    the optimal price is traced while its needs are scaled, see frontier.py.
+    With "uncertainty" the result also gets the cost distribution of the plan
+    under sampled price paths, see uncertainty.py. With a "stochastic" object
+    the plan hedges against sampled price scenarios, see stochastic.py.
+    """
+    if "compare" in input_json:
+        from compare import compare_request
+        return compare_request(input_json)
+    if "sweep" in input_json:
+        from sweep import sweep_request
+        return sweep_request(input_json)
+    if "frontier" in input_json:
+        from frontier import frontier_request
+        return frontier_request(input_json)
+    if "stochastic" in input_json:
+        from stochastic import stochastic_request
+        return stochastic_request(input_json)
 
-    if time_constraint == 1:
-        result = yearlyAlgo(financing, typology, region_allocation, carbon_needs, optimizeFinancing, optimizeRegion)
-    elif time_constraint == 5:
-        result = fiveYearAlgo(financing, typology, region_allocation, carbon_needs, optimizeFinancing, optimizeRegion)
+    checked = check_fields(input_json)
+    from diagnostics import Profiler, profiled
+
+    if input_json.get("profile"):
+        profiler = Profiler()
+        result = profiled(solve_uncached, input_json, profiler, checked)
+        result["diagnostics"] = profiler.diagnostics()
+        return result
+    if input_json.get("cache", True) is False:
+        return profiled(solve_uncached, input_json, None, checked)
+    from cache import cached
+    return cached(lambda request: profiled(solve_uncached, request, None, checked), input_json)
+
+
+def solve_uncached(input_json, profiler=None, checked=None):
+    """
+    Solve one budget request without the result cache. `checked` is the
+    (cadence, budget band) returned by check_fields for it, checked here when
+    None.
+    """
+    cadence, budget_band = checked if checked is not None else check_fields(input_json)
+    financing = input_json.get("financing", {})
+    typology = input_json.get("typology", {})
+    region_allocation = input_json.get("regionAllocation", {})
+    carbon_needs = input_json.get("carbonUnitNeeds", {})
+    optimizeFinancing = input_json.get("optimizeFinancing", {})
+    optimizeRegion = input_json.get("optimizeRegion", {})
+    cumulative_needs = input_json.get("cumulativeNeeds", False)
+    solver = input_json.get("solver")
+    result_format = input_json.get("format", "records")
+    aggregate = input_json.get("aggregate", False)
+    use_session = input_json.get("session", False)
+    what_if = input_json.get("whatIf", [])
+    duals = input_json.get("duals", False) or bool(what_if)
+    time_limit = input_json.get("timeLimit")
+    if time_limit is None:
+        from solvers import DEFAULT_TIME_LIMIT
+        time_limit = DEFAULT_TIME_LIMIT
+    uncertainty = input_json.get("uncertainty")
+    if uncertainty:
+        from uncertainty import uncertainty_options
+        uncertainty = uncertainty_options(uncertainty)
     else:
-        result = flexibleAlgo(financing, typology, region_allocation, carbon_needs, optimizeFinancing, optimizeRegion)
-    
-    print(json.dumps(result))
+        uncertainty = None
+
+    result = None
+    if use_session:
+        from session import session_solve, supports_sessions
+
+        if supports_sessions(solver):
+            result = session_solve(
+                financing, typology, region_allocation, carbon_needs, optimizeFinancing,
+                optimizeRegion, cadence=cadence, budget_band=budget_band,
+                cumulative_needs=cumulative_needs, profiler=profiler,
+                result_format=result_format, aggregate=aggregate, duals=duals,
+                time_limit=time_limit, uncertainty=uncertainty,
+            )
+    if result is None:
+        from algorithms import budgetAlgo
+        result = budgetAlgo(
+            financing, typology, region_allocation, carbon_needs, optimizeFinancing, optimizeRegion,
+            cadence=cadence, budget_band=budget_band, cumulative_needs=cumulative_needs,
+            solver=solver, profiler=profiler, result_format=result_format, aggregate=aggregate,
+            duals=duals, time_limit=time_limit, uncertainty=uncertainty,
+        )
+
+    if what_if and "duals" in result:
+        from duals import WhatIf
+        evaluator = WhatIf(result["duals"])
+        result["whatIf"] = [evaluator.evaluate(question) for question in what_if]
+    return result
+
+
+def worker(stdin=sys.stdin, stdout=sys.stdout):
+    """
+    Long-lived mode : one JSON request per line on stdin, {"id": ..., "input": {...}},
+    one JSON response per line on stdout, {"id": ..., "result": {...}} or
+    {"id": ..., "error": "...", "status": ..., "code": ...} (see errors.py).
+    The interpreter and its imports stay warm.
+    """
+    for line in stdin:
+        if not line.strip():
+            continue
+
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            response = {"id": request_id, "result": solve_request(request.get("input", {}))}
+        except Exception as error:
+            response = {"id": request_id, **error_fields(error)}
+
+        write_json(response, stdout)
+        stdout.write("\n")
+        stdout.flush()
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+        worker()
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        import batch
+        batch.main(sys.argv[2:])
+        return
+
+    try:
+        # A JSONDecodeError is a ValueError
+        result = solve_request(read_request(sys.argv[1:], sys.stdin.buffer))
+    except ValueError as error:
+        fields = error_fields(error)
+        print(f"Error: {fields['error']} ({fields['status']}, {fields['code']})")
+        sys.exit(1)
+
+    write_json(result, sys.stdout)
+    sys.stdout.write("\n")
 
 if __name__ == "__main__":
     main()
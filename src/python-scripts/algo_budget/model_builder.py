@@ -0,0 +1,319 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models import TYPOLOGIES, REGIONS, FINANCING_KEYS
+
+
+@dataclass
+class SparseModel:
+    """
+    Linear program in matrix form :
+        minimize c @ v  subject to  row_lower <= A @ v <= row_upper, v >= 0
+
+    A is stored as CSR arrays (indptr, indices, data). The first `n_purchases`
+    columns are the purchase variables laid out as a C-ordered (typology,
+    region, period, financing) tensor, the remaining columns are auxiliary
+    variables (budget bands, totals used by the shares).
+    """
+    c: np.ndarray
+    indptr: np.ndarray
+    indices: np.ndarray
+    data: np.ndarray
+    row_lower: np.ndarray
+    row_upper: np.ndarray
+    shape: Tuple[int, int, int, int]
+    aux_names: List[str]
+    row_groups: Dict[str, slice] = field(default_factory=dict)
+
+    @property
+    def n_purchases(self) -> int:
+        return int(np.prod(self.shape))
+
+    @property
+    def n_cols(self) -> int:
+        return len(self.c)
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.indptr) - 1
+
+    @property
+    def nnz(self) -> int:
+        return len(self.data)
+
+    @property
+    def A(self):
+        """Constraint matrix as a scipy.sparse CSR matrix."""
+        from scipy import sparse
+
+        return sparse.csr_matrix((self.data, self.indices, self.indptr), shape=(self.n_rows, self.n_cols))
+
+    def purchases(self, values: np.ndarray) -> np.ndarray:
+        """Reshape the purchase part of a primal vector to (typology, region, period, financing)."""
+        return np.asarray(values[:self.n_purchases], dtype=float).reshape(self.shape)
+
+
+class _RowAccumulator:
+    """Collects COO triplets and row bounds group by group."""
+
+    def __init__(self):
+        self.rows = []
+        self.cols = []
+        self.vals = []
+        self.lower = []
+        self.upper = []
+        self.groups = {}
+        self.n_rows = 0
+
+    def add(self, name, rows, cols, vals, lower, upper):
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        vals = np.asarray(vals, dtype=float)
+        keep = vals != 0
+        lower, upper = np.broadcast_arrays(
+            np.atleast_1d(np.asarray(lower, dtype=float)),
+            np.atleast_1d(np.asarray(upper, dtype=float)),
+        )
+        count = len(lower)
+
+        self.rows.append(rows[keep] + self.n_rows)
+        self.cols.append(cols[keep])
+        self.vals.append(vals[keep])
+        self.lower.append(lower)
+        self.upper.append(upper)
+        self.groups[name] = slice(self.n_rows, self.n_rows + count)
+        self.n_rows += count
+
+    def grouped(self, name, group_ids, weights, n_groups, extra=None, lower=0.0, upper=0.0):
+        """
+        One row per group : sum of weights over the purchase columns of that group,
+        plus optional (col, coefficient-per-row) auxiliary terms.
+        """
+        n = len(weights)
+        rows = [group_ids]
+        cols = [np.arange(n)]
+        vals = [weights]
+        if extra is not None:
+            aux_col, aux_coefficients = extra
+            rows.append(np.arange(n_groups))
+            cols.append(np.full(n_groups, aux_col))
+            vals.append(np.broadcast_to(aux_coefficients, (n_groups,)))
+        self.add(
+            name,
+            np.concatenate(rows),
+            np.concatenate(cols),
+            np.concatenate(vals),
+            np.broadcast_to(lower, (n_groups,)),
+            np.broadcast_to(upper, (n_groups,)),
+        )
+
+    def csr(self):
+        """(indptr, indices, data, row_lower, row_upper) with columns sorted in each row."""
+        rows = np.concatenate(self.rows)
+        cols = np.concatenate(self.cols)
+        vals = np.concatenate(self.vals)
+        order = np.lexsort((cols, rows))
+        indptr = np.zeros(self.n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=self.n_rows), out=indptr[1:])
+        return (
+            indptr, cols[order], vals[order],
+            np.concatenate(self.lower), np.concatenate(self.upper),
+        )
+
+
+def build_model(
+    price: np.ndarray,
+    stock_delivery: np.ndarray,
+    need_periods: np.ndarray,
+    need_rhs: np.ndarray,
+    financing: Dict[str, float],
+    typology: Dict[str, float],
+    region_allocation: Dict[str, float],
+    optimizeFinancing: bool,
+    optimizeRegion: bool,
+    budget_band: Optional[Tuple[float, float]] = None,
+    cumulative_needs: bool = False,
+) -> SparseModel:
+    """
+    Build the budget LP as a sparse matrix, its size scales with the number of non-zeros.
+
+    Parameters:
+        price : (typology, region, period, financing) price per ton.
+        stock_delivery : (reference period, typology, period, financing) share of a
+            purchase delivered at each reference period. The last reference period
+            weights the financing / typology / region distributions.
+        need_periods : reference period of each carbon need, -1 if no purchase
+            can cover it.
+        need_rhs : carbon need of each need row.
+        budget_band : (min, max) share of the total budget spent on each period,
+            or None for no yearly budget constraint.
+        cumulative_needs : add one delivered stock variable per period, defined
+            from the previous one, so that each need row has a single term.
+            Every row then touches O(1) purchases instead of O(periods).
+    """
+    n_typologies, n_regions, n_periods, n_financing = price.shape
+    shape = (n_typologies, n_regions, n_periods, n_financing)
+    n = int(np.prod(shape))
+
+    # Index of each purchase column along every axis of the layout
+    typology_of, region_of, period_of, financing_of = (
+        axis.ravel() for axis in np.indices(shape)
+    )
+
+    def purchase_weights(delivery):
+        # (..., typology, period, financing) -> (..., purchase column)
+        leading = delivery.shape[:-3]
+        return np.broadcast_to(
+            delivery[..., :, None, :, :], leading + shape
+        ).reshape(leading + (n,)).astype(float)
+
+    cost = price.ravel().astype(float)
+    weight = purchase_weights(stock_delivery[-1])
+
+    aux_names = []
+    if budget_band is not None:
+        aux_names += ["z_min", "z"]
+    aux_names += ["total_purch_for_on_spot_fwd", "total_purch_for_typo_distrib"]
+    if cumulative_needs:
+        aux_names += [f"stock_{period}" for period in range(n_periods)]
+    aux = {name: n + i for i, name in enumerate(aux_names)}
+
+    rows = _RowAccumulator()
+    purchase_cols = np.arange(n)
+
+    ## Constraint : budget timeline ##
+    if budget_band is not None:
+        band_min, band_max = budget_band
+        rows.add(
+            "budget_min_total",
+            np.zeros(n + 1), np.append(purchase_cols, aux["z_min"]),
+            np.append(-band_min * cost, 1.0), 0.0, np.inf,
+        )
+        rows.grouped("budget_min", period_of, cost, n_periods,
+                     extra=(aux["z_min"], -1.0), lower=0.0, upper=np.inf)
+        rows.add(
+            "budget_max_total",
+            np.zeros(n + 1), np.append(purchase_cols, aux["z"]),
+            np.append(-band_max * cost, 1.0), -np.inf, 0.0,
+        )
+        rows.grouped("budget_max", period_of, cost, n_periods,
+                     extra=(aux["z"], -1.0), lower=-np.inf, upper=0.0)
+
+    ## Constraint : On spot vs Forward ##
+    total_fwd = aux["total_purch_for_on_spot_fwd"]
+    rows.add(
+        "financing_total",
+        np.zeros(n + 1), np.append(purchase_cols, total_fwd),
+        np.append(weight, -1.0), 0.0, 0.0,
+    )
+    if not optimizeFinancing:
+        shares = np.array([financing[key] for key in FINANCING_KEYS], dtype=float)
+        rows.grouped("financing", financing_of, weight, n_financing,
+                     extra=(total_fwd, -shares))
+
+    ## Constraint : distribution of project typologies ##
+    total_typo = aux["total_purch_for_typo_distrib"]
+    rows.add(
+        "typology_total",
+        np.zeros(n + 1), np.append(purchase_cols, total_typo),
+        np.append(weight, -1.0), 0.0, 0.0,
+    )
+    shares = np.array([typology[key] for key in TYPOLOGIES], dtype=float)
+    rows.grouped("typology", typology_of, weight, n_typologies,
+                 extra=(total_typo, -shares))
+
+    ## Constraint : distribution of geographical areas ##
+    if not optimizeRegion:
+        shares = np.array([region_allocation[key] for key in REGIONS], dtype=float)
+        rows.grouped("region", region_of, weight, n_regions,
+                     extra=(total_typo, -shares))
+
+    ## Constraint : carbon units needs by years ##
+    need_periods = np.asarray(need_periods, dtype=np.int64)
+    covered = np.flatnonzero(need_periods >= 0)
+    need_rhs = np.asarray(need_rhs, dtype=float)
+
+    if cumulative_needs:
+        # stock[t] - stock[t-1] = purchases of period t and deliveries that changed since t-1
+        stock_cols = aux["stock_0"] + np.arange(n_periods)
+        increments = stock_delivery.astype(float)
+        increments[1:] -= stock_delivery[:-1]
+        stock_weight = purchase_weights(increments)
+        stock_rows, stock_terms = np.nonzero(stock_weight)
+        rows.add(
+            "stock",
+            np.concatenate([stock_rows, np.arange(n_periods), np.arange(1, n_periods)]),
+            np.concatenate([stock_terms, stock_cols, stock_cols[:-1]]),
+            np.concatenate([
+                -stock_weight[stock_rows, stock_terms],
+                np.ones(n_periods),
+                -np.ones(n_periods - 1),
+            ]),
+            np.zeros(n_periods), np.zeros(n_periods),
+        )
+        rows.add(
+            "needs",
+            covered, stock_cols[need_periods[covered]], np.ones(len(covered)),
+            need_rhs, np.inf,
+        )
+    else:
+        need_weight = purchase_weights(stock_delivery[need_periods[covered]])
+        need_rows, need_cols = np.nonzero(need_weight)
+        rows.add(
+            "needs",
+            covered[need_rows], need_cols, need_weight[need_rows, need_cols],
+            need_rhs, np.inf,
+        )
+
+    indptr, indices, data, row_lower, row_upper = rows.csr()
+    c = np.concatenate([cost, np.zeros(len(aux_names))])
+
+    return SparseModel(
+        c=c,
+        indptr=indptr,
+        indices=indices,
+        data=data,
+        row_lower=row_lower,
+        row_upper=row_upper,
+        shape=shape,
+        aux_names=aux_names,
+        row_groups=rows.groups,
+    )
+
+
+def to_pulp(model: SparseModel, name: str = "Kalculator_optimization"):
+    """
+    Convert a SparseModel to a PuLP problem, one affine expression per CSR row.
+
+    Returns the problem and the list of variables in column order.
+    """
+    import pulp as p
+
+    Lp_prob = p.LpProblem(name, p.LpMinimize)
+
+    variables = [p.LpVariable(f"v{j}", lowBound=0) for j in range(model.n_purchases)]
+    variables += [p.LpVariable(aux_name, lowBound=0) for aux_name in model.aux_names]
+
+    objective = np.flatnonzero(model.c)
+    Lp_prob += p.LpAffineExpression(
+        zip([variables[j] for j in objective], model.c[objective].tolist())
+    )
+
+    indptr, indices, data = model.indptr, model.indices.tolist(), model.data.tolist()
+    for i in range(model.n_rows):
+        start, end = indptr[i], indptr[i + 1]
+        expression = p.LpAffineExpression(
+            zip([variables[j] for j in indices[start:end]], data[start:end])
+        )
+        lower, upper = model.row_lower[i], model.row_upper[i]
+        if lower == upper:
+            sense, rhs = p.LpConstraintEQ, lower
+        elif np.isinf(upper):
+            sense, rhs = p.LpConstraintGE, lower
+        else:
+            sense, rhs = p.LpConstraintLE, upper
+        Lp_prob.addConstraint(p.LpConstraint(expression, sense, f"r{i}", float(rhs)))
+
+    return Lp_prob, variables
@@ -1,5 +1,21 @@
 from enum import Enum
-from typing import TypedDict
+from typing import List, Tuple, TypedDict, Union
+
+# Project typologies, in the order used by the variable layout and the results
+TYPOLOGIES = ["nbsRemoval", "nbsAvoidance", "dac", "biochar", "renewableEnergy"]
+
+# Geographic Regions
+REGIONS = ["northAmerica", "southAmerica", "europe", "africa", "asia", "oceania"]
+
+# Financing types: ex-post (x variables) and ex-ante (y variables)
+FINANCING = ["ex-post", "ex-ante"]
+FINANCING_KEYS = ["exPost", "exAnte"]
+
+# Serializations of the purchases, see results.py
+RESULT_FORMATS = ("records", "columnar", "binary")
+
+# Solver backends, see solvers.py
+SOLVER_NAMES = ("cbc", "highs")
 
 class Financing(TypedDict):
     exPost: int
@@ -25,6 +41,12 @@ class TimeConstraint(Enum):
     FiveYear = 5
     NoConstraint = -1
 
+# Purchase every n years from 2025, or explicit list of purchase years
+Cadence = Union[int, List[int]]
+
+# (min, max) share of the total budget spent in each purchase period
+BudgetBand = Tuple[float, float]
+
 class CarbonNeeds(TypedDict, total=False):
     """
     Dynamic keys. Example :
@@ -0,0 +1,79 @@
+"""
+Purchase plans of a request : cadence, budget band and purchase years.
+
+Pure Python, so that requests are read and checked before the NumPy engine
+is imported.
+"""
+import math
+from typing import List, Optional
+
+from constants import x_coefficients, coefficients
+from models import TimeConstraint, Cadence, BudgetBand
+
+
+BASE_YEAR = 2025
+
+# Last year covered by the price and exAnte curves of constants.py
+LAST_DATA_YEAR = BASE_YEAR + len(coefficients["other_types"]) - 1
+
+# Years past LAST_DATA_YEAR over which prices are extrapolated at most
+MAX_EXTRAPOLATION_YEARS = 50
+
+# Share of the total budget that each purchase period must cost (min, max)
+BUDGET_BANDS = {
+    TimeConstraint.Yearly: (0.015, 0.08),
+    TimeConstraint.FiveYear: (0.015, 0.40),
+    TimeConstraint.NoConstraint: None,
+}
+
+
+def last_planning_year() -> int:
+    """
+    Last year whose prices are usable : at most MAX_EXTRAPOLATION_YEARS after
+    LAST_DATA_YEAR, and before the first price extrapolated by
+    tensors.extend_years (the last yearly delta, clamped at 0) reaches 0. The
+    model would buy the free credits of later years.
+    """
+    last_year = LAST_DATA_YEAR + MAX_EXTRAPOLATION_YEARS
+    for prices in x_coefficients.values():
+        delta = prices[-1] - prices[-2]
+        if delta < 0:
+            # prices[-1] + delta * steps > 0 for steps < prices[-1] / -delta
+            last_year = min(last_year, LAST_DATA_YEAR + math.ceil(prices[-1] / -delta) - 1)
+    return last_year
+
+
+def plan_years(cadence: Cadence, last_year: int) -> List[int]:
+    """
+    Years in which purchases can be made up to last_year : every `cadence` years
+    from BASE_YEAR, or an explicit list of purchase years.
+    """
+    if isinstance(cadence, int):
+        if cadence < 1:
+            raise ValueError(f"Invalid cadence: {cadence}")
+        return list(range(BASE_YEAR, last_year + 1, cadence))
+
+    years = sorted({int(year) for year in cadence if BASE_YEAR <= int(year) <= last_year})
+    if not years:
+        raise ValueError(f"No purchase year between {BASE_YEAR} and {last_year}")
+    return years
+
+
+def cadence_for_time_constraint(time_constraint, budget_band: Optional[BudgetBand] = None):
+    """
+    Cadence and budget band matching the timeConstraints of a request :
+    1 (yearly), 5 (every 5 years), any other cadence in years, a list of
+    purchase years, or -1 for a flexible yearly plan without budget band.
+    """
+    if isinstance(time_constraint, list):
+        return time_constraint, budget_band
+
+    time_constraint = int(time_constraint)
+    if time_constraint < 1:
+        return 1, budget_band
+
+    try:
+        default_band = BUDGET_BANDS[TimeConstraint(time_constraint)]
+    except ValueError:
+        default_band = None
+    return time_constraint, budget_band if budget_band is not None else default_band
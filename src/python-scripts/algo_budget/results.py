@@ -0,0 +1,84 @@
+"""
+Purchases of a solved model, extracted as NumPy columns and serialized as :
+
+    records  : one {"year", "quantity", "typology", "region", "price", "type"} dict per purchase
+    columnar : parallel lists, typology/region/financing as indices into "labels"
+    binary   : base64 of a packed little-endian PURCHASE_DTYPE array
+"""
+import base64
+
+import numpy as np
+
+from models import TYPOLOGIES, REGIONS, FINANCING
+
+# Row layout of the binary format, 23 bytes per purchase
+PURCHASE_DTYPE = np.dtype([
+    ("year", "<u2"),
+    ("typology", "u1"),
+    ("region", "u1"),
+    ("financing", "u1"),
+    ("quantity", "<f8"),
+    ("price", "<f8"),
+])
+
+LABELS = {"typology": TYPOLOGIES, "region": REGIONS, "financing": FINANCING}
+
+
+def extract_purchases(years, price, values):
+    """
+    Columns of the purchases with a positive quantity, in (typology, region,
+    period, financing) order. `price` and `values` are (typology, region,
+    period, financing) arrays, `years` the year of each period.
+    """
+    selected = values > 0
+    typology, region, period, financing = np.nonzero(selected)
+    return {
+        "year": np.asarray(years)[period],
+        "typology": typology,
+        "region": region,
+        "financing": financing,
+        "quantity": values[selected],
+        "price": price[selected],
+    }
+
+
+def format_results(purchases, result_format="records"):
+    """Serializable form of the `purchases` columns."""
+    if result_format == "records":
+        labels = (
+            np.array(TYPOLOGIES)[purchases["typology"]].tolist(),
+            np.array(REGIONS)[purchases["region"]].tolist(),
+            np.array(FINANCING)[purchases["financing"]].tolist(),
+        )
+        return [
+            {"year": year, "quantity": quantity, "typology": typology, "region": region,
+             "price": price, "type": financing}
+            for year, quantity, typology, region, price, financing in zip(
+                purchases["year"].tolist(), purchases["quantity"].tolist(), labels[0],
+                labels[1], purchases["price"].tolist(), labels[2],
+            )
+        ]
+
+    if result_format == "columnar":
+        return dict(
+            {name: column.tolist() for name, column in purchases.items()},
+            labels=LABELS,
+        )
+
+    if result_format == "binary":
+        packed = np.empty(len(purchases["year"]), dtype=PURCHASE_DTYPE)
+        for name in PURCHASE_DTYPE.names:
+            packed[name] = purchases[name]
+        return {
+            "dtype": PURCHASE_DTYPE.descr,
+            "count": len(packed),
+            "data": base64.b64encode(packed.tobytes()).decode("ascii"),
+            "labels": LABELS,
+        }
+
+    raise ValueError(f"Unknown result format: {result_format}")
+
+
+def decode_binary(results):
+    """PURCHASE_DTYPE array of a "binary" result."""
+    return np.frombuffer(base64.b64decode(results["data"]), dtype=PURCHASE_DTYPE)
@@ -0,0 +1,263 @@
+"""
+Local HTTP solve service (stdlib asyncio, no framework).
+
+    POST /solve   budget request JSON -> main.py result JSON
+    GET  /health  {"status": "ok", ...}
+
+Solves run in a bounded process pool sized to the CPU count rather than to
+the number of connections. When every worker is busy and the queue is full
+the service answers 429, and a solve slower than the timeout answers 504.
+A timed-out solve keeps its slot until its worker is done ; when such solves
+hold every worker, the pool is replaced. A worker dying (OOM, segfault) breaks
+the pool : it is rebuilt and the request answers 503. A client slower than the
+read timeout to send its request answers 408.
+
+Usage:
+    python server.py [--port 8080] [--workers N] [--queue-size 8] [--timeout 10] [--read-timeout 5]
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import multiprocessing
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from errors import error_fields
+from main import solve_request
+
+
+MAX_BODY_SIZE = 1 << 20
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    408: "Request Timeout",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+    504: "Gateway Timeout",
+}
+
+
+def _warm_up():
+    """Import the solver stack once per pool process."""
+    for module in ("algorithms", "solvers"):
+        importlib.import_module(module)
+
+
+def _new_pool(workers):
+    # Spawned rather than forked : workers must not inherit the listening socket
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_warm_up,
+    )
+
+
+class SolveService:
+
+    def __init__(self, workers, queue_size, timeout, read_timeout=5.0):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.timeout = timeout
+        self.read_timeout = read_timeout
+        # Solves holding a slot, and those of them whose request timed out
+        self.pending = 0
+        self.abandoned = 0
+        self.restarts = 0
+        self.pool = _new_pool(workers)
+        self._warming = None
+
+    async def start(self):
+        """Start and warm every worker before accepting connections."""
+        await self._warm(self.pool)
+
+    async def _warm(self, pool):
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(pool, _warm_up) for _ in range(self.workers)
+        ), return_exceptions=True)
+
+    def _restart(self, pool):
+        """
+        Replace `pool` by a new warm pool, unless it was already replaced. The
+        processes of the old pool are killed : their solves fail and release
+        their slots.
+        """
+        if self.pool is not pool:
+            return
+        processes = list((getattr(pool, "_processes", None) or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.kill()
+        self.pool = _new_pool(self.workers)
+        self.restarts += 1
+        self._warming = asyncio.ensure_future(self._warm(self.pool))
+
+    def _submit(self, payload):
+        """Future of the solve of `payload`, on a rebuilt pool if the current one is broken."""
+        loop = asyncio.get_running_loop()
+        try:
+            return loop.run_in_executor(self.pool, solve_request, payload)
+        except BrokenProcessPool:
+            self._restart(self.pool)
+            return loop.run_in_executor(self.pool, solve_request, payload)
+
+    def _release(self, _future):
+        self.pending -= 1
+
+    def _release_abandoned(self, _future):
+        self.abandoned -= 1
+
+    async def solve(self, payload):
+        """(status, body) of a solve request, with back-pressure and timeout."""
+        if self.pending >= self.capacity:
+            return 429, {"error": "solver queue is full"}
+
+        self.pending += 1
+        try:
+            future = self._submit(payload)
+        except Exception as error:
+            self.pending -= 1
+            return 503, {"error": f"solver pool unavailable: {error}"}
+        pool = self.pool
+        # The slot is released when the worker is done, even after a timeout
+        future.add_done_callback(self._release)
+        try:
+            return 200, await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.abandoned += 1
+            future.add_done_callback(self._release_abandoned)
+            # Every worker stuck in an abandoned solve : nothing else would run
+            if self.abandoned >= self.workers:
+                self._restart(pool)
+            return 504, {"error": f"solve took more than {self.timeout}s"}
+        except BrokenProcessPool:
+            self._restart(pool)
+            return 503, {"error": "a solver process died, the pool was restarted"}
+        except ValueError as error:
+            return 400, error_fields(error)
+        except Exception as error:
+            return 500, error_fields(error)
+
+    async def handle(self, reader, writer):
+        try:
+            status, body, headers = await self._dispatch(reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+
+        payload = json.dumps(body).encode()
+        head = [
+            f"HTTP/1.1 {status} {STATUS_TEXT[status]}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(payload)}",
+            "Connection: close",
+        ] + [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + payload)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _read_head(self, reader):
+        request_line = (await reader.readline()).decode("latin-1").split()
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1")
+            if line in ("\r\n", "\n", ""):
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return request_line, headers
+
+    async def _dispatch(self, reader):
+        try:
+            request_line, headers = await asyncio.wait_for(self._read_head(reader), self.read_timeout)
+        except asyncio.TimeoutError:
+            return 408, {"error": f"request head not received within {self.read_timeout}s"}, {}
+
+        if len(request_line) < 2:
+            return 400, {"error": "malformed request"}, {}
+        method, path = request_line[0], request_line[1]
+
+        if path == "/health":
+            return 200, {
+                "status": "ok",
+                "workers": self.workers,
+                "pending": self.pending,
+                "abandoned": self.abandoned,
+                "capacity": self.capacity,
+                "restarts": self.restarts,
+            }, {}
+        if path != "/solve":
+            return 404, {"error": f"unknown path {path}"}, {}
+        if method != "POST":
+            return 405, {"error": "use POST"}, {"Allow": "POST"}
+
+        length = headers.get("content-length", "0")
+        if not (length.isascii() and length.isdigit()):
+            return 400, {"error": f"invalid Content-Length {length!r}"}, {}
+        length = int(length)
+        if length > MAX_BODY_SIZE:
+            return 413, {"error": "request body too large"}, {}
+        try:
+            body = await asyncio.wait_for(reader.readexactly(length), self.read_timeout)
+        except asyncio.TimeoutError:
+            return 408, {"error": f"request body not received within {self.read_timeout}s"}, {}
+        try:
+            payload = json.loads(body)
+        except ValueError as error:
+            return 400, {"error": f"invalid JSON: {error}"}, {}
+
+        status, body = await self.solve(payload)
+        return status, body, {"Retry-After": "1"} if status in (429, 503) else {}
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+async def serve(host, port, workers, queue_size, timeout, read_timeout):
+    service = SolveService(workers, queue_size, timeout, read_timeout)
+    try:
+        await service.start()
+        server = await asyncio.start_server(service.handle, host, port)
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, server.close)
+        async with server:
+            await server.serve_forever()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Budget solve service")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8080)))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="solver processes (default: CPU count)")
+    parser.add_argument("--queue-size", type=int, default=8,
+                        help="requests waiting for a worker before answering 429")
+    parser.add_argument("--timeout", type=float, default=10.0,
+                        help="seconds before answering 504")
+    parser.add_argument("--read-timeout", type=float, default=5.0,
+                        help="seconds to receive a request before answering 408")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(
+            args.host, args.port, args.workers, args.queue_size, args.timeout, args.read_timeout,
+        ))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
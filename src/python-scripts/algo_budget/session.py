@@ -0,0 +1,169 @@
+"""
+Warm sessions : a built model kept in memory per structure, re-solved in place.
+
+Requests sharing the cadence, need years, optimize flags, budget band and
+formulation share a session. Their financing / typology / region shares are
+coefficients of the share rows and their carbon needs are the bounds of the
+need rows, so a new request only changes those in the HiGHS instance, which
+then re-runs from the optimal basis of the previous solve.
+"""
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+from algorithms import budget_model, solution_results
+from diagnostics import Profiler
+from models import TYPOLOGIES, REGIONS, FINANCING_KEYS, Financing, Typology, RegionAllocation, Cadence, BudgetBand
+from solvers import DEFAULT_SOLVER, highs_instance, run_highs
+
+
+# Number of structures kept warm by a worker
+SESSION_CACHE_SIZE = 8
+
+# Share rows : row group -> auxiliary total column of its coefficients
+SHARE_ROWS = {
+    "financing": "total_purch_for_on_spot_fwd",
+    "typology": "total_purch_for_typo_distrib",
+    "region": "total_purch_for_typo_distrib",
+}
+
+
+class BudgetSession:
+    """One built model and its HiGHS instance, updated in place between solves."""
+
+    def __init__(self, years, price, model, shares):
+        self.years = years
+        self.price = price
+        self.model = model
+        self.highs = highs_instance(self.model)
+        self.shares = {name: np.array(values, dtype=float) for name, values in shares.items()}
+        self.solves = 0
+
+    def update(self, need_rhs, shares):
+        """Apply the changed needs and shares, returns the number of changes."""
+        changes = 0
+        needs = self.model.row_groups["needs"]
+        need_rhs = np.asarray(need_rhs, dtype=float)
+        for index in np.flatnonzero(need_rhs != self.model.row_lower[needs]).tolist():
+            row = needs.start + index
+            self.highs.changeRowBounds(row, float(need_rhs[index]), self.model.row_upper[row])
+            self.model.row_lower[row] = need_rhs[index]
+            changes += 1
+
+        for name, aux_name in SHARE_ROWS.items():
+            # No share rows when the financing or the regions are optimized
+            if name not in self.model.row_groups:
+                continue
+            rows = self.model.row_groups[name]
+            aux_col = self.model.n_purchases + self.model.aux_names.index(aux_name)
+            values = np.asarray(shares[name], dtype=float)
+            for index in np.flatnonzero(values != self.shares[name]).tolist():
+                self.highs.changeCoeff(rows.start + index, aux_col, -float(values[index]))
+                changes += 1
+            self.shares[name] = values
+        return changes
+
+    def solve(self, profiler: Profiler, result_format="records", aggregate=False, need_years=None,
+              time_limit=None, uncertainty=None):
+        solution = run_highs(self.highs, profiler, ranging=need_years is not None, time_limit=time_limit)
+        self.solves += 1
+        return solution_results(
+            self.years, self.price, self.model, solution, profiler, result_format, aggregate,
+            need_years, self.shares, uncertainty,
+        )
+
+
+SESSIONS: "OrderedDict[tuple, BudgetSession]" = OrderedDict()
+
+
+def supports_sessions(solver: Optional[str] = None) -> bool:
+    """Sessions need the in-process HiGHS backend through highspy."""
+    if (solver or DEFAULT_SOLVER) != "highs":
+        return False
+    try:
+        import highspy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def share_values(financing, typology, region_allocation, optimizeFinancing, optimizeRegion):
+    """
+    Group -> values of the share rows of a request. Optimized groups have no
+    share rows, their keys may be left out of the request.
+    """
+    shares = {"typology": [typology[key] for key in TYPOLOGIES]}
+    if not optimizeFinancing:
+        shares["financing"] = [financing[key] for key in FINANCING_KEYS]
+    if not optimizeRegion:
+        shares["region"] = [region_allocation[key] for key in REGIONS]
+    return shares
+
+
+def session_key(cadence, need_years, optimizeFinancing, optimizeRegion, budget_band, cumulative_needs):
+    cadence = tuple(int(year) for year in cadence) if isinstance(cadence, list) else int(cadence)
+    return (
+        cadence, tuple(need_years), bool(optimizeFinancing), bool(optimizeRegion),
+        tuple(budget_band) if budget_band is not None else None, bool(cumulative_needs),
+    )
+
+
+def session_solve(
+    financing: Financing,
+    typology: Typology,
+    region_allocation: RegionAllocation,
+    carbon_needs: Dict[int, int],
+    optimizeFinancing: bool,
+    optimizeRegion: bool,
+    cadence: Cadence = 1,
+    budget_band: Optional[BudgetBand] = None,
+    cumulative_needs: bool = False,
+    profiler: Optional[Profiler] = None,
+    result_format: str = "records",
+    aggregate: bool = False,
+    duals: bool = False,
+    time_limit: Optional[float] = None,
+    uncertainty: Optional[dict] = None,
+):
+    """
+    Same result as algorithms.budgetAlgo with the HiGHS solver, re-solving the
+    warm session of the request structure when there is one.
+    """
+    profiler = profiler or Profiler()
+    need_years = sorted(int(year) for year in carbon_needs)
+    need_rhs = [carbon_needs[year] for year in sorted(carbon_needs, key=int)]
+    shares = share_values(financing, typology, region_allocation, optimizeFinancing, optimizeRegion)
+    key = session_key(
+        cadence, need_years, optimizeFinancing, optimizeRegion, budget_band, cumulative_needs,
+    )
+
+    session = SESSIONS.get(key)
+    if session is None:
+        years, price, model = budget_model(
+            financing, typology, region_allocation, dict(zip(need_years, need_rhs)),
+            optimizeFinancing, optimizeRegion, cadence, budget_band, cumulative_needs, profiler,
+        )
+        with profiler.phase("pass_model"):
+            session = BudgetSession(years, price, model, shares)
+        SESSIONS[key] = session
+        while len(SESSIONS) > SESSION_CACHE_SIZE:
+            SESSIONS.popitem(last=False)
+        changes = None
+    else:
+        SESSIONS.move_to_end(key)
+        with profiler.phase("update"):
+            changes = session.update(need_rhs, shares)
+
+    model = session.model
+    profiler.record(
+        "model",
+        variables=model.n_cols,
+        purchase_variables=model.n_purchases,
+        constraints=model.n_rows,
+        nnz=model.nnz,
+    )
+    profiler.record("session", warm=changes is not None, changes=changes, solves=session.solves + 1)
+    return session.solve(
+        profiler, result_format, aggregate, need_years if duals else None, time_limit, uncertainty,
+    )
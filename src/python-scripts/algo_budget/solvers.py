@@ -0,0 +1,256 @@
+"""
+Solver backends for the sparse budget model.
+
+    cbc   : PuLP + CBC binary (model written to disk, one process per solve)
+    highs : in-process HiGHS, through highspy or scipy.optimize.linprog
+
+The default backend can be set with the ALGO_BUDGET_SOLVER environment variable,
+the default time limit of a solve (in seconds) with ALGO_BUDGET_TIME_LIMIT.
+"""
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import numpy as np
+
+from diagnostics import Profiler
+from model_builder import SparseModel, to_pulp
+
+
+DEFAULT_SOLVER = os.environ.get("ALGO_BUDGET_SOLVER", "highs")
+
+# The model build and the greedy fallback of heuristics.py run on top of the
+# limit : 1.5 s keeps a solve at its limit within the 2 s timeout of the TCP
+# health checks in fly.toml, and far below the 120 s BUDGET_WORKER_TIMEOUT_MS
+# of the worker in run-python-budget-algo.ts
+DEFAULT_TIME_LIMIT = float(os.environ.get("ALGO_BUDGET_TIME_LIMIT", "1.5"))
+
+
+@dataclass
+class SolverResult:
+    """
+    status : "optimal", "infeasible", "unbounded", "not_solved", or at the time
+        limit "feasible" (the values are a feasible plan) or "time_limit".
+    values : primal value of every column of the model.
+    bound : lower bound of the optimal objective proven by the solver.
+    row_duals : change of the objective per unit of row bound, when optimal.
+    ranging : (n_rows, 2) "row_bounds" and (n_cols, 2) "costs" intervals within
+        which the optimal basis does not change, for the backends providing them.
+    """
+    status: str
+    objective: Optional[float]
+    values: np.ndarray
+    iterations: Optional[int] = None
+    solver: str = ""
+    row_duals: Optional[np.ndarray] = None
+    ranging: Optional[Dict[str, np.ndarray]] = None
+    bound: Optional[float] = None
+
+
+def solve_cbc(model: SparseModel, profiler: Profiler, ranging: bool = False,
+              time_limit: Optional[float] = None) -> SolverResult:
+    import pulp as p
+
+    with profiler.phase("to_pulp"):
+        Lp_prob, variables = to_pulp(model)
+    # Writing the MPS file, running CBC and reading its solution back
+    with profiler.phase("cbc"):
+        Lp_prob.solve(p.PULP_CBC_CMD(msg=False, timeLimit=time_limit))
+
+    status = {
+        p.LpStatusOptimal: "optimal",
+        p.LpStatusInfeasible: "infeasible",
+        p.LpStatusUnbounded: "unbounded",
+    }.get(Lp_prob.status, "not_solved")
+    # CBC stopped on time : "optimal" with a feasible solution, "not_solved" without
+    if status == "optimal" and Lp_prob.sol_status == p.LpSolutionIntegerFeasible:
+        status = "feasible"
+    elif status == "not_solved" and time_limit is not None:
+        status = "time_limit"
+    values = np.array([variable.varValue or 0.0 for variable in variables])
+    row_duals = None
+    if status == "optimal":
+        row_duals = np.array([Lp_prob.constraints[f"r{i}"].pi or 0.0 for i in range(model.n_rows)])
+
+    # CBC does not report ranging through PuLP
+    return SolverResult(
+        status=status,
+        objective=Lp_prob.objective.value(),
+        values=values,
+        solver="cbc",
+        row_duals=row_duals,
+        bound=Lp_prob.objective.value() if status == "optimal" else None,
+    )
+
+
+def solve_highs(model: SparseModel, profiler: Profiler, ranging: bool = False,
+                time_limit: Optional[float] = None) -> SolverResult:
+    try:
+        import highspy  # noqa: F401
+    except ImportError:
+        with profiler.phase("linprog"):
+            return _solve_linprog(model, time_limit)
+
+    with profiler.phase("pass_model"):
+        highs = highs_instance(model)
+    return run_highs(highs, profiler, ranging, time_limit)
+
+
+def highs_instance(model: SparseModel):
+    """A silent highspy.Highs holding `model`, which can be modified and re-run."""
+    import highspy
+
+    highs = highspy.Highs()
+    highs.setOptionValue("output_flag", False)
+
+    lp = highspy.HighsLp()
+    lp.num_col_ = model.n_cols
+    lp.num_row_ = model.n_rows
+    lp.col_cost_ = model.c
+    lp.col_lower_ = np.zeros(model.n_cols)
+    lp.col_upper_ = np.full(model.n_cols, highspy.kHighsInf)
+    lp.row_lower_ = model.row_lower
+    lp.row_upper_ = model.row_upper
+    lp.a_matrix_.format_ = highspy.MatrixFormat.kRowwise
+    lp.a_matrix_.num_col_ = model.n_cols
+    lp.a_matrix_.num_row_ = model.n_rows
+    lp.a_matrix_.start_ = model.indptr
+    lp.a_matrix_.index_ = model.indices
+    lp.a_matrix_.value_ = model.data
+    highs.passModel(lp)
+    return highs
+
+
+def run_highs(highs, profiler: Profiler, ranging: bool = False,
+              time_limit: Optional[float] = None) -> SolverResult:
+    """Run `highs`, from the basis of its previous run if it has one."""
+    import highspy
+
+    # The limit applies to the run time of the instance, which adds up over its runs
+    highs.setOptionValue(
+        "time_limit", highs.getRunTime() + time_limit if time_limit is not None else highspy.kHighsInf,
+    )
+    with profiler.phase("highs"):
+        highs.run()
+        if highs.getModelStatus() == highspy.HighsModelStatus.kUnknown:
+            # A previous basis can leave the simplex stuck : solve again from scratch
+            highs.clearSolver()
+            highs.run()
+
+    model_status = highs.getModelStatus()
+    status = {
+        highspy.HighsModelStatus.kOptimal: "optimal",
+        highspy.HighsModelStatus.kInfeasible: "infeasible",
+        highspy.HighsModelStatus.kUnbounded: "unbounded",
+        highspy.HighsModelStatus.kUnboundedOrInfeasible: "infeasible",
+        highspy.HighsModelStatus.kTimeLimit: "time_limit",
+        highspy.HighsModelStatus.kIterationLimit: "time_limit",
+    }.get(model_status, "not_solved")
+    info = highs.getInfo()
+    solution = highs.getSolution()
+
+    feasible = int(highspy.SolutionStatus.kSolutionStatusFeasible)
+    bound = None
+    if status == "optimal":
+        bound = info.objective_function_value
+    elif status == "time_limit":
+        if info.primal_solution_status == feasible:
+            status = "feasible"
+        # A dual feasible simplex basis : its objective is a lower bound
+        if info.dual_solution_status == feasible:
+            bound = info.objective_function_value
+
+    row_duals = intervals = None
+    if status == "optimal":
+        row_duals = np.array(solution.row_dual)
+        if ranging:
+            with profiler.phase("ranging"):
+                intervals = _highs_ranging(highs)
+
+    return SolverResult(
+        status=status,
+        objective=info.objective_function_value if status == "optimal" else None,
+        values=np.array(solution.col_value),
+        iterations=info.simplex_iteration_count,
+        solver="highs",
+        row_duals=row_duals,
+        ranging=intervals,
+        bound=bound,
+    )
+
+
+def _highs_ranging(highs):
+    ranging_status, ranging = highs.getRanging()
+    if not ranging.valid:
+        return None
+    return {
+        "row_bounds": np.column_stack([ranging.row_bound_dn.value_, ranging.row_bound_up.value_]),
+        "costs": np.column_stack([ranging.col_cost_dn.value_, ranging.col_cost_up.value_]),
+    }
+
+
+def _solve_linprog(model: SparseModel, time_limit: Optional[float] = None) -> SolverResult:
+    """scipy fallback of the HiGHS backend : duals but no ranging."""
+    from scipy import sparse
+    from scipy.optimize import linprog
+
+    A = model.A
+    equal = model.row_lower == model.row_upper
+    upper = ~equal & np.isfinite(model.row_upper)
+    lower = ~equal & np.isfinite(model.row_lower)
+
+    result = linprog(
+        model.c,
+        A_ub=sparse.vstack([A[upper], -A[lower]]).tocsr(),
+        b_ub=np.concatenate([model.row_upper[upper], -model.row_lower[lower]]),
+        A_eq=A[equal],
+        b_eq=model.row_lower[equal],
+        bounds=(0, None),
+        method="highs",
+        options={"time_limit": time_limit} if time_limit is not None else None,
+    )
+
+    # linprog reports no plan when it stops at its time limit
+    status = {0: "optimal", 1: "time_limit", 2: "infeasible", 3: "unbounded"}.get(result.status, "not_solved")
+    row_duals = None
+    if status == "optimal":
+        # Marginals are per unit of b_ub / b_eq, lower rows were negated
+        row_duals = np.zeros(model.n_rows)
+        row_duals[equal] = result.eqlin.marginals
+        n_upper = int(upper.sum())
+        row_duals[upper] = result.ineqlin.marginals[:n_upper]
+        row_duals[lower] = -result.ineqlin.marginals[n_upper:]
+
+    return SolverResult(
+        status=status,
+        objective=result.fun if status == "optimal" else None,
+        values=result.x if result.x is not None else np.zeros(model.n_cols),
+        iterations=result.nit,
+        solver="highs",
+        row_duals=row_duals,
+        bound=result.fun if status == "optimal" else None,
+    )
+
+
+# Keyed by models.SOLVER_NAMES, checked by main.check_fields before the import
+SOLVERS = {
+    "cbc": solve_cbc,
+    "highs": solve_highs,
+}
+
+
+def solve(
+    model: SparseModel,
+    solver: Optional[str] = None,
+    profiler: Optional[Profiler] = None,
+    ranging: bool = False,
+    time_limit: Optional[float] = None,
+) -> SolverResult:
+    """
+    Solve `model` with a backend of SOLVERS, `ranging` asks for the sensitivity
+    intervals, `time_limit` stops the solver after that many seconds.
+    """
+    solver = solver or DEFAULT_SOLVER
+    if solver not in SOLVERS:
+        raise ValueError(f"Unknown solver: {solver}")
+    return SOLVERS[solver](model, profiler or Profiler(), ranging, time_limit)
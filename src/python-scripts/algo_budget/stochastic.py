@@ -0,0 +1,536 @@
+"""
+Stochastic plans : the plan of least expected cost, or of least mix of
+expected cost and CVaR, over sampled price scenarios.
+
+A request with a "stochastic" object is solved as a two-stage program :
+
+    "stochastic": {
+        "scenarios": 100,           price scenarios, equally likely
+        "seed": 0,
+        "objective": "expected",    expected (default) or cvar
+        "alpha": 0.95,              the CVaR is the mean cost of the worst 1 - alpha scenarios
+        "riskWeight": 0.5,          weight of the CVaR against the expected cost
+        "firstStage": 1,            leading purchase years decided now
+        "method": "auto",           extensive, benders or auto
+        "yearCorrelation": 0.8, "regionShare": 0.25, "volatility": {"dac": 0.2}
+    }
+
+The scenarios are price paths of uncertainty.py. The purchases of the
+first-stage years are shared by all scenarios, the later purchases and the
+auxiliary columns are decided per scenario, once its prices are known. Every
+scenario keeps the share, financing, need and budget band rows of the request
+(the band on the base prices) : the feasible plans are the same in every
+scenario, only their costs differ.
+
+    extensive : one LP, the first-stage columns then a copy of the other
+                columns per scenario, and a copy of the model rows per
+                scenario : the CSR arrays of the model tiled, their column
+                indices offset. Its size is the scenario count times the model.
+    benders   : multi-cut L-shaped method. The master holds the first-stage
+                columns, one copy of the model, so that every first stage it
+                picks has a recourse in every scenario, and a cost column per
+                scenario bounded by the cuts. The scenarios are solved by one
+                HiGHS instance of the model, its first stage fixed and its costs
+                changed in place, each from its optimal basis of the previous
+                pass : memory stays that of two models and of the cuts.
+    auto      : benders with highspy, faster at every size measured by
+                benchmark.py stochastic, else extensive.
+
+An extensive form of more than EXTENSIVE_MAX_NNZ non-zeros is rejected.
+
+The CVaR is linearized (Rockafellar and Uryasev) : a column eta and one excess
+column per scenario, excess >= scenario cost - eta.
+
+The result is the mean plan in the request format : the first-stage purchases
+and the expected later ones, feasible as a mean of feasible plans, priced at
+the base prices. Its "stochastic" object has the expected cost, CVaR and
+percentiles of the scenario costs.
+"""
+import os
+import time
+from dataclasses import replace
+
+import numpy as np
+
+from errors import BudgetError
+
+
+STOCHASTIC_OBJECTIVES = ("expected", "cvar")
+STOCHASTIC_METHODS = ("auto", "extensive", "benders")
+
+DEFAULT_SCENARIOS = 100
+MAX_SCENARIOS = 1000
+DEFAULT_ALPHA = 0.95
+DEFAULT_RISK_WEIGHT = 0.5
+
+# Non-zeros of the largest extensive form : a peak of about 600 MB, HiGHS holding about 130 bytes per non-zero
+EXTENSIVE_MAX_NNZ = 4_000_000
+
+# Relative gap between the best plan and the bound of the master at which Benders stops
+BENDERS_TOLERANCE = 1e-6
+MAX_BENDERS_ITERATIONS = 100
+
+# Primal feasibility tolerances tried on a scenario found infeasible at the HiGHS default of 1e-7 :
+# the budget band rows hold amounts of about 1e6
+RECOURSE_TOLERANCES = (1e-6, 1e-5, 1e-4)
+
+# A stochastic request solves hundreds of models : its own default limit, in seconds
+STOCHASTIC_TIME_LIMIT = float(os.environ.get("ALGO_BUDGET_STOCHASTIC_TIME_LIMIT", "60"))
+
+STOCHASTIC_PERCENTILES = (5, 50, 95)
+
+
+def _number(spec, key, default, low, high, high_open=False):
+    value = spec.get(key, default)
+    if (
+        isinstance(value, bool) or not isinstance(value, (int, float))
+        or not low <= value <= high or (high_open and value == high)
+    ):
+        interval = f"[{low}, {high})" if high_open else f"[{low}, {high}]"
+        raise BudgetError("invalid", "invalid_stochastic", f"{key} must be a number in {interval}")
+    return float(value)
+
+
+def _integer(spec, key, default, low, high):
+    value = spec.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, int) or not low <= value <= high:
+        raise BudgetError("invalid", "invalid_stochastic", f"{key} must be an integer in [{low}, {high}]")
+    return value
+
+
+def stochastic_options(spec):
+    """
+    Checked options of the "stochastic" object `spec` (true for the defaults) :
+    the price model of uncertainty.py and the options of the program.
+    """
+    from uncertainty import uncertainty_options
+
+    if spec is True:
+        spec = {}
+    if not isinstance(spec, dict):
+        raise BudgetError("invalid", "invalid_stochastic", "stochastic must be an object")
+    objective = spec.get("objective", "expected")
+    if objective not in STOCHASTIC_OBJECTIVES:
+        raise BudgetError(
+            "invalid", "invalid_stochastic",
+            f"unknown objective {objective}, expected {', '.join(STOCHASTIC_OBJECTIVES)}",
+        )
+    method = spec.get("method", "auto")
+    if method not in STOCHASTIC_METHODS:
+        raise BudgetError(
+            "invalid", "invalid_stochastic",
+            f"unknown method {method}, expected {', '.join(STOCHASTIC_METHODS)}",
+        )
+
+    options = uncertainty_options({
+        key: spec[key] for key in ("seed", "yearCorrelation", "regionShare", "volatility") if key in spec
+    })
+    options.update(
+        paths=_integer(spec, "scenarios", DEFAULT_SCENARIOS, 1, MAX_SCENARIOS),
+        objective=objective,
+        method=method,
+        alpha=_number(spec, "alpha", DEFAULT_ALPHA, 0, 1, high_open=True),
+        risk_weight=_number(spec, "riskWeight", DEFAULT_RISK_WEIGHT, 0, 1) if objective == "cvar" else 0.0,
+        first_stage=_integer(spec, "firstStage", 1, 1, 1000),
+    )
+    return options
+
+
+def scenario_costs(years, price, options):
+    """(scenario, purchase column) prices of the (typology, region, period, financing) `price` in every scenario."""
+    from uncertainty import draw_factors
+
+    rng = np.random.default_rng(options["seed"])
+    region_factors, curves = draw_factors(rng, years, options, options["paths"], price.shape[1])
+    factors = np.einsum("trs,tps->strp", region_factors, curves)
+    return (price[None] * factors[..., None]).reshape(options["paths"], -1)
+
+
+def cvar(costs, alpha):
+    """Mean of the worst 1 - alpha share of the equally likely `costs`, the minimum of the linearization."""
+    eta = np.sort(costs)
+    excess = np.maximum(costs[None, :] - eta[:, None], 0).sum(axis=1) / ((1 - alpha) * len(costs))
+    return float((eta + excess).min())
+
+
+def risk_objective(costs, options):
+    """Objective of the program for the scenario `costs` of a plan."""
+    value = (1 - options["risk_weight"]) * float(costs.mean())
+    if options["risk_weight"] > 0:
+        value += options["risk_weight"] * cvar(costs, options["alpha"])
+    return value
+
+
+class ScenarioColumns:
+    """
+    Columns of the extensive form : the `first` columns of `model` shared, the
+    others copied per scenario, then eta and the excess of every scenario when
+    the objective has a CVaR.
+    """
+
+    def __init__(self, model, first, scenarios):
+        self.model = model
+        self.first = first
+        self.scenarios = scenarios
+        is_first = np.zeros(model.n_cols, dtype=bool)
+        is_first[first] = True
+        recourse = np.flatnonzero(~is_first)
+        self.width = len(recourse)
+
+        # Extensive column of every model column in scenario 0, and its offset per scenario
+        self.column = np.empty(model.n_cols, dtype=np.int64)
+        self.column[first] = np.arange(len(first))
+        self.column[recourse] = len(first) + np.arange(self.width)
+        self.offset = np.where(is_first, 0, self.width)
+        self.eta = len(first) + scenarios * self.width
+
+    def of(self, columns):
+        """(scenario, column) extensive columns of the model `columns`."""
+        return self.column[columns][None, :] + np.arange(self.scenarios)[:, None] * self.offset[columns][None, :]
+
+
+def extensive_model(model, costs, first, options):
+    """
+    Extensive form of the program over the (scenario, purchase) `costs`, as a
+    SparseModel with a flat column layout, and its ScenarioColumns.
+    """
+    from model_builder import SparseModel
+
+    scenarios, n = costs.shape
+    columns = ScenarioColumns(model, first, scenarios)
+    risk_weight = options["risk_weight"]
+    with_cvar = risk_weight > 0
+
+    indices = columns.of(model.indices).ravel()
+    data = np.tile(model.data, scenarios)
+    indptr = (model.indptr[:-1][None, :] + np.arange(scenarios)[:, None] * model.nnz).ravel()
+    row_lower = np.tile(model.row_lower, scenarios)
+    row_upper = np.tile(model.row_upper, scenarios)
+    row_groups = {"scenarios": slice(0, scenarios * model.n_rows)}
+
+    n_cols = columns.eta + (1 + scenarios if with_cvar else 0)
+    purchases = columns.of(np.arange(n))
+    # Shared columns sum their costs over the scenarios
+    c = np.bincount(purchases.ravel(), weights=(1 - risk_weight) / scenarios * costs.ravel(), minlength=n_cols)
+
+    if with_cvar:
+        # cost of the scenario - eta - excess <= 0
+        excess = columns.eta + 1 + np.arange(scenarios)
+        c[columns.eta] = risk_weight
+        c[excess] = risk_weight / ((1 - options["alpha"]) * scenarios)
+        indptr = np.concatenate([indptr, scenarios * model.nnz + np.arange(scenarios) * (n + 2)])
+        indices = np.concatenate([
+            indices, np.column_stack([purchases, np.full(scenarios, columns.eta), excess]).ravel(),
+        ])
+        data = np.concatenate([data, np.column_stack([costs, -np.ones((scenarios, 2))]).ravel()])
+        row_lower = np.concatenate([row_lower, np.full(scenarios, -np.inf)])
+        row_upper = np.concatenate([row_upper, np.zeros(scenarios)])
+        row_groups["cvar"] = slice(scenarios * model.n_rows, scenarios * (model.n_rows + 1))
+
+    extensive = SparseModel(
+        c=c,
+        indptr=np.append(indptr, len(data)),
+        indices=indices,
+        data=data,
+        row_lower=row_lower,
+        row_upper=row_upper,
+        # Flat layout : every column is a "purchase" v{j}
+        shape=(n_cols, 1, 1, 1),
+        aux_names=[],
+        row_groups=row_groups,
+    )
+    return extensive, columns
+
+
+def solve_extensive(model, costs, first, options, solver, profiler, time_limit):
+    """
+    (status, (scenario, column) model values, scenario costs, bound, 1
+    iteration) of the extensive form : "optimal", or "feasible" at the time
+    limit.
+    """
+    from solvers import solve
+
+    with profiler.phase("extensive"):
+        extensive, columns = extensive_model(model, costs, first, options)
+    profiler.record("extensive", n_rows=extensive.n_rows, n_cols=extensive.n_cols, nnz=extensive.nnz)
+    solution = solve(extensive, solver, profiler, time_limit=time_limit)
+    if solution.status not in ("optimal", "feasible"):
+        raise BudgetError(
+            solution.status if solution.status in ("infeasible", "unbounded") else "not_solved",
+            f"solver_{solution.status}",
+            f"{solution.solver} found no plan of the extensive form: {solution.status}",
+        )
+
+    values = solution.values[columns.of(np.arange(model.n_cols))]
+    return solution.status, values, (values[:, :costs.shape[1]] * costs).sum(axis=1), solution.bound, 1
+
+
+class Benders:
+    """
+    Multi-cut L-shaped method : the master over the first stage in one HiGHS
+    instance, the scenarios re-solved in another.
+    """
+
+    def __init__(self, model, costs, first, options):
+        import highspy
+        from solvers import highs_instance
+
+        self.model = model
+        self.costs = costs
+        self.first = first
+        self.options = options
+        self.scenarios = len(costs)
+        self.purchases = np.arange(costs.shape[1], dtype=np.int32)
+        self.subproblem = highs_instance(replace(model, c=np.append(costs.mean(axis=0), model.c[len(self.purchases):])))
+        # Optimal basis of every scenario at the previous first stage, where it starts next
+        self.bases = [None] * self.scenarios
+        self.solves = 0
+        self.iterations = 0
+
+        # Master : the model at zero cost, then a cost column per scenario, eta and the excess columns
+        self.master = highs_instance(replace(model, c=np.zeros(model.n_cols)))
+        risk_weight = options["risk_weight"]
+        scenario_cost = np.full(self.scenarios, (1 - risk_weight) / self.scenarios)
+        self.theta = model.n_cols + np.arange(self.scenarios)
+        added = [scenario_cost]
+        if risk_weight > 0:
+            excess_cost = risk_weight / ((1 - options["alpha"]) * self.scenarios)
+            added += [[risk_weight], np.full(self.scenarios, excess_cost)]
+        added = np.concatenate(added)
+        self.master.addCols(
+            len(added), added, np.zeros(len(added)), np.full(len(added), highspy.kHighsInf),
+            0, np.zeros(len(added), dtype=np.int32), np.zeros(0, dtype=np.int32), np.zeros(0),
+        )
+        if risk_weight > 0:
+            # excess - theta + eta >= 0
+            eta = model.n_cols + self.scenarios
+            indices = np.column_stack([eta + 1 + np.arange(self.scenarios), self.theta, np.full(self.scenarios, eta)])
+            self.master.addRows(
+                self.scenarios, np.zeros(self.scenarios), np.full(self.scenarios, highspy.kHighsInf),
+                indices.size, np.arange(self.scenarios, dtype=np.int32) * 3, indices.ravel().astype(np.int32),
+                np.tile([1.0, -1.0, 1.0], self.scenarios),
+            )
+
+    def start(self, profiler, time_limit):
+        """First stage of the plan of least cost at the mean prices."""
+        from solvers import run_highs
+
+        solution = run_highs(self.subproblem, profiler, time_limit=time_limit)
+        self.solves += 1
+        if solution.status != "optimal":
+            raise BudgetError(
+                solution.status if solution.status in ("infeasible", "unbounded") else "not_solved",
+                f"solver_{solution.status}",
+                f"{solution.solver} found no optimal plan at the mean prices: {solution.status}",
+            )
+        return solution.values[self.first]
+
+    def evaluate(self, first_stage, profiler, deadline):
+        """
+        (scenario cost, subgradient over the first stage, model values) of every
+        scenario with the first stage fixed to `first_stage`, None at the deadline.
+        """
+        from solvers import run_highs
+
+        self.subproblem.changeColsBounds(len(self.first), self.first.astype(np.int32), first_stage, first_stage)
+        costs = np.empty(self.scenarios)
+        gradients = np.empty((self.scenarios, len(self.first)))
+        values = np.empty((self.scenarios, self.model.n_cols))
+        for scenario in range(self.scenarios):
+            self.subproblem.changeColsCost(len(self.purchases), self.purchases, self.costs[scenario])
+            if self.bases[scenario] is not None:
+                self.subproblem.setBasis(self.bases[scenario])
+            solution = run_highs(self.subproblem, profiler, time_limit=max(deadline - time.perf_counter(), 0.0))
+            for tolerance in RECOURSE_TOLERANCES if solution.status == "infeasible" else ():
+                # The master holds the rows of its first stage within its own scaled tolerance only
+                self.subproblem.setOptionValue("primal_feasibility_tolerance", tolerance)
+                self.subproblem.clearSolver()
+                solution = run_highs(self.subproblem, profiler, time_limit=max(deadline - time.perf_counter(), 0.0))
+                if solution.status != "infeasible":
+                    break
+            self.subproblem.setOptionValue("primal_feasibility_tolerance", 1e-7)
+            self.solves += 1
+            self.iterations += solution.iterations or 0
+            if solution.status != "optimal":
+                if solution.status in ("time_limit", "feasible"):
+                    return None
+                raise BudgetError(
+                    "not_solved", f"solver_{solution.status}",
+                    f"{solution.solver} found no optimal recourse in scenario {scenario}: {solution.status}",
+                )
+            self.bases[scenario] = self.subproblem.getBasis()
+            costs[scenario] = solution.objective
+            # Reduced costs of the fixed columns : the change of the cost per unit of first stage
+            gradients[scenario] = np.asarray(self.subproblem.getSolution().col_dual)[self.first]
+            values[scenario] = solution.values
+        return costs, gradients, values
+
+    def add_cuts(self, first_stage, costs, gradients):
+        """theta - gradient @ first >= cost - gradient @ first_stage, for every scenario."""
+        import highspy
+
+        width = len(self.first) + 1
+        indices = np.column_stack([np.broadcast_to(self.first, gradients.shape), self.theta])
+        self.master.addRows(
+            self.scenarios, costs - gradients @ first_stage, np.full(self.scenarios, highspy.kHighsInf),
+            indices.size, np.arange(self.scenarios, dtype=np.int32) * width,
+            indices.ravel().astype(np.int32), np.column_stack([-gradients, np.ones(self.scenarios)]).ravel(),
+        )
+
+    def solve_master(self, profiler, deadline):
+        """(bound, first stage) of the master, None at the deadline."""
+        from solvers import run_highs
+
+        solution = run_highs(self.master, profiler, time_limit=max(deadline - time.perf_counter(), 0.0))
+        self.solves += 1
+        if solution.status != "optimal":
+            if solution.status in ("time_limit", "feasible"):
+                return None
+            raise BudgetError(
+                "not_solved", f"solver_{solution.status}",
+                f"{solution.solver} found no optimal master plan: {solution.status}",
+            )
+        return solution.objective, solution.values[self.first]
+
+
+def solve_benders(model, costs, first, options, profiler, time_limit):
+    """
+    (status, (scenario, column) model values, scenario costs, bound, iterations)
+    of the best first stage found : "optimal" within BENDERS_TOLERANCE, or
+    "feasible" at the time limit or MAX_BENDERS_ITERATIONS.
+    """
+    deadline = time.perf_counter() + time_limit
+    with profiler.phase("benders"):
+        benders = Benders(model, costs, first, options)
+        first_stage = benders.start(profiler, time_limit)
+
+        best = None
+        bound = -np.inf
+        status = "feasible"
+        for iteration in range(1, MAX_BENDERS_ITERATIONS + 1):
+            evaluation = benders.evaluate(first_stage, profiler, deadline)
+            if evaluation is None:
+                break
+            scenario_costs, gradients, values = evaluation
+            upper = risk_objective(scenario_costs, options)
+            if best is None or upper < best[0]:
+                best = (upper, values, scenario_costs)
+            if best[0] - bound <= BENDERS_TOLERANCE * max(1.0, abs(best[0])):
+                status = "optimal"
+                break
+
+            benders.add_cuts(first_stage, scenario_costs, gradients)
+            master = benders.solve_master(profiler, deadline)
+            if master is None:
+                break
+            bound, first_stage = master
+            if best[0] - bound <= BENDERS_TOLERANCE * max(1.0, abs(best[0])):
+                status = "optimal"
+                break
+
+    profiler.record("benders", iterations=iteration, solves=benders.solves, simplex=benders.iterations)
+    if best is None:
+        raise BudgetError(
+            "not_solved", "solver_time_limit", "the time limit was reached before a scenario pass",
+        )
+    return status, best[1], best[2], bound if np.isfinite(bound) else None, iteration
+
+
+def stochastic_request(input_json, profiler=None):
+    """
+    Mean plan of the "stochastic" program of `input_json` (in the request
+    format, with the strategies when "aggregate" and the cost distribution
+    under "uncertainty"), with a "stochastic" object :
+
+        "expected_cost", "cvar" : over the scenarios, the CVaR at "alpha"
+        "percentiles"           : of the scenario costs
+        "first_stage"           : years and base price of the purchases decided now
+        "objective_value"       : expected cost, or its mix with the CVaR
+        "bound", "gap"          : lower bound of the objective and relative gap
+    """
+    from algorithms import budget_model, solution_results
+    from diagnostics import Profiler
+    from main import check_fields
+    from session import supports_sessions
+    from solvers import SolverResult
+
+    start = time.perf_counter()
+    profiler = profiler or Profiler()
+    base = {key: value for key, value in input_json.items() if key != "stochastic"}
+    cadence, budget_band = check_fields(base)
+    options = stochastic_options(input_json["stochastic"])
+    uncertainty = base.get("uncertainty")
+    if uncertainty:
+        from uncertainty import uncertainty_options
+        uncertainty = uncertainty_options(uncertainty)
+    else:
+        uncertainty = None
+    solver = base.get("solver")
+    carbon_needs = dict(sorted((int(year), need) for year, need in base["carbonUnitNeeds"].items()))
+
+    years, price, model = budget_model(
+        base["financing"], base["typology"], base["regionAllocation"], carbon_needs,
+        base.get("optimizeFinancing", {}), base.get("optimizeRegion", {}), cadence, budget_band,
+        base.get("cumulativeNeeds", False), profiler,
+    )
+    with profiler.phase("scenarios"):
+        costs = scenario_costs(years, price, options)
+    periods = np.indices(model.shape)[2].ravel()
+    first = np.flatnonzero(periods < options["first_stage"])
+
+    method = options["method"]
+    if method == "auto":
+        method = "benders" if supports_sessions(solver) else "extensive"
+    elif method == "benders" and not supports_sessions(solver):
+        raise BudgetError("invalid", "invalid_stochastic", "the benders method needs the highspy backend")
+    extensive_nnz = options["paths"] * (model.nnz + (model.n_purchases if options["risk_weight"] > 0 else 0))
+    if method == "extensive" and extensive_nnz > EXTENSIVE_MAX_NNZ:
+        raise BudgetError(
+            "not_solved", "stochastic_too_large",
+            f"the extensive form has {extensive_nnz} non-zeros, more than {EXTENSIVE_MAX_NNZ}",
+        )
+
+    time_limit = base.get("timeLimit", STOCHASTIC_TIME_LIMIT)
+    if method == "extensive":
+        status, values, totals, bound, iterations = solve_extensive(
+            model, costs, first, options, solver, profiler, time_limit,
+        )
+    else:
+        status, values, totals, bound, iterations = solve_benders(
+            model, costs, first, options, profiler, time_limit,
+        )
+
+    mean = values.mean(axis=0)
+    results = solution_results(
+        years, price, model,
+        SolverResult(status="optimal", objective=float(model.c @ mean), values=mean, solver=method),
+        profiler, base.get("format", "records"), base.get("aggregate", False), uncertainty=uncertainty,
+    )
+    objective_value = risk_objective(totals, options)
+    if status != "optimal":
+        results.update(status="time_limit", optimal=False)
+
+    first_years = np.asarray(years)[:options["first_stage"]]
+    results["stochastic"] = {
+        "scenarios": options["paths"],
+        "method": method,
+        "objective": options["objective"],
+        "alpha": options["alpha"],
+        "expected_cost": float(totals.mean()),
+        "cvar": cvar(totals, options["alpha"]),
+        "percentiles": {
+            f"p{q}": value for q, value in zip(
+                STOCHASTIC_PERCENTILES, np.percentile(totals, STOCHASTIC_PERCENTILES).tolist(),
+            )
+        },
+        "first_stage": {
+            "years": first_years.tolist(),
+            "total_price": float(model.c[first] @ mean[first]),
+        },
+        "objective_value": objective_value,
+        "bound": bound,
+        "gap": None if bound is None else max(objective_value - bound, 0.0) / max(1.0, abs(objective_value)),
+        "iterations": iterations,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    return results
@@ -0,0 +1,94 @@
+"""
+Ready-to-render aggregates of a solved plan, as expected by the front end
+(YearlyStrategy and BudgetPythonResponse in src/types/types.ts).
+
+Every total is a group-by sum over the (typology, region, period, financing)
+solution tensor, the payload is only assembled for the non-empty groups.
+"""
+import numpy as np
+
+from constants import typology_cost_factors
+from models import TYPOLOGIES, REGIONS, FINANCING_KEYS
+
+
+# Purchases of fewer tons are left out of the strategies
+MIN_STRATEGY_QUANTITY = 10
+
+# (typology, low/high) cost factors
+COST_FACTORS = np.array(
+    [[typology_cost_factors[project]["low"], typology_cost_factors[project]["high"]]
+     for project in TYPOLOGIES]
+)
+
+
+def _financing_details(quantity, cost, region_quantities, region_costs):
+    return {
+        "quantity": quantity,
+        "regions": [
+            {"region": region, "quantity": region_quantity, "cost": region_cost}
+            for region, region_quantity, region_cost in zip(REGIONS, region_quantities, region_costs)
+            if region_quantity > 0
+        ],
+        "price_per_ton": cost / quantity if quantity > 0 else 0,
+        "cost": cost,
+    }
+
+
+def yearly_strategies(years, price, values):
+    """
+    Yearly strategies, low/medium/high budgets and cost/quantity breakdowns of
+    the purchases `values`, priced by `price`, both (typology, region, period,
+    financing) arrays.
+    """
+    quantity = np.where(values >= MIN_STRATEGY_QUANTITY, values, 0.0)
+    cost = quantity * price
+
+    # (typology, period) medium cost, then (low/high, period)
+    typology_cost = cost.sum(axis=(1, 3))
+    cost_bands = COST_FACTORS.T @ typology_cost
+    period_cost = typology_cost.sum(axis=0)
+    period_quantity = quantity.sum(axis=(0, 1, 3))
+
+    # (typology, period, financing) and (typology, period, financing, region) groups
+    group_quantity = quantity.sum(axis=1).tolist()
+    group_cost = cost.sum(axis=1).tolist()
+    region_quantity = quantity.transpose(0, 2, 3, 1).tolist()
+    region_cost = cost.transpose(0, 2, 3, 1).tolist()
+    typology_quantity = quantity.sum(axis=(1, 3))
+
+    strategies = []
+    for period in np.flatnonzero(period_quantity > 0).tolist():
+        types_purchased = []
+        for project in np.flatnonzero(typology_quantity[:, period] > 0).tolist():
+            breakdown = {"typology": TYPOLOGIES[project]}
+            for financing, key in reversed(list(enumerate(FINANCING_KEYS))):
+                breakdown[key] = _financing_details(
+                    group_quantity[project][period][financing],
+                    group_cost[project][period][financing],
+                    region_quantity[project][period][financing],
+                    region_cost[project][period][financing],
+                )
+            types_purchased.append(breakdown)
+
+        strategies.append({
+            "year": int(years[period]),
+            "quantity_purchased": float(period_quantity[period]),
+            "cost_low": float(cost_bands[0, period]),
+            "cost_medium": float(period_cost[period]),
+            "cost_high": float(cost_bands[1, period]),
+            "types_purchased": types_purchased,
+        })
+
+    return {
+        "totalBudgetLow": float(cost_bands[0].sum()),
+        "totalBudgetMedium": float(period_cost.sum()),
+        "totalBudgetHigh": float(cost_bands[1].sum()),
+        "strategies": strategies,
+        "breakdowns": {
+            "costByTypology": dict(zip(TYPOLOGIES, cost.sum(axis=(1, 2, 3)).tolist())),
+            "costByRegion": dict(zip(REGIONS, cost.sum(axis=(0, 2, 3)).tolist())),
+            "costByFinancing": dict(zip(FINANCING_KEYS, cost.sum(axis=(0, 1, 2)).tolist())),
+            "quantityByRegion": dict(zip(REGIONS, quantity.sum(axis=(0, 2, 3)).tolist())),
+            "quantityByFinancing": dict(zip(FINANCING_KEYS, quantity.sum(axis=(0, 1, 2)).tolist())),
+        },
+    }
@@ -0,0 +1,301 @@
+"""
+Sensitivity sweeps : the total price of a request over a sample of its
+typology and region shares, a cost surface.
+
+A request with a "sweep" object is solved at every point of the sample :
+
+    "sweep": {
+        "typology": {"biochar": [0, 0.3], "dac": [0, 0.2]},
+        "regionAllocation": {"europe": [0.1, 0.5]},
+        "method": "grid",       grid (default) or lhs (Latin hypercube)
+        "steps": 5,             values of each swept share in a grid
+        "points": 1000,         points of a Latin hypercube
+        "seed": 0               seed of the Latin hypercube
+    }
+
+Each swept share takes values in its [min, max] range, the other shares of
+its group are rescaled to keep their proportions and a sum of 1. A point
+whose swept shares sum above 1 is reported with the error fields of
+errors.py, as a point whose model cannot be solved.
+
+The points are ordered along a serpentine path so that consecutive points are
+neighbours, and cut into chunks solved across a forked process pool. Each
+chunk builds its model once and re-solves it in place (see session.py) : a
+point starts from the optimal basis of its neighbour. Without highspy every
+point is solved as a request.
+"""
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from errors import BudgetError, error_fields
+from models import TYPOLOGIES, REGIONS
+from plans import plan_years
+
+
+# Request field of each sweepable share group, and its keys
+SWEEP_GROUPS = {
+    "typology": TYPOLOGIES,
+    "regionAllocation": REGIONS,
+}
+
+SWEEP_METHODS = ("grid", "lhs")
+
+DEFAULT_STEPS = 5
+DEFAULT_POINTS = 1000
+
+# Largest sample of a sweep request
+MAX_SWEEP_POINTS = 100_000
+
+# Points solved per task : one model build each
+SWEEP_CHUNK = 512
+
+
+def sweep_axes(spec):
+    """
+    (group, key, low, high) of every swept share of the "sweep" object `spec`,
+    raises a BudgetError when `spec` is malformed.
+    """
+    if not isinstance(spec, dict):
+        raise BudgetError("invalid", "invalid_sweep", "sweep must be an object")
+    axes = []
+    for group, keys in SWEEP_GROUPS.items():
+        for key, bounds in (spec.get(group) or {}).items():
+            if key not in keys:
+                raise BudgetError("invalid", "invalid_sweep", f"unknown {group} share {key}")
+            if (
+                not isinstance(bounds, list) or len(bounds) != 2
+                or any(isinstance(bound, bool) or not isinstance(bound, (int, float)) for bound in bounds)
+                or not 0 <= bounds[0] <= bounds[1] <= 1
+            ):
+                raise BudgetError(
+                    "invalid", "invalid_sweep", f"range of {group} share {key} must be [min, max] in [0, 1]",
+                )
+            axes.append((group, key, float(bounds[0]), float(bounds[1])))
+    if not axes:
+        raise BudgetError("invalid", "invalid_sweep", "sweep has no typology or regionAllocation range")
+    for name in ("steps", "points", "seed"):
+        value = spec.get(name, 0)
+        if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+            raise BudgetError("invalid", "invalid_sweep", f"{name} must be a non-negative integer")
+    return axes
+
+
+def sample_points(spec, axes):
+    """(point, axis) swept shares of the grid or Latin hypercube of `spec`."""
+    method = spec.get("method", "grid")
+    low = np.array([axis[2] for axis in axes])
+    high = np.array([axis[3] for axis in axes])
+    if method == "grid":
+        steps = spec.get("steps", DEFAULT_STEPS)
+        if steps < 1 or steps ** len(axes) > MAX_SWEEP_POINTS:
+            raise BudgetError(
+                "invalid", "invalid_sweep", f"a grid must have 1 to {MAX_SWEEP_POINTS} points",
+            )
+        unit = np.linspace(0.0, 1.0, steps) if steps > 1 else np.zeros(1)
+        mesh = np.meshgrid(*[unit] * len(axes), indexing="ij")
+        unit_points = np.stack([axis.ravel() for axis in mesh], axis=1)
+    elif method == "lhs":
+        points = spec.get("points", DEFAULT_POINTS)
+        if not 1 <= points <= MAX_SWEEP_POINTS:
+            raise BudgetError(
+                "invalid", "invalid_sweep", f"a Latin hypercube must have 1 to {MAX_SWEEP_POINTS} points",
+            )
+        rng = np.random.default_rng(spec.get("seed", 0))
+        # One point per stratum of every axis, the strata paired at random
+        strata = np.argsort(rng.random((len(axes), points)), axis=1).T
+        unit_points = (strata + rng.random((points, len(axes)))) / points
+    else:
+        raise BudgetError(
+            "invalid", "invalid_sweep", f"unknown sweep method {method}, expected {', '.join(SWEEP_METHODS)}",
+        )
+    return low + unit_points * (high - low)
+
+
+def serpentine_order(values, low, high):
+    """
+    Order of the (point, axis) `values` along a serpentine path through cells of
+    about equal counts : every axis is walked back and forth within the cells
+    of the previous ones, so consecutive points are neighbours.
+    """
+    count, dimensions = values.shape
+    bins = max(1, math.ceil(count ** (1 / dimensions)))
+    span = np.where(high > low, high - low, 1.0)
+    cells = np.clip(((values - low) / span * bins).astype(int), 0, bins - 1)
+
+    keys = np.empty_like(cells)
+    parity = np.zeros(count, dtype=int)
+    for axis in range(dimensions):
+        keys[:, axis] = np.where(parity % 2 == 1, bins - 1 - cells[:, axis], cells[:, axis])
+        parity += cells[:, axis]
+    # np.lexsort sorts by its last key first
+    return np.lexsort(keys.T[::-1])
+
+
+def point_shares(input_json, axes, values):
+    """
+    Typology and regionAllocation shares of a point : the swept shares at
+    `values`, the others rescaled to the rest of their group. None when the
+    swept shares of a group sum above 1.
+    """
+    shares = {}
+    for group in SWEEP_GROUPS:
+        swept = {key: value for (axis_group, key, _, _), value in zip(axes, values) if axis_group == group}
+        base = dict(input_json.get(group) or {})
+        if not swept:
+            shares[group] = base
+            continue
+
+        rest = 1.0 - sum(swept.values())
+        if rest < -1e-9:
+            return None
+        others = [key for key in SWEEP_GROUPS[group] if key not in swept]
+        others_total = math.fsum(base.get(key, 0.0) for key in others)
+        shares[group] = dict(swept)
+        for key in others:
+            if others_total > 0:
+                shares[group][key] = max(rest, 0.0) * base.get(key, 0.0) / others_total
+            else:
+                shares[group][key] = max(rest, 0.0) / len(others)
+        if rest > 1e-9 and not others:
+            return None
+    return shares
+
+
+def solve_chunk(input_json, axes, chunk):
+    """
+    (point index, total price, status, error fields) of the (index, values)
+    points of `chunk`, re-solving one warm model.
+    """
+    from session import BudgetSession, share_values, supports_sessions
+
+    requests = []
+    for index, values in chunk:
+        shares = point_shares(input_json, axes, values)
+        requests.append((index, None if shares is None else dict(input_json, **shares)))
+
+    if not supports_sessions(input_json.get("solver")):
+        return [solve_cold(index, request) for index, request in requests]
+
+    from algorithms import budget_model
+    from diagnostics import Profiler
+    from main import check_fields
+    from solvers import DEFAULT_TIME_LIMIT, run_highs
+
+    cadence, budget_band = check_fields(input_json)
+    # Need rows in year order, as session.session_solve writes them
+    carbon_needs = dict(sorted((int(year), need) for year, need in input_json["carbonUnitNeeds"].items()))
+    need_rhs = list(carbon_needs.values())
+    time_limit = input_json.get("timeLimit", DEFAULT_TIME_LIMIT)
+
+    session = None
+    rows = []
+    for index, request in requests:
+        if request is None:
+            rows.append(unsolvable(index))
+            continue
+        shares = share_values(
+            request["financing"], request["typology"], request["regionAllocation"],
+            request.get("optimizeFinancing", {}), request.get("optimizeRegion", {}),
+        )
+        if session is None:
+            years, price, model = budget_model(
+                request["financing"], request["typology"], request["regionAllocation"], carbon_needs,
+                request.get("optimizeFinancing", {}), request.get("optimizeRegion", {}), cadence,
+                budget_band, request.get("cumulativeNeeds", False),
+            )
+            session = BudgetSession(years, price, model, shares)
+        else:
+            session.update(need_rhs, shares)
+
+        solution = run_highs(session.highs, Profiler(), time_limit=time_limit)
+        if solution.status == "optimal":
+            rows.append((index, solution.objective, "optimal", None))
+        else:
+            rows.append((index, None, solution.status, {
+                "error": f"highs found no optimal plan: {solution.status}",
+                "status": solution.status, "code": f"solver_{solution.status}",
+            }))
+    return rows
+
+
+def solve_cold(index, request):
+    """Row of solve_chunk of one point solved as a request."""
+    from main import solve_request
+
+    if request is None:
+        return unsolvable(index)
+    try:
+        result = solve_request(dict(request, format="columnar", cache=False))
+    except Exception as error:
+        fields = error_fields(error)
+        return index, None, fields["status"], fields
+    return index, result["total_price"], result["status"], None
+
+
+def unsolvable(index):
+    return index, None, "infeasible", {
+        "error": "swept shares sum above 1", "status": "infeasible", "code": "shares_sum",
+    }
+
+
+def sweep_request(input_json, workers=None):
+    """
+    Cost surface of the "sweep" object of `input_json`, columnar : the swept
+    shares ("typology.biochar", ...), "total_price" and "status" of every
+    point, in sample order (row-major over the axes for a grid, of "shape"),
+    with the error fields of the failed points in "errors".
+    """
+    from main import check_fields
+
+    start = time.perf_counter()
+    base = {key: value for key, value in input_json.items() if key != "sweep"}
+    cadence, _ = check_fields(base)
+    spec = input_json["sweep"]
+    axes = sweep_axes(spec)
+    values = sample_points(spec, axes)
+    low = np.array([axis[2] for axis in axes])
+    high = np.array([axis[3] for axis in axes])
+
+    order = serpentine_order(values, low, high)
+    points = [(int(index), values[index].tolist()) for index in order]
+    workers = max(1, workers or os.cpu_count() or 1)
+    size = max(1, min(SWEEP_CHUNK, math.ceil(len(points) / workers)))
+    chunks = [points[offset:offset + size] for offset in range(0, len(points), size)]
+
+    if workers == 1 or len(chunks) == 1:
+        rows = [row for chunk in chunks for row in solve_chunk(base, axes, chunk)]
+    else:
+        from tensors import purchase_tensors
+
+        # Tensors of the request, computed once before the fork
+        last_year = max(int(year) for year in base["carbonUnitNeeds"])
+        purchase_tensors(plan_years(cadence, last_year))
+        # Forked workers share the imports and tensors of this process
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            rows = [
+                row
+                for chunk_rows in pool.map(solve_chunk, *zip(*[(base, axes, chunk) for chunk in chunks]))
+                for row in chunk_rows
+            ]
+
+    rows.sort(key=lambda row: row[0])
+    surface = {f"{group}.{key}": values[:, axis].tolist() for axis, (group, key, _, _) in enumerate(axes)}
+    surface["total_price"] = [row[1] for row in rows]
+    surface["status"] = [row[2] for row in rows]
+    result = {
+        "method": spec.get("method", "grid"),
+        "points": len(rows),
+        "solved": sum(row[2] == "optimal" for row in rows),
+        "surface": surface,
+        "errors": {str(row[0]): row[3] for row in rows if row[3] is not None},
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    if result["method"] == "grid":
+        result["shape"] = [spec.get("steps", DEFAULT_STEPS)] * len(axes)
+    return result
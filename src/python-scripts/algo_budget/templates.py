@@ -0,0 +1,337 @@
+"""
+Compiled model templates : prebuilt models persisted in one versioned file,
+memory-mapped by cold processes instead of building tensors and models.
+
+A template is the SparseModel of one structure (cadence, last need year,
+optimize flags, budget band, formulation) with a need row for every year from
+BASE_YEAR to the last need year. A request of that structure gets its model by
+keeping the need rows of its need years and writing its needs and shares in
+them : the model build_model would return, without building it. The price
+tensor is the purchase part of the objective.
+
+The file starts with MAGIC, the length of a JSON header and the header : the
+version, and for every template the offset, dtype and shape of its arrays. The
+arrays follow, aligned on 64 bytes, their offsets counted from the first one.
+The version hashes the sources the models are built from, a file of another
+version is ignored.
+
+Set ALGO_BUDGET_TEMPLATES to the file path, or to an empty string to disable
+the templates.
+
+Usage:
+    python templates.py build [--path PATH]
+    python templates.py info [--path PATH]
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+from functools import lru_cache
+from typing import Dict, Optional
+
+import numpy as np
+
+from model_builder import SparseModel
+from models import (
+    TYPOLOGIES, REGIONS, FINANCING_KEYS, Financing, Typology, RegionAllocation, Cadence, BudgetBand,
+    TimeConstraint,
+)
+from plans import BASE_YEAR, cadence_for_time_constraint, plan_years
+
+
+MAGIC = b"ALGOTPL1"
+ALIGNMENT = 64
+
+_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_PATH = os.environ.get("ALGO_BUDGET_TEMPLATES", os.path.join(_DIRECTORY, "model_templates.bin"))
+
+# Last need years and time constraints prebuilt by `templates.py build`, with every optimize flag
+TEMPLATE_LAST_YEARS = (2030, 2035, 2040, 2045, 2050)
+TEMPLATE_TIME_CONSTRAINTS = (TimeConstraint.Yearly, TimeConstraint.FiveYear, TimeConstraint.NoConstraint)
+
+# Share rows of a template, in the order of their entries in "share_positions"
+SHARE_GROUPS = (
+    ("financing", FINANCING_KEYS, "total_purch_for_on_spot_fwd"),
+    ("typology", TYPOLOGIES, "total_purch_for_typo_distrib"),
+    ("region", REGIONS, "total_purch_for_typo_distrib"),
+)
+
+ARRAYS = ("c", "indptr", "indices", "data", "row_lower", "row_upper", "years", "share_positions")
+
+
+@lru_cache(maxsize=None)
+def template_version():
+    """Hash of the sources the templates are built from, computed on first use."""
+    digest = hashlib.sha256(MAGIC)
+    for name in ("constants.py", "plans.py", "tensors.py", "model_builder.py", "templates.py"):
+        with open(os.path.join(_DIRECTORY, name), "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()[:16]
+
+
+def template_key(cadence, last_year, optimizeFinancing, optimizeRegion, budget_band, cumulative_needs):
+    """Header key of a structure, None for the structures without templates."""
+    if not isinstance(cadence, int):
+        return None
+    return json.dumps([
+        cadence, int(last_year), bool(optimizeFinancing), bool(optimizeRegion),
+        [float(bound) for bound in budget_band] if budget_band is not None else None,
+        bool(cumulative_needs),
+    ])
+
+
+def _data_start(header_size):
+    """Offset of the arrays, which are aligned from the end of the header."""
+    end = len(MAGIC) + 8 + header_size
+    return end + -end % ALIGNMENT
+
+
+def load_templates(path: Optional[str] = TEMPLATE_PATH) -> Dict[str, dict]:
+    """
+    Header entries of the templates of the file at `path`, {} when unusable.
+    The file is memory-mapped, see template_arrays.
+    """
+    if not path:
+        return {}
+    try:
+        with open(path, "rb") as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return {}
+
+    start = len(MAGIC) + 8
+    if buffer[:len(MAGIC)] != MAGIC:
+        return {}
+    (header_size,) = struct.unpack("<Q", buffer[len(MAGIC):start])
+    header = json.loads(buffer[start:start + header_size])
+    if header.get("version") != template_version():
+        return {}
+
+    data_start = _data_start(header_size)
+    return {
+        key: dict(entry, buffer=buffer, data_start=data_start)
+        for key, entry in header["templates"].items()
+    }
+
+
+def template_arrays(entry):
+    """Read-only arrays of a template entry, views of the memory-mapped file."""
+    return {
+        name: np.frombuffer(
+            entry["buffer"], dtype=dtype, count=int(np.prod(shape)),
+            offset=entry["data_start"] + offset,
+        ).reshape(shape)
+        for name, (offset, dtype, shape) in entry["arrays"].items()
+    }
+
+
+_TEMPLATES = None
+
+
+def templates() -> Dict[str, dict]:
+    """Templates of TEMPLATE_PATH, loaded on first use."""
+    global _TEMPLATES
+    if _TEMPLATES is None:
+        _TEMPLATES = load_templates()
+    return _TEMPLATES
+
+
+def template_model(
+    cadence: Cadence,
+    carbon_needs: Dict[int, int],
+    financing: Financing,
+    typology: Typology,
+    region_allocation: RegionAllocation,
+    optimizeFinancing: bool,
+    optimizeRegion: bool,
+    budget_band: Optional[BudgetBand] = None,
+    cumulative_needs: bool = False,
+):
+    """
+    (years, model) of a request from its template, None without template.
+    The model has the need rows of `carbon_needs` in their order, as build_model.
+    """
+    need_years = np.array([int(year) for year in carbon_needs.keys()])
+    key = template_key(
+        cadence, need_years.max(), optimizeFinancing, optimizeRegion, budget_band, cumulative_needs,
+    )
+    entry = templates().get(key) if key is not None else None
+    if entry is None:
+        return None
+    arrays = template_arrays(entry)
+    needs_start = entry["row_groups"]["needs"][0]
+
+    # Rows before the needs, then the need row of every need year
+    keep = np.concatenate([np.arange(needs_start), needs_start + need_years - BASE_YEAR])
+    starts = arrays["indptr"][keep]
+    counts = arrays["indptr"][keep + 1] - starts
+    indptr = np.zeros(len(keep) + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    positions = np.arange(indptr[-1]) + np.repeat(starts - indptr[:-1], counts)
+    indices = arrays["indices"][positions]
+    data = arrays["data"][positions]
+
+    # Share entries are before the need rows, their positions are unchanged
+    shares = []
+    if not optimizeFinancing:
+        shares += [financing[key] for key in FINANCING_KEYS]
+    shares += [typology[key] for key in TYPOLOGIES]
+    if not optimizeRegion:
+        shares += [region_allocation[key] for key in REGIONS]
+    share_positions = arrays["share_positions"]
+    data[share_positions] = -np.asarray(shares, dtype=float)
+
+    # build_model leaves out the zero shares
+    zeros = share_positions[data[share_positions] == 0]
+    if len(zeros):
+        keep_entries = np.ones(len(data), dtype=bool)
+        keep_entries[zeros] = False
+        indptr[1:] -= np.cumsum(np.bincount(
+            np.searchsorted(indptr, zeros, side="right") - 1, minlength=len(keep),
+        ))
+        indices, data = indices[keep_entries], data[keep_entries]
+
+    row_lower = arrays["row_lower"][keep]
+    row_upper = arrays["row_upper"][keep]
+    row_lower[needs_start:] = [carbon_needs[year] for year in carbon_needs]
+
+    row_groups = {name: slice(start, stop) for name, (start, stop) in entry["row_groups"].items()}
+    row_groups["needs"] = slice(needs_start, len(keep))
+    model = SparseModel(
+        c=arrays["c"],
+        indptr=indptr,
+        indices=indices,
+        data=data,
+        row_lower=row_lower,
+        row_upper=row_upper,
+        shape=tuple(entry["shape"]),
+        aux_names=list(entry["aux_names"]),
+        row_groups=row_groups,
+    )
+    return arrays["years"], model
+
+
+def _share_positions(model: SparseModel):
+    """Position in `data` of the total column entry of every share row."""
+    positions = []
+    for group, keys, aux_name in SHARE_GROUPS:
+        if group not in model.row_groups:
+            continue
+        aux_col = model.n_purchases + model.aux_names.index(aux_name)
+        for row in range(model.row_groups[group].start, model.row_groups[group].stop):
+            start, end = model.indptr[row], model.indptr[row + 1]
+            positions.append(start + int(np.searchsorted(model.indices[start:end], aux_col)))
+    return np.array(positions, dtype=np.int64)
+
+
+def build_template(cadence, last_year, optimizeFinancing, optimizeRegion, budget_band, cumulative_needs):
+    """Template arrays and metadata of one structure."""
+    from algorithms import plan_periods
+    from model_builder import build_model
+    from tensors import purchase_tensors
+
+    need_years = range(BASE_YEAR, last_year + 1)
+    years, need_periods = plan_periods(cadence, {year: 0.0 for year in need_years})
+    price, stock_delivery = purchase_tensors(years)
+    # Non-zero placeholder shares, so that every share row has its total column entry
+    model = build_model(
+        price, stock_delivery, need_periods, np.zeros(len(need_years)),
+        {key: 1.0 / len(FINANCING_KEYS) for key in FINANCING_KEYS},
+        {key: 1.0 / len(TYPOLOGIES) for key in TYPOLOGIES},
+        {key: 1.0 / len(REGIONS) for key in REGIONS},
+        optimizeFinancing, optimizeRegion, budget_band, cumulative_needs,
+    )
+    arrays = {
+        "c": model.c,
+        "indptr": model.indptr,
+        "indices": model.indices,
+        "data": model.data,
+        "row_lower": model.row_lower,
+        "row_upper": model.row_upper,
+        "years": np.asarray(years, dtype=np.int64),
+        "share_positions": _share_positions(model),
+    }
+    return arrays, {
+        "shape": list(model.shape),
+        "aux_names": model.aux_names,
+        "row_groups": {name: [rows.start, rows.stop] for name, rows in model.row_groups.items()},
+    }
+
+
+def default_structures():
+    """(cadence, last year, optimizeFinancing, optimizeRegion, budget band, cumulative) to prebuild."""
+    for time_constraint in TEMPLATE_TIME_CONSTRAINTS:
+        cadence, budget_band = cadence_for_time_constraint(time_constraint.value)
+        for last_year in TEMPLATE_LAST_YEARS:
+            # Bands no plan of that many periods can meet, see feasibility.py
+            if budget_band is not None and len(plan_years(cadence, last_year)) * budget_band[1] < 1:
+                continue
+            for optimizeFinancing in (False, True):
+                for optimizeRegion in (False, True):
+                    yield cadence, last_year, optimizeFinancing, optimizeRegion, budget_band, False
+
+
+def write_templates(path=TEMPLATE_PATH, structures=None):
+    """Build the templates of `structures` (default_structures) into the file at `path`."""
+    structures = list(structures if structures is not None else default_structures())
+    header = {"version": template_version(), "templates": {}}
+    blobs = []
+    offset = 0
+    for structure in structures:
+        arrays, entry = build_template(*structure)
+        entry["arrays"] = {}
+        for name in ARRAYS:
+            array = np.ascontiguousarray(arrays[name])
+            offset += -offset % ALIGNMENT
+            entry["arrays"][name] = [offset, array.dtype.str, list(array.shape)]
+            blobs.append((offset, array))
+            offset += array.nbytes
+        header["templates"][template_key(*structure)] = entry
+
+    encoded = json.dumps(header).encode()
+    data_start = _data_start(len(encoded))
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(MAGIC)
+        file.write(struct.pack("<Q", len(encoded)))
+        file.write(encoded)
+        for relative, array in blobs:
+            file.seek(data_start + relative)
+            file.write(array.tobytes())
+    os.replace(temporary, path)
+    return len(structures)
+
+
+def main(argv=None):
+    import argparse
+    import sys
+    import time
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("build", "info"))
+    parser.add_argument("--path", default=TEMPLATE_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        start = time.perf_counter()
+        count = write_templates(args.path)
+        print(
+            f"{count} templates written to {args.path} ({os.path.getsize(args.path) / 1e6:.1f} MB) "
+            f"in {time.perf_counter() - start:.1f}s, version {template_version()}",
+            file=sys.stderr,
+        )
+        return
+
+    start = time.perf_counter()
+    loaded = load_templates(args.path)
+    print(json.dumps({
+        "path": args.path,
+        "version": template_version(),
+        "templates": len(loaded),
+        "load_ms": round((time.perf_counter() - start) * 1000, 3),
+    }))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+constants.py compiled once into dense NumPy arrays.
+
+Extended horizons are memoized in bounded LRU caches : repeated requests for
+the same horizon share the same read-only arrays.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from constants import (x_coefficients, coefficients, regional_factors)
+from models import TYPOLOGIES, REGIONS, FINANCING
+from plans import BASE_YEAR, LAST_DATA_YEAR
+
+# Ex-ante purchases are discounted compared to ex-post purchases
+EX_ANTE_DISCOUNT = 0.87
+
+# Number of horizons kept by each memoized tensor
+TENSOR_CACHE_SIZE = 16
+
+
+def _frozen(array):
+    array.setflags(write=False)
+    return array
+
+
+def delivery_group(project):
+    """Name of the exAnte coefficients curve used by a typology."""
+    return "nbsRemoval" if project == "nbsRemoval" else "other_types"
+
+
+# (typology, year) ex-post price per ton before regional factors
+BASE_PRICES = _frozen(np.array([x_coefficients[project] for project in TYPOLOGIES], dtype=float))
+
+# (typology, region) regional price factors
+REGIONAL_FACTORS = _frozen(np.array(
+    [[regional_factors[project][region] for region in REGIONS] for project in TYPOLOGIES],
+    dtype=float,
+))
+
+# (financing,) price factor of each financing type
+FINANCING_FACTORS = _frozen(np.array([1.0, EX_ANTE_DISCOUNT]))
+
+# (financing, typology, region, year) price per ton over the years of constants.py
+PRICE_TENSOR = _frozen(
+    FINANCING_FACTORS[:, None, None, None]
+    * REGIONAL_FACTORS[None, :, :, None]
+    * BASE_PRICES[None, :, None, :]
+)
+
+# (typology, age) share of an ex-ante purchase delivered `age` years after the
+# purchase : the exAnte coefficients read from the end
+DELIVERY_CURVES = _frozen(np.array(
+    [coefficients[delivery_group(project)][::-1] for project in TYPOLOGIES], dtype=float
+))
+
+
+def extend_years(values, length, mode="linear"):
+    """
+    Extend the last axis of `values` to `length` years : "linear" continues the
+    last yearly delta (never below 0), "flat" repeats the last value.
+    """
+    available = values.shape[-1]
+    if length <= available:
+        return values[..., :length]
+
+    steps = np.arange(1, length - available + 1)
+    last = values[..., -1:]
+    if mode == "flat":
+        extension = np.broadcast_to(last, values.shape[:-1] + steps.shape)
+    elif mode == "linear":
+        delta = last - values[..., -2:-1] if available > 1 else np.zeros_like(last)
+        extension = np.maximum(last + delta * steps, 0)
+    else:
+        raise ValueError(f"Unknown extension mode: {mode}")
+    return np.concatenate([values, extension], axis=-1)
+
+
+@lru_cache(maxsize=TENSOR_CACHE_SIZE)
+def price_tensor(horizon: int, mode: str = "linear") -> np.ndarray:
+    """(financing, typology, region, year) price per ton over `horizon` years from BASE_YEAR."""
+    base_prices = extend_years(BASE_PRICES, horizon, mode)
+    return _frozen(
+        FINANCING_FACTORS[:, None, None, None]
+        * REGIONAL_FACTORS[None, :, :, None]
+        * base_prices[None, :, None, :]
+    )
+
+
+@lru_cache(maxsize=TENSOR_CACHE_SIZE)
+def delivery_tensor(horizon: int) -> np.ndarray:
+    """
+    (reference year, typology, year, financing) share of the purchases of each
+    year counted at each reference year, over `horizon` years from BASE_YEAR.
+
+    Every purchase made up to the reference year counts : ex-post ones fully,
+    ex-ante ones by the share delivered at that date. The exAnte curves stop
+    at LAST_DATA_YEAR, later reference years read them as of LAST_DATA_YEAR.
+    """
+    years = BASE_YEAR + np.arange(horizon)
+    reference_years = years[:, None]
+
+    counted = years[None, :] <= reference_years
+    age = np.minimum(reference_years, LAST_DATA_YEAR) - years[None, :]
+    delivered = np.where(
+        (age >= 0)[:, None, :],
+        DELIVERY_CURVES[:, np.clip(age, 0, DELIVERY_CURVES.shape[1] - 1)].transpose(1, 0, 2),
+        0.0,
+    )
+
+    weights = np.empty((horizon, len(TYPOLOGIES), horizon, len(FINANCING)))
+    weights[..., 0] = counted[:, None, :]
+    weights[..., 1] = delivered * counted[:, None, :]
+    return _frozen(weights)
+
+
+def purchase_tensors(years):
+    """
+    Price (typology, region, period, financing) and delivery (reference period,
+    typology, period, financing) tensors restricted to the purchase years.
+    """
+    offsets = np.asarray(years) - BASE_YEAR
+    horizon = int(offsets[-1]) + 1
+    price = np.moveaxis(price_tensor(horizon)[..., offsets], 0, -1)
+    stock_delivery = delivery_tensor(horizon)[offsets][:, :, offsets, :]
+    return price, stock_delivery
+
+
+def cache_info():
+    """Hits and misses of the memoized tensors."""
+    return {
+        "price_tensor": price_tensor.cache_info()._asdict(),
+        "delivery_tensor": delivery_tensor.cache_info()._asdict(),
+    }
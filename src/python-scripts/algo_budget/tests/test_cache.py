@@ -0,0 +1,92 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from cache import ResultCache, cached, request_key
+from solvers import DEFAULT_SOLVER
+
+REQUEST = {
+    "financing": {"exPost": 0.4, "exAnte": 0.6},
+    "typology": {"nbsRemoval": 0.5, "nbsAvoidance": 0.3, "biochar": 0.1, "dac": 0.05, "renewableEnergy": 0.05},
+    "regionAllocation": {
+        "northAmerica": 0.1, "southAmerica": 0.2, "europe": 0.3, "africa": 0.2, "asia": 0.1, "oceania": 0.1,
+    },
+    "carbonUnitNeeds": {"2030": 1000, "2050": 40000},
+    "timeConstraints": 1,
+}
+
+
+@pytest.mark.parametrize("field, value", [
+    ("format", "columnar"),
+    ("format", "binary"),
+    ("duals", True),
+    ("uncertainty", {"paths": 100}),
+    ("uncertainty", {"paths": 100, "seed": 1}),
+])
+def test_key_separates_result_options(field, value):
+    assert request_key(dict(REQUEST, **{field: value})) != request_key(REQUEST)
+
+
+@pytest.mark.parametrize("request_json", [
+    dict(reversed(list(REQUEST.items())), carbonUnitNeeds={2050: 40000.0, 2030: 1000}),
+    dict(REQUEST, format="records", duals=False, cache=False),
+    dict(REQUEST, timeConstraints="1"),
+    dict(REQUEST, timeConstraints=1.0),
+    dict(REQUEST, budgetBand=[0.015, 0.08]),
+    dict(REQUEST, timeConstraints=-1, budgetBand=[0.015, 0.08]),
+    dict(REQUEST, solver=None),
+    dict(REQUEST, solver=DEFAULT_SOLVER),
+])
+def test_key_ignores_order_and_default_options(request_json):
+    assert request_key(request_json) == request_key(REQUEST)
+
+
+@pytest.mark.parametrize("changed", [
+    {"timeConstraints": 5},
+    {"timeConstraints": -1},
+    {"solver": "cbc"},
+])
+def test_key_separates_cadences_and_solvers(changed):
+    assert request_key(dict(REQUEST, **changed)) != request_key(REQUEST)
+
+
+def test_cached_solves_once_and_skips_plans_at_their_time_limit():
+    cache = ResultCache(memory_size=4)
+    calls = []
+
+    def solve(request):
+        calls.append(request)
+        return {"total_price": 1.0, "optimal": request.get("timeLimit") is None}
+
+    assert cached(solve, REQUEST, cache) == cached(solve, dict(REQUEST), cache)
+    assert len(calls) == 1
+    cached(solve, dict(REQUEST, format="columnar"), cache)
+    assert len(calls) == 2
+
+    limited = dict(REQUEST, aggregate=True, timeLimit=1)
+    cached(solve, limited, cache)
+    cached(solve, limited, cache)
+    assert len(calls) == 4
+
+
+# Inherited by the forked workers, as cache.RESULT_CACHE is
+FORKED = {}
+
+
+def put_in_child(key):
+    FORKED["cache"].put(key, {"total_price": 2.0})
+    return FORKED["cache"].pid
+
+
+def test_forked_workers_open_their_own_disk_connection(tmp_path):
+    cache = FORKED["cache"] = ResultCache(memory_size=4, path=str(tmp_path / "results.db"))
+    cache.put("parent", {"total_price": 1.0})
+    parent_connection = cache.db
+    context = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        child_pid = pool.submit(put_in_child, "child").result()
+    assert child_pid != cache.pid
+    assert cache.db is parent_connection
+    assert cache.get("child") == {"total_price": 2.0}
+    assert cache.stats()["disk_hits"] == 1
@@ -0,0 +1,45 @@
+import pytest
+
+from errors import BudgetError
+from main import solve_request
+
+REQUEST = {
+    "financing": {"exPost": 0.4, "exAnte": 0.6},
+    "typology": {"nbsRemoval": 0.5, "nbsAvoidance": 0.3, "biochar": 0.1, "dac": 0.05, "renewableEnergy": 0.05},
+    "regionAllocation": {
+        "northAmerica": 0.1, "southAmerica": 0.2, "europe": 0.3, "africa": 0.2, "asia": 0.1, "oceania": 0.1,
+    },
+    "carbonUnitNeeds": {"2030": 1000, "2050": 40000},
+    "timeConstraints": 1,
+    "cache": False,
+}
+
+
+def test_what_if_need_matches_re_solve():
+    result = solve_request(dict(REQUEST, whatIf=[{"type": "need", "year": 2050, "tons": 100}]))
+    answer = result["whatIf"][0]
+    more = solve_request(dict(REQUEST, carbonUnitNeeds={"2030": 1000, "2050": 40100}))
+    assert answer["exact"]
+    assert result["total_price"] + answer["delta_cost"] == pytest.approx(more["total_price"], rel=1e-6)
+
+
+@pytest.mark.parametrize("what_if", [
+    {"type": "need"},
+    {"type": "need", "year": 2040},
+    {"type": "need", "year": "x"},
+    {"type": "need", "year": 2050, "tons": "1"},
+    {"type": "share", "group": "typology", "from": "nbsAvoidance", "to": "nbsRemoval"},
+    {"type": "share", "group": "typology", "from": "europe", "to": "nbsRemoval", "amount": 0.1},
+    {"type": "share", "group": "climate", "from": "a", "to": "b", "amount": 0.1},
+    {"type": "share", "group": "region", "from": "asia", "to": "europe", "amount": 0.1, "_": 0},
+    {"type": "ranking"},
+    "need",
+])
+def test_malformed_what_if_is_rejected(what_if):
+    request = dict(REQUEST, whatIf=[what_if])
+    if isinstance(what_if, dict) and what_if.get("group") == "region":
+        request["optimizeRegion"] = True
+    with pytest.raises(BudgetError) as error:
+        solve_request(request)
+    assert error.value.status == "invalid"
+    assert error.value.code == "invalid_what_if"
@@ -0,0 +1,68 @@
+import pytest
+
+from algorithms import budgetAlgo
+from errors import BudgetError
+from feasibility import LAST_PLANNING_YEAR
+from main import check_fields, solve_request
+from plans import BASE_YEAR, LAST_DATA_YEAR
+from tensors import price_tensor
+
+REQUEST = {
+    "financing": {"exPost": 0.4, "exAnte": 0.6},
+    "typology": {"nbsRemoval": 0.5, "nbsAvoidance": 0.3, "biochar": 0.1, "dac": 0.05, "renewableEnergy": 0.05},
+    "regionAllocation": {
+        "northAmerica": 0.1, "southAmerica": 0.2, "europe": 0.3, "africa": 0.2, "asia": 0.1, "oceania": 0.1,
+    },
+    "carbonUnitNeeds": {"2030": 1000, "2050": 40000},
+    "timeConstraints": 1,
+    "cache": False,
+}
+
+
+@pytest.mark.parametrize("fields, status, code", [
+    ({"typology": dict(REQUEST["typology"], dac=0)}, "infeasible", "shares_sum"),
+    ({"financing": {"exPost": 0.4}}, "invalid", "missing_share"),
+    ({"financing": {"exPost": 1.4, "exAnte": -0.4}}, "invalid", "invalid_share"),
+    ({"carbonUnitNeeds": {"2030": -1}}, "invalid", "invalid_need"),
+    ({"carbonUnitNeeds": {"next": 1}}, "invalid", "invalid_need"),
+    ({"carbonUnitNeeds": {"2020": 1}}, "invalid", "need_before_base_year"),
+    ({"carbonUnitNeeds": {"2101": 1}}, "invalid", "horizon_beyond_data"),
+    ({"carbonUnitNeeds": {"2030": 1000, str(LAST_PLANNING_YEAR + 1): 1}}, "invalid", "horizon_beyond_data"),
+    ({"timeConstraints": [LAST_PLANNING_YEAR + 1]}, "invalid", "invalid_cadence"),
+    (
+        {"timeConstraints": [2030, 2040], "carbonUnitNeeds": {"2026": 1, "2050": 10}},
+        "infeasible", "need_before_purchase",
+    ),
+    ({"budgetBand": [0.5, 0.6]}, "infeasible", "budget_band"),
+    ({"budgetBand": [0, 0.01]}, "infeasible", "budget_band"),
+])
+def test_pre_check_rejects_the_request(fields, status, code):
+    with pytest.raises(BudgetError) as error:
+        check_fields(dict(REQUEST, **fields))
+    assert (error.value.status, error.value.code) == (status, code)
+
+
+def test_last_planning_year_has_positive_prices():
+    assert LAST_DATA_YEAR < LAST_PLANNING_YEAR
+    prices = price_tensor(LAST_PLANNING_YEAR - BASE_YEAR + 2)
+    assert (prices[..., :-1] > 0).all()
+    # The first extrapolated price to reach 0 sets the limit
+    assert (prices[..., -1] == 0).any()
+    assert check_fields(dict(REQUEST, carbonUnitNeeds={"2030": 1000, str(LAST_PLANNING_YEAR): 1}))
+
+
+def test_pre_check_accepts_optimized_groups_without_shares():
+    request = dict(REQUEST, optimizeFinancing=True, optimizeRegion=True, financing={"exAnte": 1},
+                   regionAllocation={"europe": 1})
+    assert check_fields(request) == (1, (0.015, 0.08))
+    assert solve_request(request)["status"] == "optimal"
+
+
+def test_solver_agrees_with_the_budget_band_pre_check():
+    carbon_needs = {2030: 1000, 2050: 40000}
+    with pytest.raises(BudgetError) as error:
+        budgetAlgo(
+            REQUEST["financing"], REQUEST["typology"], REQUEST["regionAllocation"], carbon_needs,
+            False, False, cadence=1, budget_band=(0.5, 0.6),
+        )
+    assert error.value.status == "infeasible"
@@ -0,0 +1,38 @@
+import pytest
+
+from errors import BudgetError
+from frontier import frontier_request, frontier_spec
+from main import solve_request
+
+REQUEST = {
+    "financing": {"exPost": 0.4, "exAnte": 0.6},
+    "typology": {"nbsRemoval": 0.5, "nbsAvoidance": 0.3, "biochar": 0.1, "dac": 0.05, "renewableEnergy": 0.05},
+    "regionAllocation": {
+        "northAmerica": 0.1, "southAmerica": 0.2, "europe": 0.3, "africa": 0.2, "asia": 0.1, "oceania": 0.1,
+    },
+    "carbonUnitNeeds": {"2030": 0, "2050": 40000},
+    "timeConstraints": 1,
+}
+
+
+def test_frontier_over_zero_needs_is_rejected():
+    with pytest.raises(BudgetError) as error:
+        frontier_request(dict(REQUEST, frontier={"multiplier": [0.5, 1.5], "years": [2030]}))
+    assert error.value.status == "invalid"
+    assert error.value.code == "invalid_frontier"
+
+
+def test_frontier_spec_zero_needs():
+    with pytest.raises(BudgetError):
+        frontier_spec({}, {2030: 0, 2050: 0})
+    assert frontier_spec({"years": [2050, 2050]}, {2030: 0, 2050: 10}) == (0.5, 1.5, [1])
+
+
+def test_frontier_matches_solves_at_breakpoints():
+    result = frontier_request(dict(REQUEST, frontier={"multiplier": [0.5, 1.5], "years": [2050]}))
+    frontier = result["frontier"]
+    assert len(frontier["price_per_ton"]) == len(frontier["multiplier"]) - 1
+    for multiplier, price in zip(frontier["multiplier"], frontier["total_price"]):
+        needs = dict(REQUEST["carbonUnitNeeds"], **{"2050": 40000 * multiplier})
+        solved = solve_request(dict(REQUEST, carbonUnitNeeds=needs, cache=False))
+        assert price == pytest.approx(solved["total_price"], rel=1e-6)
@@ -0,0 +1,54 @@
+import warnings
+
+from algorithms import budget_model
+from feasibility import LAST_PLANNING_YEAR
+from heuristics import FEASIBILITY_TOLERANCE, complete_columns, greedy_plan, plan_violation
+from main import check_fields, solve_request
+from plans import BASE_YEAR
+
+SHARES = {
+    "financing": {"exPost": 0.4, "exAnte": 0.6},
+    "typology": {"nbsRemoval": 0.5, "nbsAvoidance": 0.3, "biochar": 0.1, "dac": 0.05, "renewableEnergy": 0.05},
+    "regionAllocation": {
+        "northAmerica": 0.1, "southAmerica": 0.2, "europe": 0.3, "africa": 0.2, "asia": 0.1, "oceania": 0.1,
+    },
+}
+
+# Needs every year up to the last planning year
+FAR_REQUEST = dict(
+    SHARES, carbonUnitNeeds={str(year): 1000 for year in range(BASE_YEAR, LAST_PLANNING_YEAR + 1)},
+    timeConstraints=5, cache=False,
+)
+
+
+def test_greedy_plan_at_far_horizon_is_feasible():
+    cadence, budget_band = check_fields(FAR_REQUEST)
+    carbon_needs = {int(year): need for year, need in FAR_REQUEST["carbonUnitNeeds"].items()}
+    _, price, model = budget_model(
+        SHARES["financing"], SHARES["typology"], SHARES["regionAllocation"], carbon_needs,
+        False, False, cadence, budget_band,
+    )
+    assert (price > 0).all()
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        plan = greedy_plan(model)
+    assert plan is not None
+    values = complete_columns(model, plan.reshape(-1, 1))[:, 0]
+    assert plan_violation(model, values) <= FEASIBILITY_TOLERANCE
+
+
+def test_time_limit_at_far_horizon_falls_back():
+    optimal = solve_request(FAR_REQUEST)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        result = solve_request(dict(FAR_REQUEST, timeLimit=1e-6))
+    assert result["status"] == "time_limit"
+    assert result["total_price"] >= optimal["total_price"] * (1 - 1e-9)
+    assert 0 <= result["gap"] <= 1
+
+
+def test_time_limit_far_horizon_without_band():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        result = solve_request(dict(FAR_REQUEST, timeConstraints=-1, timeLimit=1e-6))
+    assert result["status"] in ("time_limit", "optimal")
@@ -0,0 +1,27 @@
+import io
+import json
+
+import pytest
+
+from jsonio import read_request, write_json
+
+
+def test_read_request_from_a_large_file(tmp_path):
+    request = {"carbonUnitNeeds": {str(year): year for year in range(2025, 2101)}, "padding": "x" * (2 << 20)}
+    path = tmp_path / "request.json"
+    path.write_text(json.dumps(request))
+    assert read_request(["--input", str(path)], io.BytesIO()) == request
+    assert read_request(["-"], io.BytesIO(path.read_bytes())) == request
+
+
+def test_unreadable_file_is_an_invalid_request(tmp_path):
+    with pytest.raises(ValueError):
+        read_request(["--input", str(tmp_path / "missing.json")], io.BytesIO())
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1024])
+def test_write_json_matches_json_dumps(chunk_size):
+    value = {"results": [{"year": 2025 + index, "quantity": index / 3} for index in range(50)], 2025: True}
+    stream = io.StringIO()
+    write_json(value, stream, chunk_size)
+    assert stream.getvalue() == json.dumps(value)
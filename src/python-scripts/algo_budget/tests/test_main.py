@@ -0,0 +1,56 @@
+import pytest
+
+from errors import BudgetError
+from main import check_fields, solve_request
+
+REQUEST = {
+    "financing": {"exPost": 0.4, "exAnte": 0.6},
+    "typology": {"nbsRemoval": 0.5, "nbsAvoidance": 0.3, "biochar": 0.1, "dac": 0.05, "renewableEnergy": 0.05},
+    "regionAllocation": {
+        "northAmerica": 0.1, "southAmerica": 0.2, "europe": 0.3, "africa": 0.2, "asia": 0.1, "oceania": 0.1,
+    },
+    "carbonUnitNeeds": {"2030": 1000, "2050": 40000},
+    "timeConstraints": 5,
+    "cache": False,
+}
+
+
+@pytest.mark.parametrize("band", [[0.5], [0.2, 0.1], [-0.1, 0.5], [0.1, 1.5], ["0.1", 0.5], [True, 1], 0.5])
+def test_invalid_budget_band_is_rejected(band):
+    with pytest.raises(BudgetError) as error:
+        check_fields(dict(REQUEST, budgetBand=band))
+    assert error.value.status == "invalid"
+    assert error.value.code == "invalid_budget_band"
+
+
+def test_budget_band_overrides_the_default():
+    assert check_fields(dict(REQUEST, budgetBand=[0, 1])) == (5, [0, 1])
+    assert check_fields(REQUEST) == (5, (0.015, 0.40))
+    assert solve_request(dict(REQUEST, budgetBand=[0, 1]))["total_price"] > 0
+
+
+@pytest.mark.parametrize("solver", ["glpk", 1, ["highs"]])
+def test_unknown_solver_is_rejected(solver):
+    with pytest.raises(BudgetError) as error:
+        solve_request(dict(REQUEST, solver=solver))
+    assert error.value.status == "invalid"
+    assert error.value.code == "invalid_solver"
+
+
+def test_solver_names_match_the_backends():
+    from models import SOLVER_NAMES
+    from solvers import SOLVERS
+
+    assert set(SOLVER_NAMES) == set(SOLVERS)
+
+
+def test_request_is_checked_once(monkeypatch):
+    import main
+
+    calls = []
+    check = main.check_fields
+    monkeypatch.setattr(main, "check_fields", lambda request: calls.append(request) or check(request))
+    for options in ({}, {"profile": True}):
+        calls.clear()
+        assert main.solve_request(dict(REQUEST, **options))["total_price"] > 0
+        assert len(calls) == 1
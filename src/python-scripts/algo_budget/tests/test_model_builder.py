@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+import templates
+from algorithms import plan_periods
+from main import solve_request
+from model_builder import build_model
+from solvers import solve
+from tensors import purchase_tensors
+
+REQUEST = {
+    "financing": {"exPost": 0.4, "exAnte": 0.6},
+    "typology": {"nbsRemoval": 0.5, "nbsAvoidance": 0.3, "biochar": 0.1, "dac": 0.05, "renewableEnergy": 0.05},
+    "regionAllocation": {
+        "northAmerica": 0.1, "southAmerica": 0.2, "europe": 0.3, "africa": 0.2, "asia": 0.1, "oceania": 0.1,
+    },
+    "carbonUnitNeeds": {"2030": 1000, "2040": 15000, "2050": 40000},
+    "cache": False,
+}
+
+# total_price of yearlyAlgo, fiveYearAlgo and flexibleAlgo (timeConstraints 1, 5
+# and -1) of the baseline PuLP models, solved by CBC, for REQUEST with its shares
+# or with the financing and regions optimized
+BASELINE = {
+    (1, False): 1654806.676792592,
+    (1, True): 978886.4868805961,
+    (5, False): 1576168.760167589,
+    (5, True): 937858.552309838,
+    (-1, False): 1548533.492682832,
+    (-1, True): 916239.1704968362,
+}
+
+
+@pytest.mark.parametrize("cumulative", [False, True])
+@pytest.mark.parametrize("time_constraint, optimized", list(BASELINE))
+def test_objective_matches_the_baseline(time_constraint, optimized, cumulative):
+    result = solve_request(dict(
+        REQUEST, timeConstraints=time_constraint, optimizeFinancing=optimized, optimizeRegion=optimized,
+        cumulativeNeeds=cumulative,
+    ))
+    assert result["status"] == "optimal"
+    assert result["total_price"] == pytest.approx(BASELINE[time_constraint, optimized], rel=1e-6)
+
+
+# Zero shares are left out of the share rows by build_model
+SHARES = dict(
+    REQUEST, regionAllocation={
+        "northAmerica": 0.1, "southAmerica": 0, "europe": 0.5, "africa": 0.2, "asia": 0.1, "oceania": 0.1,
+    },
+)
+
+
+@pytest.mark.parametrize("structure", [
+    (1, 2050, False, False, (0.015, 0.08), False),
+    (5, 2040, True, False, (0.015, 0.40), False),
+    (1, 2045, False, True, None, True),
+])
+def test_template_matches_fresh_build(structure, tmp_path, monkeypatch):
+    cadence, last_year, optimizeFinancing, optimizeRegion, budget_band, cumulative_needs = structure
+    path = str(tmp_path / "templates.bin")
+    templates.write_templates(path, [structure])
+    monkeypatch.setattr(templates, "_TEMPLATES", templates.load_templates(path))
+    carbon_needs = {2030: 1000, 2036: 15000, last_year: 40000}
+    shares = (SHARES["financing"], SHARES["typology"], SHARES["regionAllocation"])
+
+    years, template = templates.template_model(
+        cadence, carbon_needs, *shares, optimizeFinancing, optimizeRegion, budget_band, cumulative_needs,
+    )
+    built_years, need_periods = plan_periods(cadence, carbon_needs)
+    price, stock_delivery = purchase_tensors(built_years)
+    built = build_model(
+        price, stock_delivery, need_periods, list(carbon_needs.values()), *shares,
+        optimizeFinancing, optimizeRegion, budget_band, cumulative_needs,
+    )
+
+    assert list(years) == list(built_years)
+    assert template.shape == built.shape
+    assert template.aux_names == built.aux_names
+    assert template.row_groups == built.row_groups
+    np.testing.assert_allclose(template.A.toarray(), built.A.toarray(), rtol=1e-12)
+    np.testing.assert_allclose(template.row_lower, built.row_lower, rtol=1e-12)
+    np.testing.assert_allclose(template.row_upper, built.row_upper, rtol=1e-12)
+    np.testing.assert_allclose(template.c, built.c, rtol=1e-12)
+    solved, expected = solve(template), solve(built)
+    assert solved.status == expected.status == "optimal"
+    assert solved.objective == pytest.approx(expected.objective, rel=1e-9)
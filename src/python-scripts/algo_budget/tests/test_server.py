@@ -0,0 +1,106 @@
+import asyncio
+import json
+import os
+import signal
+
+import pytest
+
+from server import SolveService
+
+
+REQUEST = {
+    "financing": {"exPost": 0.4, "exAnte": 0.6},
+    "typology": {"nbsRemoval": 0.5, "nbsAvoidance": 0.3, "biochar": 0.1, "dac": 0.05, "renewableEnergy": 0.05},
+    "regionAllocation": {
+        "northAmerica": 0.1, "southAmerica": 0.2, "europe": 0.3, "africa": 0.2, "asia": 0.1, "oceania": 0.1,
+    },
+    "carbonUnitNeeds": {"2030": 1000, "2050": 40000},
+    "timeConstraints": 1,
+    "cache": False,
+}
+
+
+async def exchange(request, read_timeout=5.0):
+    """Status line and JSON body answered by a SolveService to the raw `request`."""
+    service = SolveService(workers=1, queue_size=0, timeout=1, read_timeout=read_timeout)
+    server = await asyncio.start_server(service.handle, "127.0.0.1", 0)
+    try:
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(request)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout=5)
+        writer.close()
+    finally:
+        server.close()
+        await server.wait_closed()
+        service.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return head.split(b"\r\n")[0].decode(), json.loads(body)
+
+
+@pytest.mark.parametrize("length", ["abc", "-1", "1.5", ""])
+def test_malformed_content_length_answers_400(length):
+    request = f"POST /solve HTTP/1.1\r\nContent-Length: {length}\r\n\r\n{{}}".encode()
+    status, body = asyncio.run(exchange(request))
+    assert status == "HTTP/1.1 400 Bad Request"
+    assert "Content-Length" in body["error"]
+
+
+def test_invalid_json_answers_400():
+    status, body = asyncio.run(exchange(b"POST /solve HTTP/1.1\r\nContent-Length: 3\r\n\r\n{x}"))
+    assert status == "HTTP/1.1 400 Bad Request"
+    assert body["error"].startswith("invalid JSON")
+
+
+@pytest.mark.parametrize("request_bytes", [
+    b"POST /solve HTTP/1.1\r\nContent-Length: 2",
+    b"POST /solve HTTP/1.1\r\nContent-Length: 20\r\n\r\n{}",
+])
+def test_slow_client_answers_408(request_bytes):
+    status, body = asyncio.run(exchange(request_bytes, read_timeout=0.2))
+    assert status == "HTTP/1.1 408 Request Timeout"
+    assert "within" in body["error"]
+
+
+def test_dead_worker_restarts_pool():
+    async def run():
+        service = SolveService(workers=1, queue_size=0, timeout=30)
+        try:
+            await service.start()
+            assert (await service.solve(REQUEST))[0] == 200
+            for process in list(service.pool._processes.values()):
+                os.kill(process.pid, signal.SIGKILL)
+            await asyncio.sleep(0.5)
+            # Answered by a rebuilt pool, or 503 if the crash is seen during the solve
+            first, _ = await service.solve(REQUEST)
+            second, result = await service.solve(REQUEST)
+            return first, second, result, service.restarts
+        finally:
+            service.close()
+
+    first, second, result, restarts = asyncio.run(run())
+    assert first in (200, 503)
+    assert second == 200
+    assert result["total_price"] > 0
+    assert restarts == 1
+
+
+def test_abandoned_solves_holding_every_worker_restart_the_pool():
+    async def run():
+        service = SolveService(workers=1, queue_size=1, timeout=1e-3)
+        try:
+            await service.start()
+            timed_out, _ = await service.solve(REQUEST)
+            restarts = service.restarts
+            service.timeout = 30
+            status, _ = await service.solve(REQUEST)
+            return timed_out, restarts, status, service.pending, service.abandoned
+        finally:
+            service.close()
+
+    timed_out, restarts, status, pending, abandoned = asyncio.run(run())
+    assert timed_out == 504
+    assert restarts == 1
+    assert status == 200
+    assert (pending, abandoned) == (0, 0)
@@ -0,0 +1,46 @@
+import pytest
+
+from main import solve_request
+from session import SESSIONS
+
+REQUEST = {
+    "financing": {"exPost": 0.4, "exAnte": 0.6},
+    "typology": {"nbsRemoval": 0.5, "nbsAvoidance": 0.3, "biochar": 0.1, "dac": 0.05, "renewableEnergy": 0.05},
+    "regionAllocation": {
+        "northAmerica": 0.1, "southAmerica": 0.2, "europe": 0.3, "africa": 0.2, "asia": 0.1, "oceania": 0.1,
+    },
+    "carbonUnitNeeds": {"2030": 1000, "2050": 40000},
+    "timeConstraints": 1,
+    "cache": False,
+}
+
+
+def assert_same_plan(result, expected):
+    assert result["status"] == expected["status"]
+    assert result["total_price"] == pytest.approx(expected["total_price"], rel=1e-6)
+    spent = sum(purchase["quantity"] * purchase["price"] for purchase in result["results"])
+    assert spent == pytest.approx(result["total_price"], rel=1e-6)
+
+
+@pytest.mark.parametrize("optimized", [
+    {"optimizeRegion": True, "regionAllocation": {"europe": 1}},
+    {"optimizeFinancing": True, "financing": {"exAnte": 1}},
+    {"optimizeRegion": True, "optimizeFinancing": True, "regionAllocation": {"asia": 1}, "financing": {"exPost": 1}},
+])
+def test_session_with_optimized_groups_missing_keys(optimized):
+    request = dict(REQUEST, **optimized)
+    assert_same_plan(solve_request(dict(request, session=True)), solve_request(request))
+
+
+def test_warm_session_matches_cold_solve():
+    SESSIONS.clear()
+    first = dict(REQUEST, session=True)
+    solve_request(first)
+    changed = dict(
+        REQUEST,
+        carbonUnitNeeds={"2030": 5000, "2050": 30000},
+        typology={"nbsRemoval": 0.2, "nbsAvoidance": 0.4, "biochar": 0.2, "dac": 0.1, "renewableEnergy": 0.1},
+    )
+    warm = solve_request(dict(changed, session=True, profile=True))
+    assert warm["diagnostics"]["session"]["warm"]
+    assert_same_plan(warm, solve_request(changed))
@@ -0,0 +1,62 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from models import TYPOLOGIES, REGIONS, FINANCING_KEYS
+from strategies import yearly_strategies
+
+# The purchases ("results") of the baseline main.py for "request", and what the
+# baseline budget.ts computed from them (run-python-budget-algo.ts, then the
+# getTotalCost* / calculateTotal* helpers of src/utils/calculations.ts)
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "budget_baseline.json")
+
+FINANCING_TYPES = {"ex-post": "exPost", "ex-ante": "exAnte"}
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    with open(BASELINE_PATH) as file:
+        return json.load(file)
+
+
+def plan_tensors(results):
+    """(years, price, values) of purchase records, as solution_results passes them."""
+    years = list(range(min(entry["year"] for entry in results), max(entry["year"] for entry in results) + 1))
+    shape = (len(TYPOLOGIES), len(REGIONS), len(years), len(FINANCING_KEYS))
+    price, values = np.zeros(shape), np.zeros(shape)
+    for entry in results:
+        index = (
+            TYPOLOGIES.index(entry["typology"]), REGIONS.index(entry["region"]),
+            years.index(entry["year"]), FINANCING_KEYS.index(FINANCING_TYPES[entry["type"]]),
+        )
+        price[index], values[index] = entry["price"], entry["quantity"]
+    return years, price, values
+
+
+def test_breakdowns_match_the_baseline_budget_ts(baseline):
+    expected = baseline["budget_ts"]
+    aggregated = yearly_strategies(*plan_tensors(baseline["results"]))
+    breakdowns = aggregated["breakdowns"]
+
+    for field in ("totalBudgetLow", "totalBudgetMedium", "totalBudgetHigh"):
+        assert aggregated[field] == pytest.approx(expected[field], rel=1e-9)
+    assert breakdowns["costByTypology"] == pytest.approx({
+        key: expected["costByTypology"][f"cost{key[0].upper()}{key[1:]}"] for key in TYPOLOGIES
+    }, rel=1e-9)
+    assert breakdowns["costByRegion"] == pytest.approx(expected["costByRegion"], rel=1e-9)
+    assert breakdowns["quantityByRegion"] == pytest.approx(expected["quantityByRegion"], rel=1e-9)
+    assert breakdowns["costByFinancing"] == pytest.approx({
+        key: expected["costByFinancing"][f"totalCost{key[0].upper()}{key[1:]}"] for key in FINANCING_KEYS
+    }, rel=1e-9)
+    assert breakdowns["quantityByFinancing"] == pytest.approx({
+        key: expected["quantityByFinancing"][f"total{key[0].upper()}{key[1:]}"] for key in FINANCING_KEYS
+    }, rel=1e-9)
+
+    assert [strategy["year"] for strategy in aggregated["strategies"]] == [
+        strategy["year"] for strategy in expected["strategies"]
+    ]
+    for strategy, expected_strategy in zip(aggregated["strategies"], expected["strategies"]):
+        for field in ("quantity_purchased", "cost_low", "cost_medium", "cost_high"):
+            assert strategy[field] == pytest.approx(expected_strategy[field], rel=1e-9)
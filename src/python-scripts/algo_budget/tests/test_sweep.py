@@ -0,0 +1,35 @@
+import pytest
+
+from errors import BudgetError
+from main import solve_request
+from sweep import sweep_request
+
+REQUEST = {
+    "financing": {"exPost": 0.4, "exAnte": 0.6},
+    "typology": {"nbsRemoval": 0.5, "nbsAvoidance": 0.3, "biochar": 0.1, "dac": 0.05, "renewableEnergy": 0.05},
+    "regionAllocation": {"europe": 1},
+    "carbonUnitNeeds": {"2030": 1000, "2050": 40000},
+    "timeConstraints": 1,
+    "optimizeRegion": True,
+}
+
+
+def test_sweep_with_optimized_groups_missing_keys():
+    result = sweep_request(dict(REQUEST, sweep={"typology": {"biochar": [0, 0.2]}, "steps": 3}), workers=1)
+    assert result["surface"]["status"] == ["optimal"] * 3
+    # The middle point keeps the shares of the request
+    assert result["surface"]["typology.biochar"][1] == pytest.approx(0.1)
+    expected = solve_request(dict(REQUEST, cache=False))["total_price"]
+    assert result["surface"]["total_price"][1] == pytest.approx(expected, rel=1e-6)
+
+
+@pytest.mark.parametrize("options", [
+    {"seed": "x", "method": "lhs"}, {"seed": -1, "method": "lhs"}, {"points": 2.5, "method": "lhs"},
+    {"steps": "5"}, {"steps": True},
+])
+def test_invalid_sweep_options(options):
+    spec = dict({"typology": {"biochar": [0, 0.2]}}, **options)
+    with pytest.raises(BudgetError) as error:
+        sweep_request(dict(REQUEST, sweep=spec), workers=1)
+    assert error.value.status == "invalid"
+    assert error.value.code == "invalid_sweep"
@@ -0,0 +1,165 @@
+"""
+Monte Carlo price uncertainty of a solved plan, with "uncertainty" in the
+request :
+
+    "uncertainty": {
+        "paths": 10000,             price paths sampled
+        "seed": 0,
+        "yearCorrelation": 0.8,     correlation of the price curves a year apart
+        "regionShare": 0.25,        share of the variance in the regional factors
+        "volatility": {"dac": 0.2}, log-price volatility of some typologies
+        "percentiles": [5, 50, 95]
+    }
+
+Every price of the plan is multiplied, on each path, by a lognormal factor of
+mean 1 :
+
+    exp(a[typology, year] + b[typology, region] - volatility[typology] ** 2 / 2)
+
+    a : the x_coefficients curve of the typology, an AR(1) path over the years
+    b : the regional factor of the typology, drawn once per path
+
+so a path costs sum over (typology, year) of exp(a) times the regional costs
+of the plan, exp(b) @ cost : a batched product per typology. Paths are drawn
+PATH_CHUNK at a time. By default the volatility of a typology makes its
+typology_cost_factors low and high factors the 5th and 95th percentiles.
+"""
+import math
+
+import numpy as np
+
+from errors import BudgetError
+from models import TYPOLOGIES
+from strategies import COST_FACTORS
+
+
+DEFAULT_PATHS = 10_000
+MAX_PATHS = 1_000_000
+
+# Paths sampled at once : (PATH_CHUNK, typology, period) arrays
+PATH_CHUNK = 16_384
+
+DEFAULT_YEAR_CORRELATION = 0.8
+DEFAULT_REGION_SHARE = 0.25
+DEFAULT_PERCENTILES = (1, 5, 10, 25, 50, 75, 90, 95, 99)
+
+# 95th percentile of the standard normal distribution
+BAND_QUANTILE = 1.6448536269514722
+
+# (typology,) log-price volatility placing the low and high cost factors at the 5th and 95th percentiles
+DEFAULT_VOLATILITY = np.log(COST_FACTORS[:, 1] / COST_FACTORS[:, 0]) / (2 * BAND_QUANTILE)
+
+
+def _number(value, name, low, high):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not low <= value <= high:
+        raise BudgetError("invalid", "invalid_uncertainty", f"{name} must be a number in [{low}, {high}]")
+    return float(value)
+
+
+def uncertainty_options(spec):
+    """Checked options of the "uncertainty" object `spec` (true for the defaults)."""
+    if spec is True:
+        spec = {}
+    if not isinstance(spec, dict):
+        raise BudgetError("invalid", "invalid_uncertainty", "uncertainty must be an object")
+
+    paths = spec.get("paths", DEFAULT_PATHS)
+    if isinstance(paths, bool) or not isinstance(paths, int) or not 1 <= paths <= MAX_PATHS:
+        raise BudgetError("invalid", "invalid_uncertainty", f"paths must be an integer in [1, {MAX_PATHS}]")
+    seed = spec.get("seed", 0)
+    if isinstance(seed, bool) or not isinstance(seed, int) or seed < 0:
+        raise BudgetError("invalid", "invalid_uncertainty", "seed must be a non-negative integer")
+
+    volatility = DEFAULT_VOLATILITY.copy()
+    for typology, value in (spec.get("volatility") or {}).items():
+        if typology not in TYPOLOGIES:
+            raise BudgetError("invalid", "invalid_uncertainty", f"unknown typology {typology}")
+        volatility[TYPOLOGIES.index(typology)] = _number(value, f"volatility of {typology}", 0, 5)
+
+    percentiles = spec.get("percentiles", list(DEFAULT_PERCENTILES))
+    if not isinstance(percentiles, list) or not percentiles:
+        raise BudgetError("invalid", "invalid_uncertainty", "percentiles must be a non-empty list")
+    return {
+        "paths": paths,
+        "seed": seed,
+        "year_correlation": _number(
+            spec.get("yearCorrelation", DEFAULT_YEAR_CORRELATION), "yearCorrelation", 0, 1,
+        ),
+        "region_share": _number(spec.get("regionShare", DEFAULT_REGION_SHARE), "regionShare", 0, 1),
+        "volatility": volatility,
+        "percentiles": [_number(q, "a percentile", 0, 100) for q in percentiles],
+    }
+
+
+def draw_factors(rng, years, options, count, n_regions):
+    """
+    (typology, region, path) regional factors and (typology, period, path)
+    price curve factors of `count` paths over the purchase `years`.
+    """
+    n_typologies, n_periods = len(options["volatility"]), len(years)
+    year_volatility = options["volatility"] * math.sqrt(1 - options["region_share"])
+    region_volatility = options["volatility"] * math.sqrt(options["region_share"])
+    # Correlation and innovation scale of each step of the AR(1) curves, over the gaps between purchase years
+    correlation = options["year_correlation"] ** np.diff(np.asarray(years, dtype=float))
+    innovation = np.sqrt(1 - correlation ** 2)
+
+    region_factors = np.exp(
+        region_volatility[:, None, None] * rng.standard_normal((n_typologies, n_regions, count))
+        - region_volatility[:, None, None] ** 2 / 2
+    )
+
+    # Stationary with unit variance
+    curves = rng.standard_normal((n_typologies, n_periods, count))
+    for period in range(1, n_periods):
+        curves[:, period] *= innovation[period - 1]
+        curves[:, period] += correlation[period - 1] * curves[:, period - 1]
+    curves *= year_volatility[:, None, None]
+    curves -= year_volatility[:, None, None] ** 2 / 2
+    np.exp(curves, out=curves)
+    return region_factors, curves
+
+
+def sample_costs(years, cost, options):
+    """
+    (period, path) cost of the (typology, region, period) plan `cost` under the
+    sampled price paths.
+    """
+    n_regions, n_periods = cost.shape[1:]
+    rng = np.random.default_rng(options["seed"])
+
+    costs = np.empty((n_periods, options["paths"]))
+    for start in range(0, options["paths"], PATH_CHUNK):
+        count = min(PATH_CHUNK, options["paths"] - start)
+        region_factors, curves = draw_factors(rng, years, options, count, n_regions)
+        # (typology, period, path) regional costs, times the price curves
+        curves *= np.matmul(cost.transpose(0, 2, 1), region_factors)
+        costs[:, start:start + count] = curves.sum(axis=0)
+    return costs
+
+
+def price_distribution(years, price, values, options):
+    """
+    Distribution of the cost of the (typology, region, period, financing)
+    purchases `values` priced by `price` : mean, standard deviation and
+    percentiles of the total, and the mean and percentiles of each year with
+    purchases.
+    """
+    cost = (values * price).sum(axis=3)
+    # Only the years with purchases are sampled, the curves correlated over the gaps
+    periods = np.flatnonzero(cost.sum(axis=(0, 1)) > 0)
+    years = np.asarray(years)[periods]
+    costs = sample_costs(years, cost[:, :, periods], options)
+    totals = costs.sum(axis=0)
+    labels = [f"p{q:g}" for q in options["percentiles"]]
+    yearly = np.percentile(costs, options["percentiles"], axis=1)
+    return {
+        "paths": options["paths"],
+        "mean": float(totals.mean()),
+        "std": float(totals.std()),
+        "percentiles": dict(zip(labels, np.percentile(totals, options["percentiles"]).tolist())),
+        "yearly": {
+            "year": years.tolist(),
+            "mean": costs.mean(axis=1).tolist(),
+            **dict(zip(labels, yearly.tolist())),
+        },
+    }
@@ -238,11 +238,21 @@ export interface Advice {
   tip?: TimeConstraint | Financing | Typology[] | RegionAllocation;
 }
 
+// Totals over every yearly strategy, computed by the python algo
+export interface BudgetBreakdowns {
+  costByTypology: Typology;
+  costByRegion: CostByRegion;
+  costByFinancing: Financing;
+  quantityByRegion: RegionAllocation;
+  quantityByFinancing: Financing;
+}
+
 export interface BudgetPythonResponse {
   totalBudgetLow: number;
   totalBudgetMedium: number;
   totalBudgetHigh: number;
   strategies: YearlyStrategy[];
+  breakdowns: BudgetBreakdowns;
 }
 export interface BudgetOutputData {
   financing: Financing;